@@ -1,12 +1,58 @@
 import os
+import array
+import bisect
 import sys
+import io
+import csv
+import heapq
+import stat
+import shutil
+import tempfile
+import json
+import hashlib
+import functools
+import http.client
+import queue
+import base64
+import urllib.parse
+import sqlite3
+import mmap
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+import struct
+import uuid
+import zlib
+from collections import namedtuple, OrderedDict
 from argparse import ArgumentParser
 import math
 import time
 from pathlib import Path
 from datetime import datetime
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+try:
+    import crc32c as crc32c_lib
+except ImportError:
+    crc32c_lib = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import indexed_gzip
+except ImportError:
+    indexed_gzip = None
 
 def banner():
     console.print("""[bold red]\n
@@ -27,6 +73,10 @@ def banner():
 EXT4_BLOCK_SZ       = 4096
 EXT4_MIN_BLOCK_SIZE = 1024
 EXT4_MAX_BLOCK_SIZE = 65536
+# s_log_block_size of the largest block size
+EXT4_MAX_LOG_BLOCK_SIZE = 6
+# Group descriptors, 64 bytes or more only with EXT4_FEATURE_INCOMPAT_64BIT
+EXT4_DESC_SIZE      = 32
 # Ext4 Inode
 EXT4_BAD_INO            = 1
 EXT4_ROOT_INO           = 2
@@ -37,6 +87,13 @@ EXT4_JOURNAL_INO        = 8
 EXT4_GOOD_OLD_FIRST_INO = 11
 # Ext4 Super Block
 EXT4_SUPER_MAGIC = 0xEF53
+EXT4_SUPERBLOCK_OFFSET = 1024
+EXT4_SB_MAGIC_OFFSET = 0x38
+# metadata_csum fields past the end of the decoded superblock layout
+EXT4_SB_CHECKSUM_SEED_OFFSET = 0x270
+EXT4_SB_CHECKSUM_OFFSET = 0x3FC
+# sparse_super2 backup groups, also inside sb_reserved
+EXT4_SB_BACKUP_BGS_OFFSET = 0x24C
 EXT4_STATE = {
     'EXT4_VALID_FS'  : 0x0001,
     'EXT4_ERROR_FS'  : 0x0002,
@@ -83,7 +140,8 @@ EXT4_FEATURE_COMPAT = {
     'EXT4_FEATURE_COMPAT_HAS_JOURNAL'   : 0x0004,
     'EXT4_FEATURE_COMPAT_EXT_ATTR'      : 0x0008,
     'EXT4_FEATURE_COMPAT_RESIZE_INODE'  : 0x0010,
-    'EXT4_FEATURE_COMPAT_DIR_INDEX'     : 0x0020
+    'EXT4_FEATURE_COMPAT_DIR_INDEX'     : 0x0020,
+    'EXT4_FEATURE_COMPAT_SPARSE_SUPER2' : 0x0200
     }
 
 EXT4_FEATURE_INCOMPAT = {
@@ -97,7 +155,8 @@ EXT4_FEATURE_INCOMPAT = {
     'EXT4_FEATURE_INCOMPAT_MMP'         : 0x0100,
     'EXT4_FEATURE_INCOMPAT_FLEX_BG'     : 0x0200,
     'EXT4_FEATURE_INCOMPAT_EA_INODE'    : 0x0400,
-    'EXT4_FEATURE_INCOMPAT_DIRDATA'     : 0x1000
+    'EXT4_FEATURE_INCOMPAT_DIRDATA'     : 0x1000,
+    'EXT4_FEATURE_INCOMPAT_CSUM_SEED'   : 0x2000
     }
 
 EXT4_FEATURE_RO_COMPAT = {
@@ -107,7 +166,10 @@ EXT4_FEATURE_RO_COMPAT = {
     'EXT4_FEATURE_RO_COMPAT_HUGE_FILE'    : 0x0008,
     'EXT4_FEATURE_RO_COMPAT_GDT_CSUM'     : 0x0010,
     'EXT4_FEATURE_RO_COMPAT_DIR_NLINK'    : 0x0020,
-    'EXT4_FEATURE_RO_COMPAT_EXTRA_ISIZE'  : 0x0040
+    'EXT4_FEATURE_RO_COMPAT_EXTRA_ISIZE'  : 0x0040,
+    'EXT4_FEATURE_RO_COMPAT_QUOTA'        : 0x0100,
+    'EXT4_FEATURE_RO_COMPAT_BIGALLOC'     : 0x0200,
+    'EXT4_FEATURE_RO_COMPAT_METADATA_CSUM': 0x0400
     }
 
 EXT4_DEFAULT_MOUNT_OPTS = {
@@ -195,6 +257,7 @@ EXT4_INODE_FLAGS = {
     'EXT4_EXTENTS_FL'           : 0x80000, 
     'EXT4_EA_INODE_FL'          : 0x200000,  
     'EXT4_EOFBLOCKS_FL'         : 0x400000,  
+    'EXT4_INLINE_DATA_FL'       : 0x10000000,
     'EXT4_RESERVED_FL'          : 0x80000000,  
     # Aggregate flags
     'EXT4_FL_USER_VISIBLE'      : 0x4BDFFF, 
@@ -202,6 +265,15 @@ EXT4_INODE_FLAGS = {
     }
 # Ext4 Extent Tree
 EXT4_EXTENT_TREE_MAGIC = 0xF30A
+# ee_len above this marks an unwritten (preallocated) extent
+EXT4_EXT_INIT_MAX_LEN = 1 << 15
+# the root node lives in i_block, deeper trees are rejected as corrupt
+EXT4_EXTENT_ROOT_SZ = 60
+EXT4_EXTENT_MAX_DEPTH = 5
+EXT4_EXTENT_NODE_CACHE_SIZE = 4096
+# file contents are streamed out of the image in pieces of at most this size
+EXT4_READ_CHUNK_SIZE = 1 << 22
+EXT4_EXTRACT_WORKERS = 4
 # Ext4 Directory Entries
 EXT4_NAME_LEN = 255
 EXT4_HTREE_NAME_LEN = 4
@@ -218,85 +290,2636 @@ EXT4_FILE_TYPE = {
     }
 # Ext4 Extended Attributes
 EXT4_XATTR_MAGIC = 0xEA020000
-# Journal will be implemented in next version
+EXT4_XATTR_PREFIX = {
+    1 : 'user.',
+    2 : 'system.posix_acl_access',
+    3 : 'system.posix_acl_default',
+    4 : 'trusted.',
+    6 : 'security.',
+    7 : 'system.',
+    8 : 'system.richacl'
+    }
 # Ext4 Journal, jbd2
+# everything in the journal is big-endian, the log is circular over the
+# journal blocks s_first .. s_maxlen-1, less the fast commit area at the end
 EXT4_JNL_BACKUP_BLOCKS = 1
 JBD2_MAGIC_NUMBER = 0xC03B3998
+# fast commit blocks when the feature is on and s_num_fc_blks is 0
+JBD2_DEFAULT_FAST_COMMIT_BLOCKS = 256
+JBD2_UUID_SIZE = 16
+# checksum tail at the end of descriptor blocks with csum v2/v3
+JBD2_BLOCK_TAIL_SIZE = 4
 # JBD2_CHECKSUM_BYTES = (32 / sizeof(u32))
 JBD2_CHECKSUM_BYTES = (32 / 4)
 
-EXT4_JNL_BLOCK_TYPE = {
-    'JBD2_DESCRIPTOR_BLOCK'    : 1,
-    'JBD2_COMMIT_BLOCK'        : 2,
-    'JBD2_SUPERBLOCK_V1'       : 3,
-    'JBD2_SUPERBLOCK_V2'       : 4,
-    'JBD2_REVOKE_BLOCK'        : 5
-    }
+EXT4_JNL_BLOCK_TYPE = {
+    'JBD2_DESCRIPTOR_BLOCK'    : 1,
+    'JBD2_COMMIT_BLOCK'        : 2,
+    'JBD2_SUPERBLOCK_V1'       : 3,
+    'JBD2_SUPERBLOCK_V2'       : 4,
+    'JBD2_REVOKE_BLOCK'        : 5
+    }
+
+EXT4_JNL_FEATURE_COMPAT = {
+    'JBD2_FEATURE_COMPAT_CHECKSUM' : 0x00000001
+    }
+
+EXT4_JNL_FEATURE_INCOMPAT = {
+    'JBD2_FEATURE_INCOMPAT_REVOKE'       : 0x00000001,
+    'JBD2_FEATURE_INCOMPAT_64BIT'        : 0x00000002,
+    'JBD2_FEATURE_INCOMPAT_ASYNC_COMMIT' : 0x00000004,
+    'JBD2_FEATURE_INCOMPAT_CSUM_V2'      : 0x00000008,
+    'JBD2_FEATURE_INCOMPAT_CSUM_V3'      : 0x00000010,
+    'JBD2_FEATURE_INCOMPAT_FAST_COMMIT'  : 0x00000020
+    }
+
+EXT4_JNL_FLAGS = {
+    'JBD2_FLAG_ESCAPE'    : 1,
+    'JBD2_FLAG_SAME_UUID' : 2,
+    'JBD2_FLAG_DELETED'   : 4,
+    'JBD2_FLAG_LAST_TAG'  : 8
+    }
+
+EXT4_JNL_CHKSUM_TYPE = {
+    'JBD2_CRC32_CHKSUM' : 1,
+    'JBD2_MD5_CHKSUM'   : 2,
+    'JBD2_SHA1_CHKSUM'  : 3,
+    'JBD2_CRC32C_CHKSUM': 4
+    }
+No_of_block_in_a_group = 32768
+size_of_each_block_group = 134217728
+#
+# Ext4 Hash
+#
+EXT4_HASH_VERSION = {
+    'DX_HASH_LEGACY'            : 0x0,
+    'DX_HASH_HALF_MD4'          : 0x1,
+    'DX_HASH_TEA'               : 0x2,
+    'DX_HASH_LEGACY_UNSIGNED'   : 0x3,
+    'DX_HASH_HALF_MD4_UNSIGNED' : 0x4,
+    'DX_HASH_TEA_UNSIGNED'      : 0x5
+    }
+EXT4_HTREE_EOF_32BIT = 0x7FFFFFFF
+EXT4_HTREE_LEVEL = 3
+
+# Directory hashes, ported from fs/ext4/hash.c
+def ext4_dx_str2hashbuf(name, num, signed):
+    pad = len(name) | (len(name) << 8)
+    pad = (pad | (pad << 16)) & 0xFFFFFFFF
+    val = pad
+    words = []
+    for i, c in enumerate(name[:num*4]):
+        if signed and c >= 0x80:
+            c -= 0x100
+        val = (c + (val << 8)) & 0xFFFFFFFF
+        if i % 4 == 3:
+            words.append(val)
+            val = pad
+    if len(words) < num:
+        words.append(val)
+    return words + [pad] * (num - len(words))
+
+def ext4_dx_hack_hash(name, signed):
+    hash0, hash1 = 0x12A3FE2D, 0x37ABE8F9
+    for c in name:
+        if signed and c >= 0x80:
+            c -= 0x100
+        value = (hash1 + (hash0 ^ ((c * 7152373) & 0xFFFFFFFF))) & 0xFFFFFFFF
+        if value & 0x80000000:
+            value = (value - 0x7FFFFFFF) & 0xFFFFFFFF
+        hash1, hash0 = hash0, value
+    return (hash0 << 1) & 0xFFFFFFFF
+
+def ext4_dx_rol32(x, s):
+    return ((x << s) | (x >> (32 - s))) & 0xFFFFFFFF
+
+EXT4_DX_HALF_MD4_ROUNDS = (
+    # (function, message word, shift) for each of the 24 steps, rounds of 8
+    (0, 0, 3), (0, 1, 7), (0, 2, 11), (0, 3, 19), (0, 4, 3), (0, 5, 7), (0, 6, 11), (0, 7, 19),
+    (1, 1, 3), (1, 3, 5), (1, 5, 9), (1, 7, 13), (1, 0, 3), (1, 2, 5), (1, 4, 9), (1, 6, 13),
+    (2, 3, 3), (2, 7, 9), (2, 2, 11), (2, 6, 15), (2, 1, 3), (2, 5, 9), (2, 0, 11), (2, 4, 15),
+    )
+EXT4_DX_HALF_MD4_K = (0, 0o13240474631, 0o15666365641)
+
+def ext4_dx_half_md4_transform(buf, words):
+    a, b, c, d = buf
+    for step, (function, index, shift) in enumerate(EXT4_DX_HALF_MD4_ROUNDS):
+        if function == 0:
+            f = d ^ (b & (c ^ d))
+        elif function == 1:
+            f = ((b & c) + ((b ^ c) & d)) & 0xFFFFFFFF
+        else:
+            f = b ^ c ^ d
+        a = ext4_dx_rol32((a + f + words[index] + EXT4_DX_HALF_MD4_K[function]) & 0xFFFFFFFF, shift)
+        # the registers rotate one place after every step
+        a, b, c, d = d, a, b, c
+    return [(x + y) & 0xFFFFFFFF for x, y in zip(buf, (a, b, c, d))]
+
+def ext4_dx_tea_transform(buf, words):
+    b0, b1 = buf[0], buf[1]
+    a, b, c, d = words
+    total = 0
+    for _ in range(16):
+        total = (total + 0x9E3779B9) & 0xFFFFFFFF
+        b0 = (b0 + ((((b1 << 4) + a) & 0xFFFFFFFF) ^ ((b1 + total) & 0xFFFFFFFF) ^ (((b1 >> 5) + b) & 0xFFFFFFFF))) & 0xFFFFFFFF
+        b1 = (b1 + ((((b0 << 4) + c) & 0xFFFFFFFF) ^ ((b0 + total) & 0xFFFFFFFF) ^ (((b0 >> 5) + d) & 0xFFFFFFFF))) & 0xFFFFFFFF
+    return [(buf[0] + b0) & 0xFFFFFFFF, (buf[1] + b1) & 0xFFFFFFFF, buf[2], buf[3]]
+
+def ext4_dx_hash(name, hash_version, seed=None):
+    # (hash, minor_hash) of a name as stored in dx entries, seed is s_hash_seed as 4 words
+    buf = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476]
+    if seed and any(seed):
+        buf = list(seed)
+    minor_hash = 0
+    signed = hash_version < EXT4_HASH_VERSION['DX_HASH_LEGACY_UNSIGNED']
+    if hash_version in (EXT4_HASH_VERSION['DX_HASH_LEGACY'], EXT4_HASH_VERSION['DX_HASH_LEGACY_UNSIGNED']):
+        hash = ext4_dx_hack_hash(name, signed)
+    elif hash_version in (EXT4_HASH_VERSION['DX_HASH_HALF_MD4'], EXT4_HASH_VERSION['DX_HASH_HALF_MD4_UNSIGNED']):
+        for i in range(0, len(name), 32):
+            buf = ext4_dx_half_md4_transform(buf, ext4_dx_str2hashbuf(name[i:], 8, signed))
+        hash, minor_hash = buf[1], buf[2]
+    elif hash_version in (EXT4_HASH_VERSION['DX_HASH_TEA'], EXT4_HASH_VERSION['DX_HASH_TEA_UNSIGNED']):
+        for i in range(0, len(name), 16):
+            buf = ext4_dx_tea_transform(buf, ext4_dx_str2hashbuf(name[i:], 4, signed))
+        hash, minor_hash = buf[0], buf[1]
+    else:
+        raise ValueError(f"unsupported directory hash version {hash_version}")
+    hash &= ~1
+    if hash == (EXT4_HTREE_EOF_32BIT << 1):
+        hash = (EXT4_HTREE_EOF_32BIT - 1) << 1
+    return hash, minor_hash
+
+#
+# Ext4 metadata checksums
+#
+# crc32c with the register exposed the way ext4_chksum() uses it: callers
+# seed with ~0 or a derived seed and no final inversion is applied
+EXT4_CRC32C_POLY = 0x82F63B78
+EXT4_CRC16_POLY = 0xA001
+# offsets of the checksum fields the checksums are computed around
+EXT4_BG_CHECKSUM_OFFSET = 0x1E
+EXT4_INODE_CHECKSUM_LO_OFFSET = 0x7C
+EXT4_INODE_CHECKSUM_HI_OFFSET = 0x82
+EXT4_XATTR_CHECKSUM_OFFSET = 0x10
+# fake dirent at the end of a leaf block holding its checksum
+EXT4_DIR_TAIL_SIZE = 12
+EXT4_DIR_TAIL_FT = 0xDE
+
+def ext4_crc_table(poly):
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ (poly if crc & 1 else 0)
+        table.append(crc)
+    return table
+
+EXT4_CRC32C_TABLE = ext4_crc_table(EXT4_CRC32C_POLY)
+EXT4_CRC16_TABLE = ext4_crc_table(EXT4_CRC16_POLY)
+
+def ext4_crc32c(crc, data):
+    # the optional crc32c package is hardware accelerated, it works on the
+    # inverted register
+    if crc32c_lib is not None:
+        return crc32c_lib.crc32c(bytes(data), crc ^ 0xFFFFFFFF) ^ 0xFFFFFFFF
+    table = EXT4_CRC32C_TABLE
+    for byte in bytes(data):
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc
+
+def ext4_crc32c_rows(crc, rows):
+    # ext4_crc32c over every row of a 2-d uint8 array at once, one table
+    # lookup per column; crc is a scalar or one seed per row
+    table = np.array(EXT4_CRC32C_TABLE, dtype=np.uint32)
+    crc = np.broadcast_to(np.asarray(crc, dtype=np.uint32), (len(rows),)).copy()
+    for column in range(rows.shape[1]):
+        crc = table[(crc ^ rows[:, column]) & 0xFF] ^ (crc >> 8)
+    return crc
+
+def ext4_crc16(crc, data):
+    # crc16 of the older gdt_csum group descriptor checksums
+    table = EXT4_CRC16_TABLE
+    for byte in bytes(data):
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc
+
+def ext4_le32(value):
+    return value.to_bytes(4, byteorder='little')
+
+def timestamp_to_utc_string(timestamp):
+    time_struct = time.gmtime(timestamp)
+    return time.strftime('%Y-%m-%d %H:%M:%S', time_struct)
+
+# Ext4 image backends
+# Every backend behaves like a read-only bytes object: self.f[a:b] returns the
+# bytes of the image between a and b, len(self.f) returns the image size.
+class Ext4Image:
+    # object exposing the buffer protocol over the whole image, if any
+    buffer = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def read(self, offset, size):
+        raise NotImplementedError
+
+    def read_blocks(self, offset, count, block_size):
+        # count consecutive blocks as separate bytes objects, shorter at the end
+        data = self.read(offset, count*block_size)
+        return [data[i:i+block_size] for i in range(0, len(data), block_size)]
+
+    def read_runs(self, runs, block_size):
+        # read_blocks() of several (offset, count) runs, backends with
+        # latency per request fetch them together
+        return [self.read_blocks(offset, count, block_size) for offset, count in runs]
+
+    def prefetch(self, offset, size):
+        # hint that offset..offset+size is about to be read piece by piece
+        pass
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            data = self.read(start, max(0, stop - start))
+            return data if step == 1 else data[::step]
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError("image index out of range")
+        return self.read(key, 1)[0]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MmapImage(Ext4Image):
+    # Default backend, pages of the image are only faulted in when touched
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.fd = open(filepath, "rb")
+        self.mm = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = self.mm
+
+    def __len__(self):
+        return len(self.mm)
+
+    def read(self, offset, size):
+        return self.mm[offset:offset+size]
+
+    def __getitem__(self, key):
+        return self.mm[key]
+
+    def close(self):
+        self.mm.close()
+        self.fd.close()
+
+
+class FileImage(Ext4Image):
+    # pread() on the image file without mapping it, for images on network or
+    # FUSE filesystems that map badly; reads go through the block cache
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.fd = os.open(filepath, os.O_RDONLY)
+        self.size = os.fstat(self.fd).st_size
+
+    def __len__(self):
+        return self.size
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        if size == 0 or offset < 0:
+            return b''
+        return os.pread(self.fd, size, offset)
+
+    def read_blocks(self, offset, count, block_size):
+        # one preadv() scattering straight into the per-block buffers
+        if not hasattr(os, 'preadv'):
+            return super().read_blocks(offset, count, block_size)
+        count = max(0, min(count, -(-(self.size - offset) // block_size)))
+        buffers = [bytearray(block_size) for _ in range(count)]
+        done = os.preadv(self.fd, buffers, offset) if count else 0
+        blocks = [bytes(buffer) for buffer in buffers[:-(-done // block_size)]]
+        if done % block_size:
+            blocks[-1] = blocks[-1][:done % block_size]
+        return blocks
+
+    def close(self):
+        os.close(self.fd)
+
+
+class MemoryImage(Ext4Image):
+    # Legacy behaviour, the whole image is read into memory
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, "rb") as f:
+            self.data = f.read()
+        self.buffer = self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def read(self, offset, size):
+        return self.data[offset:offset+size]
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+
+# Android sparse image format (libsparse sparse_format.h)
+ANDROID_SPARSE_MAGIC = 0xED26FF3A
+ANDROID_SPARSE_MAJOR_VERSION = 1
+ANDROID_SPARSE_CHUNK_TYPES = {
+    'CHUNK_TYPE_RAW'       : 0xCAC1,
+    'CHUNK_TYPE_FILL'      : 0xCAC2,
+    'CHUNK_TYPE_DONT_CARE' : 0xCAC3,
+    'CHUNK_TYPE_CRC32'     : 0xCAC4
+    }
+# bytes following the chunk header, besides the blocks of a RAW chunk
+ANDROID_SPARSE_CHUNK_PAYLOAD = {
+    ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_FILL']  : 4,
+    ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_CRC32'] : 4
+    }
+
+class SparseImage(Ext4Image):
+    # Android sparse image (simg) read in place: the chunk table is indexed
+    # once and FILL / DONT_CARE blocks are synthesized on every read, so
+    # simg2img and the raw copy it writes are not needed
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.fd = open(filepath, "rb")
+        self.mm = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.index_chunks()
+        except Exception:
+            # the mapping is not left open behind a damaged image
+            self.close()
+            raise
+
+    def index_chunks(self):
+        header = ANDROID_SPARSE_HEADER_LAYOUT.unpack(self.mm)
+        if header.magic != ANDROID_SPARSE_MAGIC:
+            raise ValueError(f"'{self.filepath}' is not an Android sparse image")
+        if header.major_version != ANDROID_SPARSE_MAJOR_VERSION:
+            raise ValueError(f"unsupported sparse image version {header.major_version}.{header.minor_version}")
+        self.block_size = header.blk_sz
+        self.size = header.total_blks * header.blk_sz
+        # (output offset, length, chunk type, file offset of the data or fill pattern)
+        self.chunks = []
+        self.crc32 = None
+        offset = header.file_hdr_sz
+        position = 0
+        for _ in range(header.total_chunks):
+            chunk = ANDROID_SPARSE_CHUNK_LAYOUT.unpack(self.mm, offset)
+            data = offset + header.chunk_hdr_sz
+            length = chunk.chunk_sz * header.blk_sz
+            # RAW chunks carry their blocks, FILL and CRC32 a 32-bit word
+            expected = header.chunk_hdr_sz + ANDROID_SPARSE_CHUNK_PAYLOAD.get(chunk.chunk_type, 0)
+            if chunk.chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_RAW']:
+                expected += length
+            if chunk.chunk_type in ANDROID_SPARSE_CHUNK_TYPES.values() and (chunk.total_sz != expected or offset + expected > len(self.mm)):
+                raise Ext4CorruptionError(f"sparse chunk at {offset:#x} holds {chunk.total_sz} bytes, expected {expected}")
+            if chunk.chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_RAW']:
+                self.chunks.append((position, length, chunk.chunk_type, data))
+            elif chunk.chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_FILL']:
+                self.chunks.append((position, length, chunk.chunk_type, bytes(self.mm[data:data+4])))
+            elif chunk.chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_DONT_CARE']:
+                self.chunks.append((position, length, chunk.chunk_type, None))
+            elif chunk.chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_CRC32']:
+                # checksum of everything so far, it maps no blocks
+                self.crc32 = int.from_bytes(self.mm[data:data+4], byteorder='little')
+                length = 0
+            else:
+                raise Ext4CorruptionError(f"unknown sparse chunk type {chunk.chunk_type:#x} at {offset:#x}")
+            position += length
+            offset += chunk.total_sz
+        if position > self.size:
+            raise Ext4CorruptionError(f"sparse chunks map {position} bytes, the header says {self.size}")
+        if position < self.size:
+            self.chunks.append((position, self.size - position, ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_DONT_CARE'], None))
+        self.chunks = [chunk for chunk in self.chunks if chunk[1]]
+        self.starts = [chunk[0] for chunk in self.chunks]
+
+    def __len__(self):
+        return self.size
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        if size == 0 or offset < 0:
+            return b''
+        index = bisect.bisect_right(self.starts, offset) - 1
+        start, length, chunk_type, source = self.chunks[index]
+        if chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_RAW'] and offset + size <= start + length:
+            # the common case, one slice of the mapped file
+            return self.mm[source+offset-start:source+offset-start+size]
+        out = bytearray()
+        end = offset + size
+        while offset < end:
+            start, length, chunk_type, source = self.chunks[index]
+            skip = offset - start
+            take = min(end, start + length) - offset
+            if chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_RAW']:
+                out += self.mm[source+skip:source+skip+take]
+            elif chunk_type == ANDROID_SPARSE_CHUNK_TYPES['CHUNK_TYPE_FILL']:
+                phase = skip % 4
+                out += (source * ((phase + take + 3) // 4))[phase:phase+take]
+            else:
+                out += bytes(take)
+            offset += take
+            index += 1
+        return bytes(out)
+
+    def close(self):
+        self.mm.close()
+        self.fd.close()
+
+
+# Compressed images are cut in units (zstd frames, gzip spans) that are
+# decompressed on first use and kept in a small LRU, a read only decompresses
+# the units it overlaps
+EXT4_COMPRESSED_CACHE_UNITS = 32
+EXT4_COMPRESSED_READ_SIZE = 1 << 20
+
+class CompressedImage(Ext4Image):
+    def __init__(self):
+        # output offset of every unit, the last entry is the image size
+        self.starts = [0]
+        self.unit_cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.starts[-1]
+
+    def decompress_unit(self, index):
+        raise NotImplementedError
+
+    def unit(self, index):
+        with self.lock:
+            data = self.unit_cache.get(index)
+            if data is not None:
+                self.unit_cache.move_to_end(index)
+                return data
+            data = self.decompress_unit(index)
+            self.unit_cache[index] = data
+            if len(self.unit_cache) > EXT4_COMPRESSED_CACHE_UNITS:
+                self.unit_cache.popitem(last=False)
+            return data
+
+    def read(self, offset, size):
+        size = max(0, min(size, len(self) - offset))
+        if size == 0 or offset < 0:
+            return b''
+        index = bisect.bisect_right(self.starts, offset) - 1
+        end = offset + size
+        parts = []
+        while offset < end:
+            start = self.starts[index]
+            data = self.unit(index)
+            take = min(end, self.starts[index+1]) - offset
+            parts.append(data[offset-start:offset-start+take])
+            offset += take
+            index += 1
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+
+# zstd seekable format (zstd contrib/seekable_format): independent frames and
+# a seek table in a trailing skippable frame
+ZSTD_FRAME_MAGIC = 0xFD2FB528
+ZSTD_SEEKABLE_MAGIC = 0x8F92EAB1
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A5E
+ZSTD_SEEK_TABLE_FOOTER_SIZE = 9
+ZSTD_SEEK_TABLE_CHECKSUM_FLAG = 0x80
+
+class ZstdImage(CompressedImage):
+    # every read decompresses only the seekable frames it overlaps
+    def __init__(self, filepath):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required for zstd compressed images")
+        super().__init__()
+        self.filepath = filepath
+        self.fd = open(filepath, "rb")
+        self.dctx = zstandard.ZstdDecompressor()
+        file_size = os.fstat(self.fd.fileno()).st_size
+        footer = os.pread(self.fd.fileno(), ZSTD_SEEK_TABLE_FOOTER_SIZE, file_size - ZSTD_SEEK_TABLE_FOOTER_SIZE)
+        frames, descriptor, magic = struct.unpack('<IBI', footer) if len(footer) == ZSTD_SEEK_TABLE_FOOTER_SIZE else (0, 0, 0)
+        if magic != ZSTD_SEEKABLE_MAGIC:
+            self.close()
+            raise ValueError(f"'{filepath}' has no zstd seek table, recompress it with 'zstd --seekable' or t2sz")
+        entry_size = 12 if descriptor & ZSTD_SEEK_TABLE_CHECKSUM_FLAG else 8
+        table_size = frames * entry_size
+        table_offset = file_size - ZSTD_SEEK_TABLE_FOOTER_SIZE - table_size
+        skippable_magic, frame_size = struct.unpack('<II', os.pread(self.fd.fileno(), 8, table_offset - 8))
+        if skippable_magic != ZSTD_SKIPPABLE_MAGIC or frame_size != table_size + ZSTD_SEEK_TABLE_FOOTER_SIZE:
+            self.close()
+            raise Ext4CorruptionError(f"zstd seek table of '{filepath}' is damaged")
+        table = os.pread(self.fd.fileno(), table_size, table_offset)
+        # compressed offset of every frame, output offsets go to self.starts
+        self.frame_offsets = [0]
+        for entry in range(frames):
+            compressed, decompressed = struct.unpack_from('<II', table, entry*entry_size)
+            self.frame_offsets.append(self.frame_offsets[-1] + compressed)
+            self.starts.append(self.starts[-1] + decompressed)
+        if self.frame_offsets[-1] > table_offset - 8:
+            self.close()
+            raise Ext4CorruptionError(f"zstd seek table of '{filepath}' points past the frames")
+
+    def decompress_unit(self, index):
+        start = self.frame_offsets[index]
+        frame = os.pread(self.fd.fileno(), self.frame_offsets[index+1] - start, start)
+        size = self.starts[index+1] - self.starts[index]
+        data = self.dctx.decompress(frame, max_output_size=size)
+        if len(data) != size:
+            raise Ext4CorruptionError(f"zstd frame {index} gives {len(data)} bytes, the seek table says {size}")
+        return data
+
+    def close(self):
+        self.fd.close()
+
+
+# gzip: the seek index is built on the first open and saved, by default in
+# the user's cache directory (evidence stores are often read-only). With
+# indexed_gzip it is a zran index; without it, Python's zlib cannot resume
+# at a bit offset, so only gzip member starts (bgzip, pigz --independent)
+# are saved, and inflate states are checkpointed in memory while reading
+GZIP_MAGIC = b'\x1f\x8b'
+EXT4_GZIP_INDEX_SUFFIX = '.gzidx'
+EXT4_GZIP_POINTS_SUFFIX = '.gzpoints'
+EXT4_GZIP_POINTS_VERSION = 1
+EXT4_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'ext4parser')
+# zran index points hold a compressed 32 KiB window each and can be dense,
+# in-memory checkpoints hold a whole inflate state and are kept sparse;
+# past EXT4_GZIP_MAX_CHECKPOINTS of them the spacing is doubled instead
+EXT4_GZIP_INDEX_SPACING = 4 << 20
+EXT4_GZIP_CHECKPOINT_SPACING = 32 << 20
+EXT4_GZIP_MAX_CHECKPOINTS = 256
+EXT4_GZIP_UNIT_SIZE = 1 << 20
+
+def ext4_cache_path(filepath, suffix):
+    # file in EXT4_CACHE_DIR for this version of the image
+    info = os.stat(filepath)
+    key = hashlib.sha256(f"{os.path.realpath(filepath)}:{info.st_size}:{info.st_mtime_ns}".encode()).hexdigest()[:32]
+    return os.path.join(EXT4_CACHE_DIR, f"{key}{suffix}")
+
+class GzipCursor:
+    # inflate state somewhere in a (multi-member) gzip stream; members, when
+    # a list, collects (input, output) offsets of the members started
+    def __init__(self, fd, decompressor, in_pos=0, out_pos=0, pending=b'', members=None):
+        self.fd = fd
+        self.decompressor = decompressor
+        self.in_pos = in_pos
+        self.out_pos = out_pos
+        self.pending = pending
+        self.members = members
+
+    def copy(self):
+        return GzipCursor(self.fd, self.decompressor.copy(), self.in_pos, self.out_pos, self.pending)
+
+    def read(self, size):
+        # up to size bytes of output, less only at the end of the stream
+        parts = []
+        while size > 0:
+            if self.decompressor.eof:
+                # the member is done, zero padding is skipped and anything
+                # else starts the next member of a concatenated gzip
+                if not self.pending:
+                    self.pending = os.pread(self.fd, EXT4_COMPRESSED_READ_SIZE, self.in_pos)
+                    if not self.pending:
+                        break
+                data = self.pending.lstrip(b'\x00')
+                self.in_pos += len(self.pending) - len(data)
+                self.pending = data
+                if not data:
+                    continue
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                if self.members is not None:
+                    self.members.append((self.in_pos, self.out_pos))
+            if not self.pending:
+                self.pending = os.pread(self.fd, EXT4_COMPRESSED_READ_SIZE, self.in_pos)
+                if not self.pending:
+                    break
+            data = self.pending
+            out = self.decompressor.decompress(data, size)
+            self.pending = self.decompressor.unconsumed_tail
+            if self.decompressor.eof:
+                self.pending = self.decompressor.unused_data
+            self.in_pos += len(data) - len(self.pending)
+            self.out_pos += len(out)
+            size -= len(out)
+            parts.append(out)
+            if not out and not self.decompressor.eof and self.pending == data:
+                raise Ext4CorruptionError(f"gzip stream stalls at byte {self.in_pos}")
+        return b''.join(parts)
+
+class GzipImage(CompressedImage):
+    def __init__(self, filepath, spacing=None, index_path=None):
+        super().__init__()
+        self.filepath = filepath
+        self.gz = None
+        if indexed_gzip is not None:
+            index_path = index_path or ext4_cache_path(filepath, EXT4_GZIP_INDEX_SUFFIX)
+            self.gz = indexed_gzip.IndexedGzipFile(os.fspath(filepath), spacing=spacing or EXT4_GZIP_INDEX_SPACING)
+            if not self.import_zran_index(index_path):
+                self.gz.build_full_index()
+                self.save_index(index_path, self.gz.export_index)
+            self.starts.append(self.gz.seek(0, os.SEEK_END))
+            return
+        index_path = index_path or ext4_cache_path(filepath, EXT4_GZIP_POINTS_SUFFIX)
+        self.fd = os.open(filepath, os.O_RDONLY)
+        self.spacing = spacing or EXT4_GZIP_CHECKPOINT_SPACING
+        self.cursor = None
+        info = os.fstat(self.fd)
+        points = self.load_points(index_path, info)
+        if points is not None:
+            size, members = points
+            self.checkpoints = [GzipCursor(self.fd, zlib.decompressobj(16 + zlib.MAX_WBITS), in_pos, out_pos) for in_pos, out_pos in members]
+        else:
+            # one inflating pass, keeping a copy of the state every spacing
+            # bytes and noting where members start
+            started = []
+            cursor = GzipCursor(self.fd, zlib.decompressobj(16 + zlib.MAX_WBITS), members=started)
+            self.checkpoints = [cursor.copy()]
+            while cursor.read(EXT4_COMPRESSED_READ_SIZE):
+                if cursor.out_pos - self.checkpoints[-1].out_pos < self.spacing:
+                    continue
+                self.checkpoints.append(cursor.copy())
+                if len(self.checkpoints) > EXT4_GZIP_MAX_CHECKPOINTS:
+                    # over budget: every other state goes, twice as far apart
+                    self.checkpoints = self.checkpoints[::2]
+                    self.spacing *= 2
+            size = cursor.out_pos
+            members = [(0, 0)]
+            for in_pos, out_pos in started:
+                if out_pos - members[-1][1] >= EXT4_GZIP_INDEX_SPACING:
+                    members.append((in_pos, out_pos))
+            document = {'version': EXT4_GZIP_POINTS_VERSION, 'source_size': info.st_size, 'source_mtime_ns': info.st_mtime_ns, 'size': size, 'members': members}
+            self.save_index(index_path, lambda path: Path(path).write_text(json.dumps(document)))
+            if len(members) > 1:
+                # member starts are exact, the inflate states between them
+                # are only worth keeping when the members are far apart
+                self.checkpoints = sorted(self.checkpoints + [GzipCursor(self.fd, zlib.decompressobj(16 + zlib.MAX_WBITS), in_pos, out_pos) for in_pos, out_pos in members[1:]], key=lambda checkpoint: checkpoint.out_pos)
+        self.checkpoint_starts = [checkpoint.out_pos for checkpoint in self.checkpoints]
+        # member starts are cheap fresh states, only copied ones count
+        self.states = len(self.checkpoints) - len(members) + 1
+        self.starts = list(range(0, size, EXT4_GZIP_UNIT_SIZE)) + [size]
+
+    def import_zran_index(self, index_path):
+        if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(self.filepath):
+            return False
+        try:
+            self.gz.import_index(index_path)
+        except Exception:
+            # written by the other code path, or damaged: built again
+            return False
+        return True
+
+    def load_points(self, index_path, info):
+        try:
+            document = json.loads(Path(index_path).read_text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(document, dict) or document.get('version') != EXT4_GZIP_POINTS_VERSION:
+            return None
+        if document.get('source_size') != info.st_size or document.get('source_mtime_ns') != info.st_mtime_ns:
+            return None
+        return document['size'], [tuple(member) for member in document['members']]
+
+    def save_index(self, index_path, write):
+        # written aside and renamed, a failure only costs the next open a rebuild
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            partial = f"{index_path}.{os.getpid()}.tmp"
+            write(partial)
+            os.replace(partial, index_path)
+        except OSError:
+            pass
+
+    def read(self, offset, size):
+        if self.gz is None:
+            return super().read(offset, size)
+        with self.lock:
+            self.gz.seek(offset)
+            return self.gz.read(max(0, min(size, len(self) - offset)))
+
+    def remember(self, cursor):
+        # in-memory checkpoint when the cursor got far enough from the last one
+        if self.states >= EXT4_GZIP_MAX_CHECKPOINTS:
+            return
+        index = bisect.bisect_right(self.checkpoint_starts, cursor.out_pos)
+        if cursor.out_pos - self.checkpoint_starts[index-1] >= self.spacing and (index == len(self.checkpoint_starts) or self.checkpoint_starts[index] - cursor.out_pos >= self.spacing):
+            self.checkpoints.insert(index, cursor.copy())
+            self.checkpoint_starts.insert(index, cursor.out_pos)
+            self.states += 1
+
+    def decompress_unit(self, index):
+        start = self.starts[index]
+        # keep inflating forward from the last read when it is close behind,
+        # otherwise restart at the nearest checkpoint
+        cursor = self.cursor
+        checkpoint = self.checkpoints[bisect.bisect_right(self.checkpoint_starts, start) - 1]
+        if cursor is None or cursor.out_pos > start or cursor.out_pos < checkpoint.out_pos:
+            cursor = checkpoint.copy()
+        while cursor.out_pos < start:
+            cursor.read(min(EXT4_COMPRESSED_READ_SIZE, start - cursor.out_pos))
+            self.remember(cursor)
+        data = cursor.read(self.starts[index+1] - start)
+        self.remember(cursor)
+        self.cursor = cursor
+        return data
+
+    def close(self):
+        if self.gz is not None:
+            self.gz.close()
+        else:
+            os.close(self.fd)
+
+
+class WindowImage(Ext4Image):
+    # one filesystem inside a bigger image (a partition of a disk dump),
+    # offsets are relative to its start and the buffer is a zero-copy
+    # memoryview of the base image's one
+    def __init__(self, base, offset, size=None, owns_base=False):
+        self.base = base
+        self.offset = offset
+        self.owns_base = owns_base
+        self.size = max(0, len(base) - offset)
+        if size is not None:
+            self.size = min(self.size, size)
+        if base.buffer is not None:
+            self.buffer = memoryview(base.buffer)[offset:offset+self.size]
+
+    def __len__(self):
+        return self.size
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        if size == 0 or offset < 0:
+            return b''
+        return self.base.read(self.offset + offset, size)
+
+    def read_blocks(self, offset, count, block_size):
+        return self.read_runs([(offset, count)], block_size)[0]
+
+    def read_runs(self, runs, block_size):
+        runs = [(offset, max(0, min(count, -(-(self.size - offset) // block_size)))) for offset, count in runs]
+        results = self.base.read_runs([(self.offset + offset, count) for offset, count in runs], block_size)
+        for (offset, count), blocks in zip(runs, results):
+            if blocks and offset + len(blocks)*block_size > self.size:
+                blocks[-1] = blocks[-1][:self.size - offset - (len(blocks)-1)*block_size]
+        return results
+
+    def prefetch(self, offset, size):
+        self.base.prefetch(self.offset + offset, size)
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+        if self.owns_base:
+            self.base.close()
+
+
+# Block cache for the backends that are not simply memory (pread, sparse,
+# compressed, partitions of those): filesystem blocks are kept in an LRU
+# bounded by a byte budget, misses following the previous miss grow a
+# read-ahead window and every miss run is fetched with one read_blocks()
+EXT4_BLOCK_CACHE_BYTES = 64 << 20
+EXT4_CACHE_BLOCK_SIZE = 4096
+EXT4_CACHE_READAHEAD_MAX = 64
+# preadv() takes at most IOV_MAX (1024) buffers
+EXT4_CACHE_BATCH_BLOCKS = 256
+
+class CachedImage(Ext4Image):
+    def __init__(self, base, budget=EXT4_BLOCK_CACHE_BYTES, block_size=EXT4_CACHE_BLOCK_SIZE, owns_base=True):
+        self.base = base
+        self.budget = budget
+        self.owns_base = owns_base
+        self.size = len(base)
+        self.blocks = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.readahead = 0
+        self.evictions = 0
+        self.set_block_size(block_size)
+
+    def set_block_size(self, block_size):
+        # cache in filesystem blocks once the superblock says how big they are
+        self.block_size = block_size
+        self.capacity = max(1, self.budget // block_size)
+        # reads bigger than this would flush most of the cache, they go around it
+        self.bypass = max(1, self.capacity // 8)
+        self.blocks.clear()
+        self.next_block = None
+        self.window = 0
+
+    def __len__(self):
+        return self.size
+
+    def stats(self):
+        return {
+            'hits'       : self.hits,
+            'misses'     : self.misses,
+            'readahead'  : self.readahead,
+            'evictions'  : self.evictions,
+            'blocks'     : len(self.blocks),
+            'block_size' : self.block_size,
+            'budget'     : self.budget
+            }
+
+    def load(self, first, last):
+        # make blocks first..last resident, counting hits and misses
+        blocks = self.blocks
+        missing = []
+        for block in range(first, last + 1):
+            if block in blocks:
+                blocks.move_to_end(block)
+                self.hits += 1
+            else:
+                missing.append(block)
+        if not missing:
+            return
+        self.misses += len(missing)
+        # a miss right where the last fetch ended is a sequential run
+        if missing[0] == self.next_block:
+            self.window = min(max(1, self.window * 2), EXT4_CACHE_READAHEAD_MAX)
+        else:
+            self.window = 0
+        runs = []
+        for block in missing:
+            if runs and runs[-1][1] == block:
+                runs[-1][1] += 1
+            else:
+                runs.append([block, block + 1])
+        end = min(runs[-1][1] + self.window, -(-self.size // self.block_size), runs[-1][0] + self.capacity)
+        while runs[-1][1] < end and runs[-1][1] not in blocks:
+            runs[-1][1] += 1
+            self.readahead += 1
+        self.next_block = runs[-1][1]
+        batches = [(batch, min(EXT4_CACHE_BATCH_BLOCKS, stop - batch)) for start, stop in runs for batch in range(start, stop, EXT4_CACHE_BATCH_BLOCKS)]
+        # all runs in one call, remote backends coalesce and overlap them
+        results = self.base.read_runs([(batch * self.block_size, count) for batch, count in batches], self.block_size)
+        for (batch, _), data in zip(batches, results):
+            for block, block_data in enumerate(data, batch):
+                blocks[block] = block_data
+        while len(blocks) > self.capacity:
+            blocks.popitem(last=False)
+            self.evictions += 1
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        if size == 0 or offset < 0:
+            return b''
+        block_size = self.block_size
+        first = offset // block_size
+        last = (offset + size - 1) // block_size
+        if last - first >= self.bypass:
+            return self.base.read(offset, size)
+        with self.lock:
+            data = self.blocks.get(first)
+            if data is not None and first == last:
+                # the common case, a small field inside one resident block
+                self.blocks.move_to_end(first)
+                self.hits += 1
+            else:
+                self.load(first, last)
+                data = self.blocks[first]
+            start = offset - first * block_size
+            if first == last:
+                return data[start:start+size]
+            data = b''.join([data[start:]] + [self.blocks[block] for block in range(first + 1, last + 1)])
+            return data[:size]
+
+    def prefetch(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        if size == 0 or offset < 0:
+            return
+        first = offset // self.block_size
+        last = min((offset + size - 1) // self.block_size, first + self.bypass - 1)
+        with self.lock:
+            self.load(first, last)
+
+    def close(self):
+        self.blocks.clear()
+        if self.owns_base:
+            self.base.close()
+
+
+# Remote images over HTTP(S) range requests: keep-alive connections are
+# pooled, the block cache above hands over all its miss runs at once and
+# runs with small gaps between them go out as one request, separate
+# requests and the parts of big reads are in flight in parallel
+EXT4_HTTP_SCHEMES = ('http://', 'https://')
+EXT4_HTTP_CONNECTIONS = 4
+EXT4_HTTP_TIMEOUT = 60
+EXT4_HTTP_RETRIES = 3
+EXT4_HTTP_COALESCE_GAP = 64 << 10
+EXT4_HTTP_PART_SIZE = 8 << 20
+
+def ext4_is_url(path):
+    return isinstance(path, str) and path.lower().startswith(EXT4_HTTP_SCHEMES)
+
+class HttpImage(Ext4Image):
+    def __init__(self, url, connections=EXT4_HTTP_CONNECTIONS):
+        if not ext4_is_url(url):
+            raise ValueError(f"the http backend needs an http:// or https:// URL, not '{url}'")
+        self.filepath = url
+        parts = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme.lower() == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.headers = {}
+        if parts.username is not None:
+            credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+            self.headers['Authorization'] = f"Basic {base64.b64encode(credentials.encode()).decode()}"
+        self.connections = max(1, connections)
+        # idle keep-alive connections, the semaphore caps the open ones
+        self.pool = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(self.connections)
+        self.executor = None
+        self.requests = 0
+        self.transferred = 0
+        self.counter_lock = threading.Lock()
+        status, headers, _ = self.request({'Range': 'bytes=0-0'})
+        content_range = headers.get('Content-Range', '')
+        total = content_range.rpartition('/')[2]
+        if status != 206 or not total.isdigit():
+            self.close()
+            raise ValueError(f"'{url}' does not serve byte ranges (HTTP {status})")
+        self.size = int(total)
+        # a changed object must fail the reads instead of mixing two versions
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            self.headers['If-Match'] = etag
+
+    def __len__(self):
+        return self.size
+
+    def request(self, headers):
+        # one GET on a pooled connection, stale keep-alive connections are
+        # replaced and the request retried
+        headers = {**self.headers, **headers}
+        with self.slots:
+            for attempt in range(EXT4_HTTP_RETRIES):
+                try:
+                    connection = self.pool.get_nowait()
+                except queue.Empty:
+                    connection = self.connection_class(self.host, self.port, timeout=EXT4_HTTP_TIMEOUT)
+                try:
+                    connection.request('GET', self.target, headers=headers)
+                    response = connection.getresponse()
+                    # anything but a range answer (a server ignoring Range
+                    # sends the whole image) is not read, the connection goes
+                    body = response.read() if response.status == 206 else b''
+                except (http.client.HTTPException, OSError):
+                    connection.close()
+                    if attempt == EXT4_HTTP_RETRIES - 1:
+                        raise
+                    continue
+                if response.will_close or response.status != 206:
+                    connection.close()
+                else:
+                    self.pool.put(connection)
+                with self.counter_lock:
+                    self.requests += 1
+                    self.transferred += len(body)
+                return response.status, response.headers, body
+
+    def fetch(self, offset, size):
+        status, headers, body = self.request({'Range': f"bytes={offset}-{offset+size-1}"})
+        if status == 412:
+            raise RuntimeError(f"'{self.filepath}' changed on the server while it was being read")
+        if status != 206:
+            raise RuntimeError(f"range {offset}-{offset+size-1} of '{self.filepath}' failed with HTTP {status}")
+        if not headers.get('Content-Range', '').startswith(f"bytes {offset}-") or len(body) != size:
+            raise Ext4CorruptionError(f"range {offset}-{offset+size-1} of '{self.filepath}' came back as '{headers.get('Content-Range')}' with {len(body)} bytes")
+        return body
+
+    def fetch_all(self, ranges):
+        # several ranges, in flight together when there is more than one
+        if len(ranges) < 2 or self.connections < 2:
+            return [self.fetch(offset, size) for offset, size in ranges]
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.connections)
+        return list(self.executor.map(lambda extent: self.fetch(*extent), ranges))
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        if size == 0 or offset < 0:
+            return b''
+        parts = [(start, min(EXT4_HTTP_PART_SIZE, offset + size - start)) for start in range(offset, offset + size, EXT4_HTTP_PART_SIZE)]
+        data = self.fetch_all(parts)
+        return data[0] if len(data) == 1 else b''.join(data)
+
+    def read_runs(self, runs, block_size):
+        extents = []
+        for offset, count in runs:
+            size = max(0, min(count*block_size, self.size - offset))
+            extents.append((offset, size if offset >= 0 else 0))
+        # coalesce runs closer than EXT4_HTTP_COALESCE_GAP into one request
+        merged = []
+        for offset, size in sorted(extent for extent in extents if extent[1]):
+            if merged and offset <= merged[-1][1] + EXT4_HTTP_COALESCE_GAP:
+                merged[-1][1] = max(merged[-1][1], offset + size)
+            else:
+                merged.append([offset, offset + size])
+        bodies = self.fetch_all([(start, end - start) for start, end in merged])
+        starts = [start for start, _ in merged]
+        results = []
+        for offset, size in extents:
+            if not size:
+                results.append([])
+                continue
+            index = bisect.bisect_right(starts, offset) - 1
+            data = memoryview(bodies[index])[offset-starts[index]:offset-starts[index]+size]
+            results.append([bytes(data[i:i+block_size]) for i in range(0, size, block_size)])
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+EXT4_IMAGE_BACKENDS = {
+    'mmap'   : MmapImage,
+    'pread'  : FileImage,
+    'memory' : MemoryImage,
+    'sparse' : SparseImage,
+    'zstd'   : ZstdImage,
+    'gzip'   : GzipImage,
+    'http'   : HttpImage
+    }
+
+# container formats recognised by their first bytes, opened with their own
+# backend whatever backend was asked for
+EXT4_IMAGE_MAGICS = {
+    ANDROID_SPARSE_MAGIC.to_bytes(4, byteorder='little') : 'sparse',
+    ZSTD_FRAME_MAGIC.to_bytes(4, byteorder='little')     : 'zstd',
+    GZIP_MAGIC                                           : 'gzip'
+    }
+
+def ext4_image_format(filepath):
+    try:
+        with open(filepath, "rb") as f:
+            head = f.read(max(len(magic) for magic in EXT4_IMAGE_MAGICS))
+    except OSError:
+        return None
+    for magic, backend in EXT4_IMAGE_MAGICS.items():
+        if head.startswith(magic):
+            return backend
+    return None
+
+def open_ext4_image(filepath, backend=None):
+    # without a backend one is picked: http for URLs, the container format
+    # from the first bytes, mmap for a raw image; a named one is used as is
+    if isinstance(backend, Ext4Image):
+        return backend
+    if callable(backend):
+        # a backend class or a partial of one, e.g. GzipImage with index_path
+        return backend(filepath)
+    if backend is None:
+        backend = 'http' if ext4_is_url(filepath) else ext4_image_format(filepath) or 'mmap'
+    if backend not in EXT4_IMAGE_BACKENDS:
+        raise ValueError(f"Unknown image backend '{backend}', choose from {', '.join(EXT4_IMAGE_BACKENDS)}")
+    if ext4_is_url(filepath) and backend != 'http':
+        raise ValueError(f"'{filepath}' is a URL, it can only be read with the http backend")
+    return EXT4_IMAGE_BACKENDS[backend](filepath)
+
+# Ext4 on-disk record layouts
+# Each layout is a precompiled little-endian struct, a whole record is decoded
+# with a single unpack_from() into an immutable namedtuple record. as_dict()
+# gives back the dict shape used by the ext4_* attributes of Ext4Parser.
+class Ext4Layout:
+    def __init__(self, name, fields, converters=None, byteorder='<'):
+        self.names = tuple(field[0] for field in fields)
+        self.struct = struct.Struct(byteorder + ''.join(field[1] for field in fields))
+        self.size = self.struct.size
+        self.record = namedtuple(name, self.names)
+        self.converters = converters or {}
+
+    def unpack(self, buf, offset=0):
+        src = getattr(buf, 'buffer', buf)
+        if src is not None and offset >= 0:
+            try:
+                return self.record._make(self.struct.unpack_from(src, offset))
+            except struct.error:
+                pass
+        # short read at the end of the image, missing bytes read as zero
+        data = bytes(buf[max(offset, 0):max(offset, 0)+self.size]).ljust(self.size, b'\x00')
+        return self.record._make(self.struct.unpack(data))
+
+    def as_dict(self, record):
+        fields = record._asdict()
+        for key, convert in self.converters.items():
+            fields[key] = convert(fields[key])
+        return fields
+
+    def unpack_dict(self, buf, offset=0):
+        return self.as_dict(self.unpack(buf, offset))
+
+
+def ext4_bytes_to_int(data):
+    return int.from_bytes(data, byteorder='little')
+
+def ext4_bytes_to_str(data):
+    return data.decode('utf-8', errors='replace').rstrip('\x00')
+
+def ext4_bytes_to_u32_list(data):
+    return list(struct.unpack(f'<{len(data)//4}I', data))
+
+EXT4_SUPERBLOCK_LAYOUT = Ext4Layout('Ext4SuperBlock', (
+    ('sb_inodes_count'           , 'I'),     # 0x00
+    ('sb_blocks_count_lo'        , 'I'),     # 0x04
+    ('sb_r_blocks_count_lo'      , 'I'),     # 0x08
+    ('sb_free_blocks_count_lo'   , 'I'),     # 0x0C
+    ('sb_free_inodes_count'      , 'I'),     # 0x10
+    ('sb_first_data_block'       , 'I'),     # 0x14
+    ('sb_log_block_size'         , 'I'),     # 0x18
+    ('sb_obso_log_frag_size'     , 'I'),     # 0x1C
+    ('sb_blocks_per_group'       , 'I'),     # 0x20
+    ('sb_obso_frags_per_group'   , 'I'),     # 0x24
+    ('sb_inodes_per_group'       , 'I'),     # 0x28
+    ('sb_mtime'                  , 'I'),     # 0x2C
+    ('sb_wtime'                  , 'I'),     # 0x30
+    ('sb_mnt_count'              , 'H'),     # 0x34
+    ('sb_max_mnt_count'          , 'H'),     # 0x36
+    ('sb_magic'                  , 'H'),     # 0x38
+    ('sb_state'                  , 'H'),     # 0x3A
+    ('sb_errors'                 , 'H'),     # 0x3C
+    ('sb_minor_rev_level'        , 'H'),     # 0x3E
+    ('sb_lastcheck'              , 'I'),     # 0x40
+    ('sb_checkinterval'          , 'I'),     # 0x44
+    ('sb_creator_os'             , 'I'),     # 0x48
+    ('sb_rev_level'              , 'I'),     # 0x4C
+    ('sb_def_resuid'             , 'H'),     # 0x50
+    ('sb_def_resgid'             , 'H'),     # 0x52
+    ('sb_first_ino'              , 'I'),     # 0x54
+    ('sb_inode_size'             , 'H'),     # 0x58
+    ('sb_block_group_nr'         , 'H'),     # 0x5A
+    ('sb_feature_compat'         , 'I'),     # 0x5C
+    ('sb_feature_incompat'       , 'I'),     # 0x60
+    ('sb_feature_ro_compat'      , 'I'),     # 0x64
+    ('sb_uuid'                   , '16s'),   # 0x68
+    ('sb_volume_name'            , '16s'),   # 0x78
+    ('sb_last_mounted'           , '64s'),   # 0x88
+    ('sb_algorithm_usage_bitmap' , 'I'),     # 0xC8
+    ('sb_prealloc_blocks'        , 'B'),     # 0xCC
+    ('sb_prealloc_dir_blocks'    , 'B'),     # 0xCD
+    ('sb_reserved_gdt_blocks'    , 'H'),     # 0xCE
+    ('sb_journal_uuid'           , '16s'),   # 0xD0
+    ('sb_journal_inum'           , 'I'),     # 0xE0
+    ('sb_journal_dev'            , 'I'),     # 0xE4
+    ('sb_last_orphan'            , 'I'),     # 0xE8
+    ('sb_hash_seed'              , '16s'),   # 0xEC
+    ('sb_def_hash_version'       , 'B'),     # 0xFC
+    ('sb_reserved_char_pad'      , 'B'),     # 0xFD
+    ('sb_desc_size'              , 'H'),     # 0xFE
+    ('sb_default_mount_opts'     , 'I'),     # 0x100
+    ('sb_first_meta_bg'          , 'I'),     # 0x104
+    ('sb_mkfs_time'              , 'I'),     # 0x108
+    ('sb_jnl_blocks'             , '68s'),   # 0x10C
+    ('sb_blocks_count_hi'        , 'I'),     # 0x150
+    ('sb_r_blocks_count_hi'      , 'I'),     # 0x154
+    ('sb_free_blocks_count_hi'   , 'I'),     # 0x158
+    ('sb_min_extra_isize'        , 'H'),     # 0x15C
+    ('sb_want_extra_isize'       , 'H'),     # 0x15E
+    ('sb_flags'                  , 'I'),     # 0x160
+    ('sb_raid_stride'            , 'H'),     # 0x164
+    ('sb_mmp_interval'           , 'H'),     # 0x166
+    ('sb_mmp_block'              , 'Q'),     # 0x168
+    ('sb_raid_stripe_width'      , 'I'),     # 0x170
+    ('sb_log_groups_per_flex'    , 'B'),     # 0x174
+    ('sb_reserved_char_pad2'     , 'B'),     # 0x175
+    ('sb_reserved_pad'           , '2s'),    # 0x176
+    ('sb_kbytes_written'         , 'Q'),     # 0x178
+    ('sb_reserved'               , '640s'),  # 0x180
+    ), {
+    'sb_uuid'         : bytes.hex,
+    'sb_volume_name'  : ext4_bytes_to_str,
+    'sb_last_mounted' : ext4_bytes_to_str,
+    'sb_journal_uuid' : bytes.hex,
+    'sb_hash_seed'    : ext4_bytes_to_int,
+    'sb_jnl_blocks'   : ext4_bytes_to_int,
+    'sb_reserved_pad' : bytes.hex,
+    'sb_reserved'     : bytes.hex,
+    })
+
+EXT4_GROUP_DESC_FIELDS = (
+    ('bg_block_bitmap_lo'        , 'I'),     # 0x00
+    ('bg_inode_bitmap_lo'        , 'I'),     # 0x04
+    ('bg_inode_table_lo'         , 'I'),     # 0x08
+    ('bg_free_blocks_count_lo'   , 'H'),     # 0x0C
+    ('bg_free_inodes_count_lo'   , 'H'),     # 0x0E
+    ('bg_used_dirs_count_lo'     , 'H'),     # 0x10
+    ('bg_flags'                  , 'H'),     # 0x12
+    ('bg_exclude_bitmap_lo'      , 'I'),     # 0x14
+    ('bg_reserved1'              , 'I'),     # 0x18
+    ('bg_itable_unused_lo'       , 'H'),     # 0x1C
+    ('bg_checksum'               , 'H'),     # 0x1E
+    )
+# if EXT4_FEATURE_INCOMPAT_64BIT and 'sb_desc_size' > 32
+EXT4_GROUP_DESC_64_FIELDS = (
+    ('bg_block_bitmap_hi'        , 'I'),     # 0x20
+    ('bg_inode_bitmap_hi'        , 'I'),     # 0x24
+    ('bg_inode_table_hi'         , 'I'),     # 0x28
+    ('bg_free_blocks_count_hi'   , 'H'),     # 0x2C
+    ('bg_free_inodes_count_hi'   , 'H'),     # 0x2E
+    ('bg_used_dirs_count_hi'     , 'H'),     # 0x30
+    ('bg_itable_unused_hi'       , 'H'),     # 0x32
+    ('bg_exclude_bitmap_hi'      , 'I'),     # 0x34
+    ('bg_reserved2'              , 'I'),     # 0x38
+    ('bg_reserved3'              , 'I'),     # 0x3C
+    )
+EXT4_GROUP_DESC_LAYOUT = Ext4Layout('Ext4GroupDescriptor32', EXT4_GROUP_DESC_FIELDS)
+EXT4_GROUP_DESC_64_LAYOUT = Ext4Layout('Ext4GroupDescriptor', EXT4_GROUP_DESC_FIELDS + EXT4_GROUP_DESC_64_FIELDS)
+
+EXT4_INODE_FIELDS = (
+    ('i_mode'                    , 'H'),     # 0x00
+    ('i_uid'                     , 'H'),     # 0x02
+    ('i_size_lo'                 , 'I'),     # 0x04
+    ('i_atime'                   , 'I'),     # 0x08
+    ('i_ctime'                   , 'I'),     # 0x0C
+    ('i_mtime'                   , 'I'),     # 0x10
+    ('i_dtime'                   , 'I'),     # 0x14
+    ('i_gid'                     , 'H'),     # 0x18
+    ('i_links_count'             , 'H'),     # 0x1A
+    ('i_blocks_lo'               , 'I'),     # 0x1C
+    ('i_flags'                   , 'I'),     # 0x20
+    ('i_osd1'                    , '4s'),    # 0x24
+    ('i_block'                   , '60s'),   # 0x28
+    ('i_generation'              , 'I'),     # 0x64
+    ('i_file_acl_lo'             , 'I'),     # 0x68
+    ('i_size_high'               , 'I'),     # 0x6C
+    ('i_obso_faddr'              , 'I'),     # 0x70
+    ('l_i_blocks_high'           , 'H'),     # 0x74
+    ('l_i_file_acl_high'         , 'H'),     # 0x76
+    ('l_i_uid_high'              , 'H'),     # 0x78
+    ('l_i_gid_high'              , 'H'),     # 0x7A
+    ('l_i_checksum_lo'           , 'H'),     # 0x7C
+    ('l_i_reserved'              , 'H'),     # 0x7E
+    )
+# only present when 'sb_inode_size' > EXT4_INODE_ENTRY_SZ
+EXT4_INODE_EXTRA_FIELDS = (
+    ('l_i_extra_isize'           , 'H'),     # 0x80
+    ('l_i_checksum_hi'           , 'H'),     # 0x82
+    ('l_i_ctime_extra'           , 'I'),     # 0x84
+    ('l_i_mtime_extra'           , 'I'),     # 0x88
+    ('l_i_atime_extra'           , 'I'),     # 0x8C
+    ('l_i_crtime'                , 'I'),     # 0x90
+    ('l_i_crtime_extra'          , 'I'),     # 0x94
+    ('l_i_version_hi'            , 'I'),     # 0x98
+    ('l_i_projid'                , 'I'),     # 0x9C
+    )
+EXT4_INODE_CONVERTERS = {
+    'i_osd1'  : bytes.hex,
+    'i_block' : ext4_bytes_to_u32_list,
+    }
+EXT4_INODE_BASE_LAYOUT = Ext4Layout('Ext4Inode128', EXT4_INODE_FIELDS, EXT4_INODE_CONVERTERS)
+EXT4_INODE_LAYOUT = Ext4Layout('Ext4Inode', EXT4_INODE_FIELDS + EXT4_INODE_EXTRA_FIELDS, EXT4_INODE_CONVERTERS)
+
+EXT4_EXTENT_HEADER_LAYOUT = Ext4Layout('Ext4ExtentHeader', (
+    ('eh_magic'                  , 'H'),     # 0x00
+    ('eh_entries'                , 'H'),     # 0x02
+    ('eh_max'                    , 'H'),     # 0x04
+    ('eh_depth'                  , 'H'),     # 0x06
+    ('eh_generation'             , 'I'),     # 0x08
+    ))
+
+EXT4_EXTENT_LAYOUT = Ext4Layout('Ext4Extent', (
+    ('ee_block'                  , 'I'),     # 0x00
+    ('ee_len'                    , 'H'),     # 0x04
+    ('ee_start_hi'               , 'H'),     # 0x06
+    ('ee_start_lo'               , 'I'),     # 0x08
+    ))
+
+EXT4_EXTENT_IDX_LAYOUT = Ext4Layout('Ext4ExtentIdx', (
+    ('ei_block'                  , 'I'),     # 0x00
+    ('ei_leaf_lo'                , 'I'),     # 0x04
+    ('ei_leaf_hi'                , 'H'),     # 0x08
+    ('ei_unused'                 , 'H'),     # 0x0A
+    ))
+
+EXT4_DIR_ENTRY_2_LAYOUT = Ext4Layout('Ext4DirEntry2', (
+    ('inode'                     , 'I'),     # 0x00
+    ('rec_len'                   , 'H'),     # 0x04
+    ('name_len'                  , 'B'),     # 0x06
+    ('file_type'                 , 'B'),     # 0x07
+    ))
+
+EXT4_XATTR_HEADER_LAYOUT = Ext4Layout('Ext4XattrHeader', (
+    ('xh_magic'                  , 'I'),     # 0x00
+    ('xh_refcount'               , 'I'),     # 0x04
+    ('xh_blocks'                 , 'I'),     # 0x08
+    ('xh_hash'                   , 'I'),     # 0x0C
+    ('xh_checksum'               , 'I'),     # 0x10
+    ('xh_reserved'               , '12s'),   # 0x14
+    ))
+
+EXT4_XATTR_ENTRY_LAYOUT = Ext4Layout('Ext4XattrEntry', (
+    ('xe_name_len'               , 'B'),     # 0x00
+    ('xe_name_index'             , 'B'),     # 0x01
+    ('xe_value_offs'             , 'H'),     # 0x02
+    ('xe_value_inum'             , 'I'),     # 0x04
+    ('xe_value_size'             , 'I'),     # 0x08
+    ('xe_hash'                   , 'I'),     # 0x0C
+    ))
+
+# htree index, dx_root_info follows the '.' and '..' entries of block 0,
+# count/limit and the dx entries follow it (or the fake dirent of a dx node)
+EXT4_DX_ROOT_INFO_OFFSET = 0x18
+EXT4_DX_NODE_ENTRIES_OFFSET = 0x08
+
+EXT4_DX_ROOT_INFO_LAYOUT = Ext4Layout('Ext4DxRootInfo', (
+    ('reserved_zero'             , 'I'),     # 0x00
+    ('hash_version'              , 'B'),     # 0x04
+    ('info_length'               , 'B'),     # 0x05
+    ('indirect_levels'           , 'B'),     # 0x06
+    ('unused_flags'              , 'B'),     # 0x07
+    ))
+
+EXT4_DX_COUNTLIMIT_LAYOUT = Ext4Layout('Ext4DxCountLimit', (
+    ('limit'                     , 'H'),     # 0x00
+    ('count'                     , 'H'),     # 0x02
+    ('block'                     , 'I'),     # 0x04
+    ))
+
+EXT4_DX_ENTRY_LAYOUT = Ext4Layout('Ext4DxEntry', (
+    ('hash'                      , 'I'),     # 0x00
+    ('block'                     , 'I'),     # 0x04
+    ))
+
+JBD2_HEADER_FIELDS = (
+    ('h_magic'                   , 'I'),     # 0x00
+    ('h_blocktype'               , 'I'),     # 0x04
+    ('h_sequence'                , 'I'),     # 0x08
+    )
+
+JBD2_HEADER_LAYOUT = Ext4Layout('Jbd2Header', JBD2_HEADER_FIELDS, byteorder='>')
+
+JBD2_SUPERBLOCK_LAYOUT = Ext4Layout('Jbd2SuperBlock', JBD2_HEADER_FIELDS + (
+    ('s_blocksize'               , 'I'),     # 0x0C
+    ('s_maxlen'                  , 'I'),     # 0x10
+    ('s_first'                   , 'I'),     # 0x14
+    ('s_sequence'                , 'I'),     # 0x18
+    ('s_start'                   , 'I'),     # 0x1C
+    ('s_errno'                   , 'i'),     # 0x20
+    ('s_feature_compat'          , 'I'),     # 0x24
+    ('s_feature_incompat'        , 'I'),     # 0x28
+    ('s_feature_ro_compat'       , 'I'),     # 0x2C
+    ('s_uuid'                    , '16s'),   # 0x30
+    ('s_nr_users'                , 'I'),     # 0x40
+    ('s_dynsuper'                , 'I'),     # 0x44
+    ('s_max_transaction'         , 'I'),     # 0x48
+    ('s_max_trans_data'          , 'I'),     # 0x4C
+    ('s_checksum_type'           , 'B'),     # 0x50
+    ('s_padding2'                , '3s'),    # 0x51
+    ('s_num_fc_blks'             , 'I'),     # 0x54
+    ('s_head'                    , 'I'),     # 0x58
+    ('s_padding'                 , '160s'),  # 0x5C
+    ('s_checksum'                , 'I'),     # 0xFC
+    ), byteorder='>')
+
+JBD2_COMMIT_LAYOUT = Ext4Layout('Jbd2Commit', JBD2_HEADER_FIELDS + (
+    ('h_chksum_type'             , 'B'),     # 0x0C
+    ('h_chksum_size'             , 'B'),     # 0x0D
+    ('h_padding'                 , '2s'),    # 0x0E
+    ('h_chksum'                  , '32s'),   # 0x10
+    ('h_commit_sec'              , 'Q'),     # 0x30
+    ('h_commit_nsec'             , 'I'),     # 0x38
+    ), byteorder='>')
+
+JBD2_REVOKE_HEADER_LAYOUT = Ext4Layout('Jbd2RevokeHeader', JBD2_HEADER_FIELDS + (
+    ('r_count'                   , 'I'),     # 0x0C
+    ), byteorder='>')
+
+# tag layout before csum v3, t_blocknr_high is only there with 64bit and
+# csum v2 tags are two bytes longer, see ext4_journal_tag_size()
+JBD2_BLOCK_TAG_LAYOUT = Ext4Layout('Jbd2BlockTag', (
+    ('t_blocknr'                 , 'I'),     # 0x00
+    ('t_checksum'                , 'H'),     # 0x04
+    ('t_flags'                   , 'H'),     # 0x06
+    ('t_blocknr_high'            , 'I'),     # 0x08
+    ), byteorder='>')
+
+JBD2_BLOCK_TAG3_LAYOUT = Ext4Layout('Jbd2BlockTag3', (
+    ('t_blocknr'                 , 'I'),     # 0x00
+    ('t_flags'                   , 'I'),     # 0x04
+    ('t_blocknr_high'            , 'I'),     # 0x08
+    ('t_checksum'                , 'I'),     # 0x0C
+    ), byteorder='>')
+
+# Android sparse image headers, see libsparse sparse_format.h
+ANDROID_SPARSE_HEADER_LAYOUT = Ext4Layout('AndroidSparseHeader', (
+    ('magic'                     , 'I'),     # 0x00
+    ('major_version'             , 'H'),     # 0x04
+    ('minor_version'             , 'H'),     # 0x06
+    ('file_hdr_sz'               , 'H'),     # 0x08
+    ('chunk_hdr_sz'              , 'H'),     # 0x0A
+    ('blk_sz'                    , 'I'),     # 0x0C
+    ('total_blks'                , 'I'),     # 0x10
+    ('total_chunks'              , 'I'),     # 0x14
+    ('image_checksum'            , 'I'),     # 0x18
+    ))
+
+ANDROID_SPARSE_CHUNK_LAYOUT = Ext4Layout('AndroidSparseChunk', (
+    ('chunk_type'                , 'H'),     # 0x00
+    ('reserved1'                 , 'H'),     # 0x02
+    ('chunk_sz'                  , 'I'),     # 0x04
+    ('total_sz'                  , 'I'),     # 0x08
+    ))
+
+# Partition tables of whole disk images
+MBR_SIGNATURE = b'\x55\xaa'
+MBR_SIGNATURE_OFFSET = 510
+MBR_PARTITION_TABLE_OFFSET = 446
+MBR_PARTITION_COUNT = 4
+MBR_PARTITION_TYPES = {
+    'MBR_TYPE_EMPTY'          : 0x00,
+    'MBR_TYPE_EXTENDED_CHS'   : 0x05,
+    'MBR_TYPE_EXTENDED_LBA'   : 0x0F,
+    'MBR_TYPE_LINUX'          : 0x83,
+    'MBR_TYPE_EXTENDED_LINUX' : 0x85,
+    'MBR_TYPE_GPT_PROTECTIVE' : 0xEE
+    }
+MBR_EXTENDED_TYPES = (MBR_PARTITION_TYPES['MBR_TYPE_EXTENDED_CHS'], MBR_PARTITION_TYPES['MBR_TYPE_EXTENDED_LBA'], MBR_PARTITION_TYPES['MBR_TYPE_EXTENDED_LINUX'])
+# EBR chains are followed at most this far, a loop ends the walk earlier
+MBR_MAX_LOGICAL_PARTITIONS = 256
+GPT_SIGNATURE = b'EFI PART'
+# GPT disks of Android UFS storage use 4 KiB sectors
+GPT_SECTOR_SIZES = (512, 4096)
+# entries are 128 << n bytes; tools create 128 of them, the caps keep a
+# damaged header from asking for a huge entry array
+GPT_MIN_ENTRY_SIZE = 128
+GPT_MAX_ENTRY_SIZE = 4096
+GPT_MAX_PARTITION_ENTRIES = 1024
+
+MBR_PARTITION_LAYOUT = Ext4Layout('MbrPartition', (
+    ('status'                    , 'B'),     # 0x00
+    ('chs_first'                 , '3s'),    # 0x01
+    ('type'                      , 'B'),     # 0x04
+    ('chs_last'                  , '3s'),    # 0x05
+    ('lba_first'                 , 'I'),     # 0x08
+    ('sectors'                   , 'I'),     # 0x0C
+    ))
+
+GPT_HEADER_LAYOUT = Ext4Layout('GptHeader', (
+    ('signature'                 , '8s'),    # 0x00
+    ('revision'                  , 'I'),     # 0x08
+    ('header_size'               , 'I'),     # 0x0C
+    ('header_crc32'              , 'I'),     # 0x10
+    ('reserved'                  , 'I'),     # 0x14
+    ('my_lba'                    , 'Q'),     # 0x18
+    ('alternate_lba'             , 'Q'),     # 0x20
+    ('first_usable_lba'          , 'Q'),     # 0x28
+    ('last_usable_lba'           , 'Q'),     # 0x30
+    ('disk_guid'                 , '16s'),   # 0x38
+    ('partition_entry_lba'       , 'Q'),     # 0x48
+    ('num_partition_entries'     , 'I'),     # 0x50
+    ('partition_entry_size'      , 'I'),     # 0x54
+    ('partition_entries_crc32'   , 'I'),     # 0x58
+    ))
+
+GPT_ENTRY_LAYOUT = Ext4Layout('GptEntry', (
+    ('type_guid'                 , '16s'),   # 0x00
+    ('unique_guid'               , '16s'),   # 0x10
+    ('first_lba'                 , 'Q'),     # 0x20
+    ('last_lba'                  , 'Q'),     # 0x28
+    ('attributes'                , 'Q'),     # 0x30
+    ('name'                      , '72s'),   # 0x38
+    ))
+
+# Records handed out by the library API of Ext4Parser
+Ext4ExtentNode = namedtuple('Ext4ExtentNode', ('header', 'entries'))
+Ext4ExtentRun = namedtuple('Ext4ExtentRun', ('logical', 'physical', 'length', 'unwritten'))
+Ext4DirEntry = namedtuple('Ext4DirEntry', ('dir_ino', 'inode', 'rec_len', 'name_len', 'file_type', 'name'))
+Ext4Xattr = namedtuple('Ext4Xattr', ('name_index', 'name', 'value'))
+# structural damage found on the way (kind 'extent_tree') has no checksums,
+# only a detail message
+Ext4ChecksumMismatch = namedtuple('Ext4ChecksumMismatch', ('kind', 'location', 'stored', 'computed', 'detail'), defaults=(None,))
+Ext4JournalTag = namedtuple('Ext4JournalTag', ('fs_block', 'journal_block', 'flags'))
+Ext4Partition = namedtuple('Ext4Partition', ('index', 'scheme', 'type', 'name', 'offset', 'size', 'is_ext4'))
+Ext4TimelineEvent = namedtuple('Ext4TimelineEvent', ('time_ns', 'event', 'ino', 'path'))
+Ext4JournalTransaction = namedtuple('Ext4JournalTransaction', ('tid', 'start', 'tags', 'revoked', 'commit_sec', 'commit_nsec'))
+
+class Ext4CorruptionError(ValueError):
+    pass
+
+def ext4_block_addr(lo, hi):
+    # 48-bit block numbers are split in a 32-bit low and a 16/32-bit high half
+    return lo | (hi << 32)
+
+def decode_ext4_group_descriptor(buf, offset, desc_size):
+    if desc_size > 32:
+        return EXT4_GROUP_DESC_64_LAYOUT.unpack(buf, offset)
+    fields = EXT4_GROUP_DESC_LAYOUT.unpack(buf, offset)
+    return EXT4_GROUP_DESC_64_LAYOUT.record(*fields, *([0] * len(EXT4_GROUP_DESC_64_FIELDS)))
+
+def decode_ext4_inode(buf, offset, inode_size):
+    if inode_size > EXT4_INODE_ENTRY_SZ:
+        return EXT4_INODE_LAYOUT.unpack(buf, offset)
+    fields = EXT4_INODE_BASE_LAYOUT.unpack(buf, offset)
+    return EXT4_INODE_LAYOUT.record(*fields, *([0] * len(EXT4_INODE_EXTRA_FIELDS)))
+
+def decode_ext4_extent_node(data):
+    header = EXT4_EXTENT_HEADER_LAYOUT.unpack(data)
+    if header.eh_magic != EXT4_EXTENT_TREE_MAGIC:
+        raise Ext4CorruptionError(f"bad extent header magic {header.eh_magic:#x}")
+    if header.eh_depth > EXT4_EXTENT_MAX_DEPTH:
+        raise Ext4CorruptionError(f"extent tree depth {header.eh_depth} exceeds {EXT4_EXTENT_MAX_DEPTH}")
+    if header.eh_entries > header.eh_max or EXT4_EXTENT_HEADER_LAYOUT.size + header.eh_max*EXT4_EXTENT_LAYOUT.size > len(data):
+        raise Ext4CorruptionError(f"extent node claims {header.eh_entries}/{header.eh_max} entries in {len(data)} bytes")
+    layout = EXT4_EXTENT_IDX_LAYOUT if header.eh_depth else EXT4_EXTENT_LAYOUT
+    entries = tuple(layout.unpack(data, EXT4_EXTENT_HEADER_LAYOUT.size + i*layout.size) for i in range(header.eh_entries))
+    return Ext4ExtentNode(header, entries)
+
+def ext4_extent_run(extent):
+    unwritten = extent.ee_len > EXT4_EXT_INIT_MAX_LEN
+    length = extent.ee_len - EXT4_EXT_INIT_MAX_LEN if unwritten else extent.ee_len
+    return Ext4ExtentRun(extent.ee_block, ext4_block_addr(extent.ee_start_lo, extent.ee_start_hi), length, unwritten)
+
+class Ext4ExtentMap:
+    # logical -> physical translation for one file, sorted runs looked up by bisect
+    def __init__(self, runs, block_size):
+        self.runs = sorted(runs)
+        self.starts = [run.logical for run in self.runs]
+        self.block_size = block_size
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __iter__(self):
+        return iter(self.runs)
+
+    def lookup(self, logical):
+        # run covering a logical block, None inside a hole
+        i = bisect.bisect_right(self.starts, logical) - 1
+        if i >= 0 and logical < self.runs[i].logical + self.runs[i].length:
+            return self.runs[i]
+        return None
+
+    def physical(self, logical):
+        run = self.lookup(logical)
+        if run is None:
+            return None
+        return run.physical + logical - run.logical
+
+    def offset(self, logical, default=None):
+        physical = self.physical(logical)
+        if physical is None:
+            return default
+        return physical * self.block_size
+
+def ext4_journal_tag_size(incompat):
+    # mirrors journal_tag_bytes() of the kernel
+    if incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_CSUM_V3']:
+        return JBD2_BLOCK_TAG3_LAYOUT.size
+    size = JBD2_BLOCK_TAG_LAYOUT.size
+    if incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_CSUM_V2']:
+        size += 2
+    if not incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_64BIT']:
+        size -= 4
+    return size
+
+def ext4_journal_log_end(jsb, incompat):
+    # first journal block past the log; mirrors jbd2_journal_get_num_fc_blks()
+    # of the kernel, mke2fs reserves s_num_fc_blks even before the first mount
+    # sets the feature
+    fast_commit = jsb.s_num_fc_blks if jsb.h_blocktype == EXT4_JNL_BLOCK_TYPE['JBD2_SUPERBLOCK_V2'] else 0
+    if fast_commit == 0 and incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_FAST_COMMIT']:
+        fast_commit = JBD2_DEFAULT_FAST_COMMIT_BLOCKS
+    return jsb.s_maxlen - fast_commit
+
+def ext4_iter_journal_tags(data, incompat):
+    # (fs block, flags) for every tag of a descriptor block, each tag is
+    # followed by a uuid unless it carries JBD2_FLAG_SAME_UUID
+    csum = EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_CSUM_V2'] | EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_CSUM_V3']
+    layout = JBD2_BLOCK_TAG3_LAYOUT if incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_CSUM_V3'] else JBD2_BLOCK_TAG_LAYOUT
+    tag_size = ext4_journal_tag_size(incompat)
+    end = len(data) - (JBD2_BLOCK_TAIL_SIZE if incompat & csum else 0)
+    offset = JBD2_HEADER_LAYOUT.size
+    while offset + tag_size <= end:
+        # short tags leave the missing trailing fields zero
+        tag = layout.unpack(data[offset:offset+tag_size])
+        block = tag.t_blocknr
+        if incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_64BIT']:
+            block = ext4_block_addr(block, tag.t_blocknr_high)
+        yield block, tag.t_flags
+        offset += tag_size
+        if not tag.t_flags & EXT4_JNL_FLAGS['JBD2_FLAG_SAME_UUID']:
+            offset += JBD2_UUID_SIZE
+        if tag.t_flags & EXT4_JNL_FLAGS['JBD2_FLAG_LAST_TAG']:
+            break
+
+def ext4_iter_journal_revokes(data, incompat):
+    # r_count is the number of bytes used in the block, header included
+    size = 8 if incompat & EXT4_JNL_FEATURE_INCOMPAT['JBD2_FEATURE_INCOMPAT_64BIT'] else 4
+    end = min(JBD2_REVOKE_HEADER_LAYOUT.unpack(data).r_count, len(data))
+    for offset in range(JBD2_REVOKE_HEADER_LAYOUT.size, end - size + 1, size):
+        yield int.from_bytes(data[offset:offset+size], byteorder='big')
+
+def ext4_journal_tid_after(a, b):
+    # transaction ids are 32-bit and wrap around
+    return a != b and (a - b) & 0xFFFFFFFF < 0x80000000
+
+def ext4_is_fast_symlink(inode):
+    # a symlink target short enough for i_block is stored there, not in blocks
+    return (inode.i_mode & 0xF000) == EXT4_INODE_MODE['S_IFLNK'] and not inode.i_flags & EXT4_INODE_FLAGS['EXT4_EXTENTS_FL'] and ext4_file_size(inode) < EXT4_EXTENT_ROOT_SZ
+
+def ext4_file_size(inode):
+    return inode.i_size_lo | (inode.i_size_high << 32)
+
+def ext4_file_segments(extent_map, size):
+    # [offset, length, image offset] pieces covering the first size bytes of a
+    # file, physically adjacent runs are merged into a single read and holes
+    # or unwritten runs get image offset None so they are never read
+    block_size = extent_map.block_size
+    segments = []
+    def add(offset, length, physical):
+        length = min(length, size - offset)
+        if length <= 0:
+            return
+        if segments:
+            last = segments[-1]
+            if last[0] + last[1] == offset and (last[2] is None and physical is None or
+                    last[2] is not None and physical is not None and last[2] + last[1] == physical):
+                last[1] += length
+                return
+        segments.append([offset, length, physical])
+    position = 0
+    for run in extent_map:
+        offset = run.logical * block_size
+        if offset >= size:
+            break
+        if offset > position:
+            add(position, offset - position, None)
+        add(offset, run.length * block_size, None if run.unwritten else run.physical * block_size)
+        position = max(position, offset + run.length * block_size)
+    if position < size:
+        add(position, size - position, None)
+    return segments
+
+def ext4_view(source, offset, length):
+    # zero-copy slice when the source exposes a buffer, a copy otherwise
+    buffer = source.buffer if isinstance(source, Ext4Image) else source
+    if buffer is None:
+        return memoryview(source.read(offset, length))
+    return memoryview(buffer)[offset:offset+length]
+
+class Ext4File(io.RawIOBase):
+    # read-only binary file over an inode's contents, data is sliced straight
+    # out of the image and holes read back as zeros
+    def __init__(self, source, segments, size):
+        self.source = source
+        self.segments = segments
+        self.starts = [segment[0] for segment in segments]
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"invalid whence {whence}")
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def iter_chunks(self, length, chunk_size=EXT4_READ_CHUNK_SIZE):
+        # (length, view) pieces from the current position, view is None for a
+        # hole; a view is only valid until the next piece is requested
+        end = min(self.size, self.position + length)
+        i = bisect.bisect_right(self.starts, self.position) - 1
+        while self.position < end:
+            offset, segment_length, physical = self.segments[i]
+            n = min(offset + segment_length, end, self.position + chunk_size) - self.position
+            if physical is None:
+                self.position += n
+                yield n, None
+            else:
+                view = ext4_view(self.source, physical + self.position - offset, n)
+                self.position += n
+                try:
+                    yield n, view
+                finally:
+                    view.release()
+            if self.position >= offset + segment_length:
+                i += 1
+
+    def readinto(self, b):
+        with memoryview(b) as view, view.cast('B') as out:
+            done = 0
+            for n, data in self.iter_chunks(len(out)):
+                m = 0
+                if data is not None:
+                    m = len(data)
+                    out[done:done+m] = data
+                # holes, and the tail of a truncated image, read as zeros
+                out[done+m:done+n] = bytes(n - m)
+                done += n
+            return done
+
+    def readall(self):
+        # grown chunk by chunk, a corrupt i_size must not size one allocation
+        data = bytearray()
+        for n, view in self.iter_chunks(max(0, self.size - self.position)):
+            m = 0
+            if view is not None:
+                m = len(view)
+                data += view
+            data += bytes(n - m)
+        return bytes(data)
+
+    def copy_to(self, out):
+        # stream the rest of the file into out, holes are seeked over so a
+        # seekable destination ends up sparse
+        sparse = out.seekable()
+        copied = 0
+        for n, view in self.iter_chunks(max(0, self.size - self.position)):
+            if view is None:
+                if sparse:
+                    out.seek(n, io.SEEK_CUR)
+                else:
+                    out.write(bytes(n))
+            else:
+                out.write(view)
+                if len(view) < n:
+                    out.write(bytes(n - len(view)))
+            copied += n
+        if sparse:
+            out.truncate()
+        return copied
+
+def ext4_inode_in_use(inode, allocated_only=True):
+    # allocated: live inode, otherwise anything parse_ext4_inode would print
+    if allocated_only:
+        return inode.i_mode != 0 and inode.i_links_count != 0 and inode.i_dtime == 0
+    return inode.i_size_lo != 0 and (inode.i_uid != 0 or inode.i_block[:4] != bytes(4))
+
+def ext4_decode_name(data):
+    # names are raw bytes on disk, surrogateescape keeps them round-trippable
+    return bytes(data).decode('utf-8', 'surrogateescape')
+
+def ext4_iter_dir_block(data, dir_ino):
+    # linear walk of one directory block, htree index blocks hold a single
+    # empty entry spanning the block so they yield nothing
+    offset = 0
+    while offset + EXT4_DIR_ENTRY_2_LAYOUT.size <= len(data):
+        entry = EXT4_DIR_ENTRY_2_LAYOUT.unpack(data, offset)
+        if entry.rec_len < EXT4_DIR_ENTRY_2_LAYOUT.size or offset + entry.rec_len > len(data):
+            break
+        if entry.inode != 0 and entry.name_len != 0:
+            name = data[offset+EXT4_DIR_ENTRY_2_LAYOUT.size:offset+EXT4_DIR_ENTRY_2_LAYOUT.size+entry.name_len]
+            yield Ext4DirEntry(dir_ino, entry.inode, entry.rec_len, entry.name_len, entry.file_type, ext4_decode_name(name))
+        offset += entry.rec_len
+
+def ext4_iter_xattr_entries(data, offset, value_base):
+    # in-inode values are relative to the first entry, block values to the block start
+    while offset + EXT4_XATTR_ENTRY_LAYOUT.size <= len(data) and data[offset:offset+4] != bytes(4):
+        entry = EXT4_XATTR_ENTRY_LAYOUT.unpack(data, offset)
+        name_offset = offset + EXT4_XATTR_ENTRY_LAYOUT.size
+        name = EXT4_XATTR_PREFIX.get(entry.xe_name_index, '') + ext4_decode_name(data[name_offset:name_offset+entry.xe_name_len])
+        value = b''
+        if entry.xe_value_inum == 0:
+            value = bytes(data[value_base+entry.xe_value_offs:value_base+entry.xe_value_offs+entry.xe_value_size])
+        yield Ext4Xattr(entry.xe_name_index, name, value)
+        offset = name_offset + ((entry.xe_name_len + 3) & ~3)
+
+EXT4_NUMPY_FORMATS = {
+    'B' : 'u1',
+    'H' : '<u2',
+    'I' : '<u4',
+    'Q' : '<u8'
+    }
+
+EXT4_INODE_DTYPES = {}
+
+def ext4_inode_dtype(inode_size):
+    # numpy structured dtype over one inode table slot, built from the inode layout table
+    if inode_size not in EXT4_INODE_DTYPES:
+        fields = EXT4_INODE_FIELDS
+        if inode_size > EXT4_INODE_ENTRY_SZ:
+            fields = fields + EXT4_INODE_EXTRA_FIELDS
+        names, formats, offsets = [], [], []
+        position = 0
+        for name, fmt in fields:
+            size = struct.calcsize('<' + fmt)
+            if fmt in EXT4_NUMPY_FORMATS:
+                formats.append(EXT4_NUMPY_FORMATS[fmt])
+            elif size > 4:
+                formats.append(('<u4', (size // 4,)))
+            else:
+                formats.append('<u4')
+            names.append(name)
+            offsets.append(position)
+            position += size
+        EXT4_INODE_DTYPES[inode_size] = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': inode_size})
+    return EXT4_INODE_DTYPES[inode_size]
+
+def filter_ext4_inodes(columns, file_type=None, min_size=None, modified_after=None):
+    # e.g. filter_ext4_inodes(columns, 'S_IFREG', min_size=1<<30, modified_after=1700000000)
+    mask = np.ones(len(columns['ino']), dtype=bool)
+    if file_type is not None:
+        mask &= (columns['mode'] & 0xF000) == EXT4_INODE_MODE[file_type]
+    if min_size is not None:
+        mask &= columns['size'] >= min_size
+    if modified_after is not None:
+        mask &= columns['mtime'] > modified_after
+    return {key: value[mask] for key, value in columns.items()}
+
+# On-disk geometry, every offset computation goes through this instead of
+# assuming 4 KiB blocks
+class Ext4Geometry:
+    def __init__(self, superblock, backup_bgs=(0, 0)):
+        self.block_size = EXT4_MIN_BLOCK_SIZE << superblock['sb_log_block_size']
+        self.cluster_size = self.block_size
+        if superblock['sb_feature_ro_compat'] & EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_BIGALLOC']:
+            # s_log_cluster_size reuses the obsolete fragment size field
+            self.cluster_size = EXT4_MIN_BLOCK_SIZE << superblock['sb_obso_log_frag_size']
+        self.desc_size = EXT4_DESC_SIZE
+        if superblock['sb_feature_incompat'] & EXT4_FEATURE_INCOMPAT['EXT4_FEATURE_INCOMPAT_64BIT']:
+            self.desc_size = superblock['sb_desc_size']
+        self.inode_size = EXT4_INODE_ENTRY_SZ
+        if superblock['sb_rev_level'] != EXT4_REV_LEVEL['EXT4_GOOD_OLD_REV']:
+            self.inode_size = superblock['sb_inode_size']
+        self.inodes_per_group = superblock['sb_inodes_per_group']
+        self.inodes_per_block = self.block_size // self.inode_size
+        self.blocks_per_group = superblock['sb_blocks_per_group']
+        self.first_data_block = superblock['sb_first_data_block']
+        self.blocks_count = superblock['sb_blocks_count_lo']
+        if superblock['sb_feature_incompat'] & EXT4_FEATURE_INCOMPAT['EXT4_FEATURE_INCOMPAT_64BIT']:
+            self.blocks_count = ext4_block_addr(superblock['sb_blocks_count_lo'], superblock['sb_blocks_count_hi'])
+        self.group_count = math.ceil((self.blocks_count - self.first_data_block) / self.blocks_per_group)
+        # descriptor table sits in the block after the superblock
+        self.desc_table_offset = (self.first_data_block + 1) * self.block_size
+        self.descs_per_block = self.block_size // self.desc_size
+        # with meta_bg the table is cut in one block per meta group from
+        # sb_first_meta_bg on, each kept in the first group of its meta group
+        self.first_meta_bg = None
+        if superblock['sb_feature_incompat'] & EXT4_FEATURE_INCOMPAT['EXT4_FEATURE_INCOMPAT_META_BG']:
+            self.first_meta_bg = superblock['sb_first_meta_bg']
+        self.sparse_super = bool(superblock['sb_feature_ro_compat'] & EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_SPARSE_SUPER'])
+        self.backup_bgs = None
+        if superblock['sb_feature_compat'] & EXT4_FEATURE_COMPAT['EXT4_FEATURE_COMPAT_SPARSE_SUPER2']:
+            self.backup_bgs = tuple(backup_bgs)
+
+    def block_offset(self, block):
+        return block * self.block_size
+
+    def group_first_block(self, group_num):
+        return self.first_data_block + group_num * self.blocks_per_group
+
+    def has_super(self, group_num):
+        # same rule as ext4_bg_has_super: backups live in groups 0, 1 and the
+        # powers of 3, 5 and 7, or only the two named ones with sparse_super2
+        if group_num == 0:
+            return True
+        if self.backup_bgs is not None:
+            return group_num in self.backup_bgs
+        if group_num == 1 or not self.sparse_super:
+            return True
+        if not group_num & 1:
+            return False
+        for root in (3, 5, 7):
+            power = root
+            while power < group_num:
+                power *= root
+            if power == group_num:
+                return True
+        return False
+
+    def group_desc_block(self, desc_block_num):
+        # block holding the desc_block_num-th block of descriptors, as in the
+        # kernel's descriptor_loc
+        if self.first_meta_bg is None or desc_block_num < self.first_meta_bg:
+            return self.first_data_block + desc_block_num + 1
+        group_num = desc_block_num * self.descs_per_block
+        block = self.group_first_block(group_num) + self.has_super(group_num)
+        if self.block_size == EXT4_MIN_BLOCK_SIZE and desc_block_num == 0 and self.first_data_block == 0:
+            # the superblock takes block 1 of a bigalloc 1 KiB filesystem
+            block += 1
+        return block
+
+    def group_desc_offset(self, group_num):
+        desc_block_num, index = divmod(group_num, self.descs_per_block)
+        return self.block_offset(self.group_desc_block(desc_block_num)) + index * self.desc_size
+
+    def group_desc_runs(self):
+        # (first group, byte offset, group count) of every contiguous stretch
+        # of the descriptor table
+        runs = []
+        for first in range(0, self.group_count, self.descs_per_block):
+            offset = self.group_desc_offset(first)
+            count = min(self.descs_per_block, self.group_count - first)
+            if runs and runs[-1][1] + runs[-1][2]*self.desc_size == offset:
+                runs[-1][2] += count
+            else:
+                runs.append([first, offset, count])
+        return runs
+
+# The group descriptor table decoded once into one array per field, lo and hi
+# halves joined, so per-group lookups never go back to the image
+class Ext4GroupTable:
+    def __init__(self, data, desc_size):
+        fields = EXT4_GROUP_DESC_FIELDS
+        if desc_size > 32:
+            fields = fields + EXT4_GROUP_DESC_64_FIELDS
+        self.count = len(data) // desc_size
+        # every field is a strided slice over the table seen as 16 or 32-bit words
+        words = {'H': array.array('H', data), 'I': array.array('I', data)}
+        if sys.byteorder == 'big':
+            for column in words.values():
+                column.byteswap()
+        columns = {}
+        position = 0
+        for name, fmt in fields:
+            size = struct.calcsize('<' + fmt)
+            if fmt in words:
+                columns[name] = words[fmt][position//size::desc_size//size]
+            position += size
+        def joined(typecode, lo, hi, shift):
+            if np is not None:
+                column = np.asarray(columns[lo], dtype=typecode)
+                if hi in columns:
+                    column |= np.asarray(columns[hi], dtype=typecode) << np.dtype(typecode).type(shift)
+                return array.array(typecode, column.tobytes())
+            column = array.array(typecode, columns[lo])
+            if any(columns.get(hi, ())):
+                column = array.array(typecode, [l | (h << shift) for l, h in zip(column, columns[hi])])
+            return column
+        self.block_bitmap = joined('Q', 'bg_block_bitmap_lo', 'bg_block_bitmap_hi', 32)
+        self.inode_bitmap = joined('Q', 'bg_inode_bitmap_lo', 'bg_inode_bitmap_hi', 32)
+        self.inode_table = joined('Q', 'bg_inode_table_lo', 'bg_inode_table_hi', 32)
+        self.exclude_bitmap = joined('Q', 'bg_exclude_bitmap_lo', 'bg_exclude_bitmap_hi', 32)
+        self.free_blocks = joined('I', 'bg_free_blocks_count_lo', 'bg_free_blocks_count_hi', 16)
+        self.free_inodes = joined('I', 'bg_free_inodes_count_lo', 'bg_free_inodes_count_hi', 16)
+        self.used_dirs = joined('I', 'bg_used_dirs_count_lo', 'bg_used_dirs_count_hi', 16)
+        self.itable_unused = joined('I', 'bg_itable_unused_lo', 'bg_itable_unused_hi', 16)
+        self.flags = columns['bg_flags']
+        self.checksum = columns['bg_checksum']
+
+    def __len__(self):
+        return self.count
+
+# Directory edges of the whole filesystem in flat arrays: parent and child
+# inode plus the name as an offset into one shared bytes arena. Edges are
+# added directory by directory in inode order, so the children of a directory
+# are a bisect away; a permutation sorted by child inode gives the reverse
+# inode -> names lookup
+class Ext4DirTree:
+    def __init__(self):
+        self.parents = array.array('I')
+        self.inodes = array.array('I')
+        self.file_types = array.array('B')
+        self.name_offsets = array.array('Q', [0])
+        self.names = bytearray()
+        self.by_inode = array.array('I')
+        self.sorted_inodes = array.array('I')
+
+    def add(self, parent, inode, file_type, name):
+        # parent must not be lower than the one of the previous edge
+        self.parents.append(parent)
+        self.inodes.append(inode)
+        self.file_types.append(file_type)
+        self.names += name.encode('utf-8', 'surrogateescape')
+        self.name_offsets.append(len(self.names))
+
+    def finish(self):
+        # build the reverse index once every edge is in
+        if np is not None and len(self.inodes):
+            inodes = np.frombuffer(self.inodes, dtype=np.uint32)
+            order = np.argsort(inodes, kind='stable').astype(np.uint32)
+            self.by_inode = array.array('I', order.tobytes())
+            self.sorted_inodes = array.array('I', inodes[order].tobytes())
+        else:
+            self.by_inode = array.array('I', sorted(range(len(self.inodes)), key=self.inodes.__getitem__))
+            self.sorted_inodes = array.array('I', (self.inodes[edge] for edge in self.by_inode))
+
+    def __len__(self):
+        return len(self.inodes)
+
+    def name(self, edge):
+        return ext4_decode_name(self.names[self.name_offsets[edge]:self.name_offsets[edge+1]])
+
+    def link_edges(self, ino):
+        start = bisect.bisect_left(self.sorted_inodes, ino)
+        end = bisect.bisect_right(self.sorted_inodes, ino, start)
+        return [self.by_inode[i] for i in range(start, end)]
+
+    def children(self, ino):
+        # (inode, file_type, name) of one directory, without '.' and '..'
+        start = bisect.bisect_left(self.parents, ino)
+        end = bisect.bisect_right(self.parents, ino, start)
+        return [(self.inodes[edge], self.file_types[edge], self.name(edge)) for edge in range(start, end)]
+
+    def links(self, ino):
+        # (dir_ino, name) of every entry naming ino, more than one for hard links
+        return [(self.parents[edge], self.name(edge)) for edge in self.link_edges(ino)]
+
+    def path_of(self, ino):
+        # first path of ino, None when it does not lead back to the root
+        # (an orphan below a deleted directory, or a loop)
+        parts = []
+        seen = set()
+        while ino != EXT4_ROOT_INO:
+            edges = self.link_edges(ino)
+            if not edges or ino in seen:
+                return None
+            seen.add(ino)
+            parts.append(self.name(edges[0]))
+            ino = self.parents[edges[0]]
+        return '/' + '/'.join(reversed(parts))
+
+    def paths_of(self, ino):
+        # every path of ino, one per hard link
+        paths = []
+        for parent, name in self.links(ino):
+            parent_path = self.path_of(parent)
+            if parent_path is not None:
+                paths.append(parent_path.rstrip('/') + '/' + name)
+        return paths
+
+    def hardlinks(self):
+        # (ino, paths) of every non-directory named by more than one entry
+        start = 0
+        while start < len(self.sorted_inodes):
+            ino = self.sorted_inodes[start]
+            end = bisect.bisect_right(self.sorted_inodes, ino, start)
+            if end - start > 1 and self.file_types[self.by_inode[start]] != EXT4_FILE_TYPE['EXT4_FT_DIR']:
+                yield ino, self.paths_of(ino)
+            start = end
+
+EXT4_GROUP_TABLE_COLUMNS = ('block_bitmap', 'inode_bitmap', 'inode_table', 'exclude_bitmap', 'free_blocks', 'free_inodes', 'used_dirs', 'itable_unused', 'flags', 'checksum')
+
+def ext4_probe(image, offset=0):
+    # an ext2/3/4 superblock magic 1 KiB into the partition
+    magic = image.read(offset + EXT4_SUPERBLOCK_OFFSET + EXT4_SB_MAGIC_OFFSET, 2)
+    return len(magic) == 2 and int.from_bytes(magic, byteorder='little') == EXT4_SUPER_MAGIC
+
+def ext4_gpt_headers(image, sector_size):
+    # primary header at LBA 1, then the backup in the last sector; only
+    # headers with a good CRC and an entry array within the caps
+    for lba in (1, len(image) // sector_size - 1):
+        data = image.read(lba * sector_size, sector_size)
+        if len(data) < GPT_HEADER_LAYOUT.size or not data.startswith(GPT_SIGNATURE):
+            continue
+        header = GPT_HEADER_LAYOUT.unpack(data)
+        size = min(header.header_size, len(data))
+        if zlib.crc32(data[:0x10] + bytes(4) + data[0x14:size]) != header.header_crc32:
+            continue
+        entry_size = header.partition_entry_size
+        if entry_size < GPT_MIN_ENTRY_SIZE or entry_size > GPT_MAX_ENTRY_SIZE or entry_size & (entry_size - 1) or header.num_partition_entries > GPT_MAX_PARTITION_ENTRIES:
+            continue
+        yield header
+
+def ext4_gpt_entries(image, sector_size):
+    # header and entry array of the first copy whose array CRC matches too
+    for header in ext4_gpt_headers(image, sector_size):
+        entries = image.read(header.partition_entry_lba * sector_size, header.num_partition_entries * header.partition_entry_size)
+        if zlib.crc32(entries) == header.partition_entries_crc32:
+            return header, entries
+    return None, None
+
+def ext4_gpt_partitions(image):
+    for sector_size in GPT_SECTOR_SIZES:
+        header, entries = ext4_gpt_entries(image, sector_size)
+        if header is None:
+            continue
+        partitions = []
+        for number in range(header.num_partition_entries):
+            entry = GPT_ENTRY_LAYOUT.unpack(entries, number * header.partition_entry_size)
+            if entry.type_guid == bytes(16):
+                continue
+            offset = entry.first_lba * sector_size
+            size = (entry.last_lba - entry.first_lba + 1) * sector_size
+            name = entry.name.decode('utf-16-le', errors='replace').split('\x00')[0]
+            partitions.append(Ext4Partition(number + 1, 'gpt', str(uuid.UUID(bytes_le=entry.type_guid)), name, offset, size, ext4_probe(image, offset)))
+        return partitions
+    return None
+
+def ext4_mbr_entries(image, offset):
+    data = image.read(offset, MBR_SIGNATURE_OFFSET + 2)
+    if len(data) < MBR_SIGNATURE_OFFSET + 2 or data[MBR_SIGNATURE_OFFSET:] != MBR_SIGNATURE:
+        return None
+    entries = [MBR_PARTITION_LAYOUT.unpack(data, MBR_PARTITION_TABLE_OFFSET + i*MBR_PARTITION_LAYOUT.size) for i in range(MBR_PARTITION_COUNT)]
+    # a boot sector of a bare filesystem also ends in 55 aa, its "entries"
+    # then have bogus status bytes
+    if any(entry.status not in (0x00, 0x80) for entry in entries):
+        return None
+    return entries
+
+def ext4_mbr_partitions(image, sector_size=512):
+    entries = ext4_mbr_entries(image, 0)
+    if entries is None:
+        return None
+    partitions = []
+    for number, entry in enumerate(entries, 1):
+        if entry.type == MBR_PARTITION_TYPES['MBR_TYPE_EMPTY'] or entry.sectors == 0:
+            continue
+        if entry.type == MBR_PARTITION_TYPES['MBR_TYPE_GPT_PROTECTIVE']:
+            # covers a GPT disk whose headers both failed their CRC, it is
+            # no partition; hybrid MBRs keep their other entries
+            continue
+        if entry.type in MBR_EXTENDED_TYPES:
+            partitions += ext4_ebr_partitions(image, entry.lba_first, sector_size)
+            continue
+        offset = entry.lba_first * sector_size
+        partitions.append(Ext4Partition(number, 'mbr', f"{entry.type:#04x}", '', offset, entry.sectors * sector_size, ext4_probe(image, offset)))
+    return partitions
+
+def ext4_ebr_partitions(image, extended_lba, sector_size=512):
+    # logical partitions: the first entry of every EBR is relative to that
+    # EBR, the second points at the next EBR relative to the extended partition
+    partitions = []
+    ebr_lba = extended_lba
+    seen = set()
+    while ebr_lba not in seen and len(partitions) < MBR_MAX_LOGICAL_PARTITIONS:
+        seen.add(ebr_lba)
+        entries = ext4_mbr_entries(image, ebr_lba * sector_size)
+        if entries is None:
+            break
+        logical, following = entries[0], entries[1]
+        if logical.sectors:
+            offset = (ebr_lba + logical.lba_first) * sector_size
+            # logical partitions are numbered from 5 like Linux does
+            partitions.append(Ext4Partition(MBR_PARTITION_COUNT + 1 + len(partitions), 'ebr', f"{logical.type:#04x}", '', offset, logical.sectors * sector_size, ext4_probe(image, offset)))
+        if following.type not in MBR_EXTENDED_TYPES or following.lba_first == 0:
+            break
+        ebr_lba = extended_lba + following.lba_first
+    return partitions
+
+def ext4_partitions(image):
+    # partitions of a disk image: GPT first (a protective MBR comes with it),
+    # then MBR with its EBR chain; a bare filesystem is one partition
+    if not isinstance(image, Ext4Image):
+        with open_ext4_image(image) as opened:
+            return ext4_partitions(opened)
+    partitions = ext4_gpt_partitions(image)
+    if partitions is None and not ext4_probe(image):
+        partitions = ext4_mbr_partitions(image)
+    if partitions is None:
+        partitions = [Ext4Partition(0, 'none', '', '', 0, len(image), ext4_probe(image))]
+    return partitions
+
+# Output of the parse_* walk goes through a renderer, the library API below
+# returns records and Ext4Parser stays silent unless a renderer is given
+class Ext4TextRenderer:
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, text="", end="\n"):
+        # stream is resolved on every call so redirect_stdout keeps working
+        print(text, end=end, file=self.stream)
+
+class Ext4NullRenderer:
+    def write(self, text="", end="\n"):
+        pass
+
+# Export sinks, rows are buffered into bounded batches and flushed while the
+# scan runs so memory stays flat whatever the inode count
+EXT4_EXPORT_BATCH_SIZE = 65536
+
+EXT4_EXPORT_COLUMNS = {
+    'inodes'  : (('ino', 'uint64'), ('mode', 'uint16'), ('uid', 'uint32'), ('gid', 'uint32'), ('size', 'uint64'),
+                 ('atime', 'uint32'), ('ctime', 'uint32'), ('mtime', 'uint32'), ('dtime', 'uint32'), ('crtime', 'uint32'),
+                 ('flags', 'uint32'), ('links', 'uint16'), ('blocks', 'uint64')),
+    'extents' : (('ino', 'uint64'), ('logical', 'uint32'), ('physical', 'uint64'), ('length', 'uint16'), ('unwritten', 'bool_')),
+    'dirents' : (('dir_ino', 'uint64'), ('inode', 'uint32'), ('file_type', 'uint8'), ('name', 'string')),
+    'xattrs'  : (('ino', 'uint64'), ('name_index', 'uint8'), ('name', 'string'), ('value', 'binary')),
+    }
+
+def ext4_export_str(name):
+    # undecodable name bytes are kept as backslash escapes
+    return name.encode('utf-8', 'surrogateescape').decode('utf-8', 'backslashreplace')
+
+def ext4_inode_row(ino, inode):
+    return {
+        'ino'    : ino,
+        'mode'   : inode.i_mode,
+        'uid'    : inode.i_uid | (inode.l_i_uid_high << 16),
+        'gid'    : inode.i_gid | (inode.l_i_gid_high << 16),
+        'size'   : inode.i_size_lo | (inode.i_size_high << 32),
+        'atime'  : inode.i_atime,
+        'ctime'  : inode.i_ctime,
+        'mtime'  : inode.i_mtime,
+        'dtime'  : inode.i_dtime,
+        'crtime' : inode.l_i_crtime,
+        'flags'  : inode.i_flags,
+        'links'  : inode.i_links_count,
+        'blocks' : inode.i_blocks_lo | (inode.l_i_blocks_high << 32),
+        }
+
+def ext4_extent_row(ino, run):
+    return {'ino': ino, 'logical': run.logical, 'physical': run.physical, 'length': run.length, 'unwritten': run.unwritten}
+
+def ext4_dirent_row(entry):
+    return {'dir_ino': entry.dir_ino, 'inode': entry.inode, 'file_type': entry.file_type, 'name': ext4_export_str(entry.name)}
+
+def ext4_xattr_row(ino, xattr):
+    return {'ino': ino, 'name_index': xattr.name_index, 'name': ext4_export_str(xattr.name), 'value': xattr.value}
+
+class Ext4ExportSink:
+    def __init__(self, path, table='inodes', batch_size=EXT4_EXPORT_BATCH_SIZE):
+        self.path = path
+        self.table = table
+        self.columns = [name for name, _ in EXT4_EXPORT_COLUMNS[table]]
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def write_columns(self, columns):
+        # batch that is already columnar, e.g. from scan_ext4_inode_table_batch
+        self.flush()
+        batch = {name: columns[name] for name in self.columns}
+        self.count += len(batch[self.columns[0]])
+        self.write_batch(batch)
+
+    def flush(self):
+        if self.rows:
+            batch = {name: [row[name] for row in self.rows] for name in self.columns}
+            self.count += len(self.rows)
+            self.rows = []
+            self.write_batch(batch)
+
+    def write_batch(self, columns):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class JsonlExportSink(Ext4ExportSink):
+    def __init__(self, path, table='inodes', batch_size=EXT4_EXPORT_BATCH_SIZE):
+        super().__init__(path, table, batch_size)
+        self.fd = open(path, 'w', encoding='utf-8')
+
+    def write_batch(self, columns):
+        values = [column.tolist() if hasattr(column, 'tolist') else column for column in columns.values()]
+        # binary values (xattrs) are written as hex like the rest of the parser does
+        self.fd.writelines(json.dumps(dict(zip(self.columns, row)), default=bytes.hex) + '\n' for row in zip(*values))
+
+    def close(self):
+        super().close()
+        self.fd.close()
+
+class ArrowExportSink(Ext4ExportSink):
+    def __init__(self, path, table='inodes', batch_size=EXT4_EXPORT_BATCH_SIZE):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Arrow and Parquet exports")
+        super().__init__(path, table, batch_size)
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in EXT4_EXPORT_COLUMNS[table]])
+        self.writer = self.open_writer()
+
+    def open_writer(self):
+        return pa.ipc.new_file(str(self.path), self.schema)
+
+    def write_batch(self, columns):
+        self.writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        super().close()
+        self.writer.close()
+
+class ParquetExportSink(ArrowExportSink):
+    def open_writer(self):
+        return pq.ParquetWriter(str(self.path), self.schema)
+
+EXT4_SQLITE_TYPES = {
+    'string' : 'TEXT',
+    'binary' : 'BLOB'
+    }
+
+class SqliteExportSink(Ext4ExportSink):
+    # one table per sink, several sinks can share a connection (the index does)
+    def __init__(self, path, table='inodes', batch_size=EXT4_EXPORT_BATCH_SIZE, db=None):
+        super().__init__(path, table, batch_size)
+        self.owns_db = db is None
+        self.db = sqlite3.connect(path) if db is None else db
+        columns = ', '.join(f"{name} {EXT4_SQLITE_TYPES.get(type_name, 'INTEGER')}" for name, type_name in EXT4_EXPORT_COLUMNS[table])
+        # like the file sinks, exporting again replaces the table
+        self.db.execute(f"DROP TABLE IF EXISTS {table}")
+        self.db.execute(f"CREATE TABLE {table} ({columns})")
+        self.insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(self.columns))})"
+
+    def write_batch(self, columns):
+        values = [column.tolist() if hasattr(column, 'tolist') else column for column in columns.values()]
+        self.db.executemany(self.insert, zip(*values))
+
+    def close(self):
+        super().close()
+        if self.owns_db:
+            self.db.commit()
+            self.db.close()
+
+EXT4_EXPORT_SINKS = {
+    'jsonl'   : JsonlExportSink,
+    'arrow'   : ArrowExportSink,
+    'parquet' : ParquetExportSink,
+    'sqlite'  : SqliteExportSink
+    }
+
+EXT4_EXPORT_SUFFIXES = {
+    '.jsonl'   : 'jsonl',
+    '.ndjson'  : 'jsonl',
+    '.arrow'   : 'arrow',
+    '.feather' : 'arrow',
+    '.parquet' : 'parquet',
+    '.sqlite'  : 'sqlite',
+    '.db'      : 'sqlite'
+    }
+
+def open_ext4_export_sink(path, table='inodes', fmt=None, batch_size=EXT4_EXPORT_BATCH_SIZE):
+    if fmt is None:
+        fmt = EXT4_EXPORT_SUFFIXES.get(Path(path).suffix.lower(), 'jsonl')
+    if fmt not in EXT4_EXPORT_SINKS:
+        raise ValueError(f"unknown export format '{fmt}', expected one of {', '.join(sorted(EXT4_EXPORT_SINKS))}")
+    if table not in EXT4_EXPORT_COLUMNS:
+        raise ValueError(f"unknown export table '{table}', expected one of {', '.join(sorted(EXT4_EXPORT_COLUMNS))}")
+    return EXT4_EXPORT_SINKS[fmt](path, table, batch_size)
+
+# Persistent metadata index: a sqlite file holding what a full scan decodes
+# (superblock, group table, inodes, extents, directory entries), tagged with
+# the image fingerprint so it is only rebuilt once the image changes
+EXT4_INDEX_VERSION = 1
+EXT4_INDEX_SUFFIX = '.ext4idx'
+EXT4_INDEX_TABLES = ('inodes', 'extents', 'dirents')
+# blocks hashed into the fingerprint, spread evenly over the filesystem
+EXT4_FINGERPRINT_SAMPLES = 8
+
+class Ext4Index:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.superblock_dict = None
+
+    def meta(self, key):
+        try:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.DatabaseError:
+            # not an index, or one from an interrupted build
+            return None
+        return row[0] if row else None
+
+    def superblock(self):
+        if self.superblock_dict is None:
+            self.superblock_dict = json.loads(self.meta('superblock'))
+        return self.superblock_dict
+
+    def group(self, group_num):
+        row = self.db.execute(f"SELECT {', '.join(EXT4_GROUP_TABLE_COLUMNS)} FROM groups WHERE group_num = ?", (group_num,)).fetchone()
+        return dict(zip(EXT4_GROUP_TABLE_COLUMNS, row)) if row else None
+
+    def inode(self, ino):
+        names = [name for name, _ in EXT4_EXPORT_COLUMNS['inodes']]
+        row = self.db.execute(f"SELECT {', '.join(names)} FROM inodes WHERE ino = ?", (ino,)).fetchone()
+        return dict(zip(names, row)) if row else None
+
+    def extents(self, ino):
+        rows = self.db.execute("SELECT logical, physical, length, unwritten FROM extents WHERE ino = ? ORDER BY logical", (ino,))
+        return [Ext4ExtentRun(logical, physical, length, bool(unwritten)) for logical, physical, length, unwritten in rows]
+
+    def extent_map(self, ino):
+        return Ext4ExtentMap(self.extents(ino), EXT4_MIN_BLOCK_SIZE << self.superblock()['sb_log_block_size'])
+
+    def dir_entries(self, dir_ino):
+        # (inode, file_type, name) of one directory, '.' and '..' included
+        return self.db.execute("SELECT inode, file_type, name FROM dirents WHERE dir_ino = ?", (dir_ino,)).fetchall()
+
+    def links(self, ino):
+        # (dir_ino, name) of every entry naming ino, more than one for hard links
+        return self.db.execute("SELECT dir_ino, name FROM dirents WHERE inode = ? AND name NOT IN ('.', '..')", (ino,)).fetchall()
+
+    def lookup(self, path):
+        ino = EXT4_ROOT_INO
+        for name in path.split('/'):
+            if not name:
+                continue
+            row = self.db.execute("SELECT inode FROM dirents WHERE dir_ino = ? AND name = ?", (ino, name)).fetchone()
+            if row is None:
+                return None
+            ino = row[0]
+        return ino
+
+    def query(self, sql, params=()):
+        return self.db.execute(sql, params).fetchall()
+
+    def export(self, sink):
+        # replay one indexed table into an export sink
+        if sink.table not in EXT4_INDEX_TABLES:
+            raise ValueError(f"the index has no '{sink.table}' table, expected one of {', '.join(EXT4_INDEX_TABLES)}")
+        cursor = self.db.execute(f"SELECT {', '.join(sink.columns)} FROM {sink.table}")
+        while True:
+            rows = cursor.fetchmany(sink.batch_size)
+            if not rows:
+                break
+            batch = dict(zip(sink.columns, (list(column) for column in zip(*rows))))
+            if 'unwritten' in batch:
+                batch['unwritten'] = [bool(value) for value in batch['unwritten']]
+            sink.write_columns(batch)
+
+    def close(self):
+        self.db.close()
 
-EXT4_JNL_FEATURE_COMPAT = {
-    'JBD2_FEATURE_COMPAT_CHECKSUM' : 0x00000001
-    }
+    def __enter__(self):
+        return self
 
-EXT4_JNL_FEATURE_INCOMPAT = {
-    'JBD2_FEATURE_INCOMPAT_REVOKE'       : 0x00000001,
-    'JBD2_FEATURE_INCOMPAT_64BIT'        : 0x00000002,
-    'JBD2_FEATURE_INCOMPAT_ASYNC_COMMIT' : 0x00000004
-    }
+    def __exit__(self, *exc):
+        self.close()
 
-EXT4_JNL_FLAGS = {
-    'JBD2_FLAG_ESCAPE'    : 1,
-    'JBD2_FLAG_SAME_UUID' : 2,
-    'JBD2_FLAG_DELETED'   : 4,
-    'JBD2_FLAG_LAST_TAG'  : 8
+# MAC-B timeline: four events per inode, sorted in runs of bounded size that
+# are spilled to temporary files and merged, so memory stays flat
+EXT4_TIMELINE_EVENTS = ('m', 'a', 'c', 'b')
+EXT4_TIMELINE_RUN_EVENTS = 1 << 20
+EXT4_TIMELINE_MERGE_CHUNK = 4096
+# (seconds, nanoseconds, event, ino) as spilled to the run files; time_ns
+# itself does not fit an int64 past 2262 and ext4 goes to 2446
+EXT4_TIMELINE_RECORD = struct.Struct('<qIBI')
+# (event, seconds field, extra field) in EXT4_TIMELINE_EVENTS order
+EXT4_TIMELINE_FIELDS = (
+    ('m', 'i_mtime', 'l_i_mtime_extra'),
+    ('a', 'i_atime', 'l_i_atime_extra'),
+    ('c', 'i_ctime', 'l_i_ctime_extra'),
+    ('b', 'l_i_crtime', 'l_i_crtime_extra'),
+    )
+# byte offset of the extra fields, they exist when i_extra_isize covers them
+EXT4_INODE_EXTRA_OFFSETS = {
+    'l_i_ctime_extra'  : 0x84,
+    'l_i_mtime_extra'  : 0x88,
+    'l_i_atime_extra'  : 0x8C,
+    'l_i_crtime'       : 0x90,
+    'l_i_crtime_extra' : 0x94,
     }
 
-EXT4_JNL_CHKSUM_TYPE = {
-    'JBD2_CRC32_CHKSUM' : 1,
-    'JBD2_MD5_CHKSUM'   : 2,
-    'JBD2_SHA1_CHKSUM'  : 3
+def ext4_inode_field_present(inode, name):
+    offset = EXT4_INODE_EXTRA_OFFSETS.get(name)
+    return offset is None or EXT4_INODE_ENTRY_SZ + inode.l_i_extra_isize >= offset + 4
+
+def ext4_timestamp_ns(seconds, extra=0):
+    # seconds are signed 32 bit, the extra word holds two more epoch bits
+    # and the nanoseconds above them
+    if seconds & 0x80000000:
+        seconds -= 1 << 32
+    seconds += (extra & 3) << 32
+    return seconds*1000000000 + (extra >> 2)
+
+def ext4_inode_times(inode):
+    # (time_ns, event index) of the timestamps an inode actually carries
+    times = []
+    for event, (_, field, extra_field) in enumerate(EXT4_TIMELINE_FIELDS):
+        if not ext4_inode_field_present(inode, field):
+            continue
+        extra = getattr(inode, extra_field) if ext4_inode_field_present(inode, extra_field) else 0
+        times.append((ext4_timestamp_ns(getattr(inode, field), extra), event))
+    return times
+
+def ext4_spill_run(events):
+    run = tempfile.TemporaryFile()
+    events.sort()
+    for start in range(0, len(events), EXT4_TIMELINE_MERGE_CHUNK):
+        run.write(b''.join(EXT4_TIMELINE_RECORD.pack(*divmod(time_ns, 1000000000), event, ino) for time_ns, event, ino in events[start:start+EXT4_TIMELINE_MERGE_CHUNK]))
+    run.seek(0)
+    return run
+
+def ext4_iter_run(run):
+    try:
+        while True:
+            data = run.read(EXT4_TIMELINE_MERGE_CHUNK * EXT4_TIMELINE_RECORD.size)
+            if not data:
+                break
+            for seconds, nanoseconds, event, ino in EXT4_TIMELINE_RECORD.iter_unpack(data):
+                yield seconds*1000000000 + nanoseconds, event, ino
+    finally:
+        run.close()
+
+def ext4_sorted_events(events, run_events=EXT4_TIMELINE_RUN_EVENTS):
+    # external merge sort of (time_ns, event, ino) tuples, at most run_events
+    # of them are held in memory besides one read chunk per run
+    buffer = []
+    runs = []
+    for event in events:
+        buffer.append(event)
+        if len(buffer) >= run_events:
+            runs.append(ext4_spill_run(buffer))
+            buffer = []
+    if not runs:
+        buffer.sort()
+        yield from buffer
+        return
+    if buffer:
+        runs.append(ext4_spill_run(buffer))
+        buffer = []
+    yield from heapq.merge(*(ext4_iter_run(run) for run in runs))
+
+def ext4_orphan_path(ino):
+    # name The Sleuth Kit gives files no directory leads to
+    return f"$OrphanFiles/OrphanFile-{ino}"
+
+EXT4_BODYFILE_TYPES = {
+    EXT4_INODE_MODE['S_IFREG']  : 'r',
+    EXT4_INODE_MODE['S_IFDIR']  : 'd',
+    EXT4_INODE_MODE['S_IFLNK']  : 'l',
+    EXT4_INODE_MODE['S_IFCHR']  : 'c',
+    EXT4_INODE_MODE['S_IFBLK']  : 'b',
+    EXT4_INODE_MODE['S_IFIFO']  : 'p',
+    EXT4_INODE_MODE['S_IFSOCK'] : 's',
     }
-No_of_block_in_a_group = 32768
-size_of_each_block_group = 134217728
-#
-# Ext4 Hash
-#
-EXT4_HASH_VERSION = {
-    'DX_HASH_LEGACY'            : 0x0,
-    'DX_HASH_HALF_MD4'          : 0x1,
-    'DX_HASH_TEA'               : 0x2,
-    'DX_HASH_LEGACY_UNSIGNED'   : 0x3,
-    'DX_HASH_HALF_MD4_UNSIGNED' : 0x4,
-    'DX_HASH_TEA_UNSIGNED'      : 0x5
+
+def ext4_bodyfile_line(path, ino, inode):
+    # TSK 3 body format: MD5|name|inode|mode|UID|GID|size|atime|mtime|ctime|crtime
+    times = {EXT4_TIMELINE_FIELDS[event][0]: time_ns // 1000000000 for time_ns, event in ext4_inode_times(inode)}
+    mode = f"{EXT4_BODYFILE_TYPES.get(inode.i_mode & 0xF000, '-')}/{stat.filemode(inode.i_mode)}"
+    uid = inode.i_uid | (inode.l_i_uid_high << 16)
+    gid = inode.i_gid | (inode.l_i_gid_high << 16)
+    return f"0|{path}|{ino}|{mode}|{uid}|{gid}|{ext4_file_size(inode)}|{times.get('a', 0)}|{times.get('m', 0)}|{times.get('c', 0)}|{times.get('b', 0)}\n"
+
+# timeline writers return the number of rows written
+def write_ext4_timeline_csv(events, out):
+    writer = csv.writer(out)
+    writer.writerow(Ext4TimelineEvent._fields)
+    count = 0
+    for event in events:
+        writer.writerow(event)
+        count += 1
+    return count
+
+def write_ext4_timeline_jsonl(events, out):
+    count = 0
+    for event in events:
+        out.write(json.dumps(event._asdict()) + '\n')
+        count += 1
+    return count
+
+EXT4_TIMELINE_WRITERS = {
+    'csv'      : write_ext4_timeline_csv,
+    'jsonl'    : write_ext4_timeline_jsonl,
+    'bodyfile' : None
     }
 
-def timestamp_to_utc_string(timestamp):
-    time_struct = time.gmtime(timestamp)
-    return time.strftime('%Y-%m-%d %H:%M:%S', time_struct)
+EXT4_TIMELINE_SUFFIXES = {
+    '.csv'      : 'csv',
+    '.jsonl'    : 'jsonl',
+    '.ndjson'   : 'jsonl',
+    '.body'     : 'bodyfile',
+    '.bodyfile' : 'bodyfile'
+    }
 
 class Ext4Parser:
-    def __init__(self, filepath):
+    def __init__(self, filepath, backend=None, renderer=None, partition=None, cache_size=None):
         self.console = Console()
-        # self.filepath = filepath
-        # self.filepath = filepath
-        
+        if renderer is None:
+            renderer = Ext4NullRenderer()
+        self.renderer = renderer
         self.filepath = filepath
-        file_size = Path(filepath).stat().st_size 
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[bold green]Reading file..."),
-            transient=True
-        ) as progress:
-            task = progress.add_task("[cyan]Loading...", total=file_size)
-
-            with open(filepath, "rb") as f:
-                self.f = f.read()  # Read the entire file
-
-                # Complete the task once file is fully read
-                progress.update(task, advance=file_size)
-                console.print("[bold green]File read successfully![/bold green]")
-
-        # print(f"File {filepath} read successfully. Total size: {len(self.f)} bytes")
-               
+        self.backend = backend
+        self.f = open_ext4_image(filepath, backend)
+        # one filesystem of a whole disk image, see ext4_partitions(); a disk
+        # image holding a single ext4 partition opens that one
+        self.disk_partitions = None
+        if partition is None and not ext4_probe(self.f):
+            self.disk_partitions = [candidate for candidate in ext4_partitions(self.f) if candidate.scheme != 'none']
+            ext4_candidates = [candidate for candidate in self.disk_partitions if candidate.is_ext4]
+            if len(ext4_candidates) == 1:
+                partition = ext4_candidates[0]
+        self.partition = partition
+        if partition is not None:
+            self.f = WindowImage(self.f, partition.offset, partition.size, owns_base=not isinstance(backend, Ext4Image))
+        # backends without a memory buffer read through a block cache
+        self.cache_size = EXT4_BLOCK_CACHE_BYTES if cache_size is None else cache_size
+        if self.cache_size and self.f.buffer is None and not isinstance(self.f, CachedImage):
+            self.f = CachedImage(self.f, self.cache_size, owns_base=partition is not None or not isinstance(backend, Ext4Image))
+
         self.ext4_superblock = {
             'sb_inodes_count'           : 0,
             'sb_blocks_count_lo'        : 0,
@@ -369,267 +2992,1169 @@ class Ext4Parser:
     
             }
         
-        self.ext4_blockgroupdescriptor = {
-            'bg_block_bitmap_lo'         : 0, 
-            'bg_inode_bitmap_lo'         : 0,  
-            'bg_inode_table_lo'          : 0,  
-            'bg_free_blocks_count_lo'    : 0,  
-            'bg_free_inodes_count_lo'    : 0,  
-            'bg_used_dirs_count_lo'      : 0,  
-            'bg_flags'                   : EXT4_BG_FLAGS['EXT2_BG_INODE_UNINIT'],  
-            'bg_exclude_bitmap_lo'       : 0,  
-            'bg_reserved1'               : 0,  
-            'bg_itable_unused_lo'        : 0,  
-            'bg_checksum'                : 0,  
-            #if EXT4_FEATURE_INCOMPAT_64BIT and 'sb_desc_size' > 32
-            'bg_block_bitmap_hi'         : 0, 
-            'bg_inode_bitmap_hi'         : 0, 
-            'bg_inode_table_hi'          : 0, 
-            'bg_free_blocks_count_hi'    : 0, 
-            'bg_free_inodes_count_hi'    : 0, 
-            'bg_used_dirs_count_hi'      : 0, 
-            'bg_itable_unused_hi'        : 0, 
-            'bg_exclude_bitmap_hi'       : 0, 
-            'bg_reserved2'               : 0, 
-            'bg_reserved3'               : 0, 
-                 }
+        self.ext4_superblock_record = None
+        self.ext4_geometry = None
+        self.ext4_group_table = None
+        self.ext4_dir_tree = None
+        self.extent_node_cache = {}
+        self.ext4_journal_map = None
+        self.ext4_journal_index = None
+        self.ext4_journal_escaped = None
+        self.ext4_journal_revokes = None
         self.maxinode=0
-        self.ext4_inode = {
-            'i_mode'                     : EXT4_INODE_MODE['S_IXOTH'],
-            'i_uid'                      : 0,  
-            'i_size_lo'                  : 0,  
-            'i_atime'                    : 0,  
-            'i_ctime'                    : 0,  
-            'i_mtime'                    : 0,  
-            'i_dtime'                    : 0,  
-            'i_gid'                      : 0,  
-            'i_links_count'              : 0,  
-            'i_blocks_lo'                : 0,  
-            'i_flags'                    : EXT4_INODE_FLAGS['EXT4_SECRM_FL'],
-            'l_i_version'                : 0,  
-            'i_block'                    : 0,  
-            'i_generation'               : 0,  
-            'i_file_acl_lo'              : 0,  
-            'i_size_high'                : 0,  
-            'i_obso_faddr'               : 0,  
-            'l_i_blocks_high'            : 0,  
-            'l_i_file_acl_high'          : 0,  
-            'l_i_uid_high'               : 0,  
-            'l_i_gid_high'               : 0,  
-            'l_i_reserved2'              : 0,  
-            'i_extra_isize'              : 0,  
-            'i_pad1'                     : 0,  
-            'i_ctime_extra'              : 0,  
-            'i_mtime_extra'              : 0,  
-            'i_atime_extra'              : 0,  
-            'i_crtime'                   : 0,  
-            'i_crtime_extra'             : 0,  
-            'i_version_hi'               : 0,
-            'i_projid'                   : 0,
-            'i_reserved'                 : 0,
-            }
-        
-        self.ext4_extent_header = {
-            'eh_magic'                   : EXT4_EXTENT_TREE_MAGIC,
-            'eh_entries'                 : 0, 
-            'eh_max'                     : 0, 
-            'eh_depth'                   : 0, # if 0,this extent node points to data blocks, otherwise, this extent node points to other extent nodes
-            'eh_generation'              : 0,
-            }
-            
-        self.ext4_extent_header_copy = {
-            'eh_magic'                   : EXT4_EXTENT_TREE_MAGIC,
-            'eh_entries'                 : 0, 
-            'eh_max'                     : 0, 
-            'eh_depth'                   : 0, # if 0,this extent node points to data blocks, otherwise, this extent node points to other extent nodes
-            'eh_generation'              : 0,
-            }
-        
-        self.ext4_extent = {
-            'ee_block'                   : 0,
-            'ee_len'                     : 0,
-            'ee_start_hi'                : 0,
-            'ee_start_lo'                : 0,
-            }
-        
-        self.ext4_extent_copy = {
-            'ee_block'                   : 0,
-            'ee_len'                     : 0,
-            'ee_start_hi'                : 0,
-            'ee_start_lo'                : 0,
-            }
-        
-        self.ext4_extent_idx = {
-            'ei_block'                   : 0, 
-            'ei_leaf_lo'                 : 0,                                               
-            'ei_leaf_hi'                 : 0, 
-            'ei_unused'                  : 0, 
-            }
+        # legacy walk: also decode unallocated inode slots, to find deleted inodes
+        self.sweep_unallocated = False
+        # legacy walk: skip slots with no size, or no owner and no blocks
+        self.skip_empty_inodes = True
 
-        self.ext4_extent_idx_copy = {
-            'ei_block'                   : 0, 
-            'ei_leaf_lo'                 : 0,                                               
-            'ei_leaf_hi'                 : 0, 
-            'ei_unused'                  : 0, 
-            }
-        
-        self.ext4_dir_entry = {
-            'inode'                      : 0,  
-            'rec_len'                    : 0,  
-            'name_len'                   : 0,  
-            'name'                       : "", 
-        }
-        
-        self.ext4_dir_entry_2 = {
-            'inode'                      : 0,  
-            'rec_len'                    : 0,  
-            'name_len'                   : 0,  
-            'file_type'                  : EXT4_FILE_TYPE['EXT4_FT_UNKNOWN'],
-            'name'                       : "",
-            }
-        
-        self.dx_root = {
-            'dot_inode'                  : 0,  
-            'dot_rec_len'                : 0,  
-            'dot_name_len'               : 0,  
-            'dot_file_type'              : 0,  
-            'dot_name'                   : "", 
-            'dot_dot_inode'              : 0,  
-            'dot_dot_rec_len'            : 0,  
-            'dot_dot_name_len'           : 0,  
-            'dot_dot_file_type'          : 0,  
-            'dot_dot_name'               : "", 
-            'reserved_zero'              : 0,  
-            'hash_version'               : EXT4_HASH_VERSION['DX_HASH_LEGACY'],
-            'info_length'                : 0, 
-            'indirect_levels'            : 0, 
-            'unused_flags'               : 0, 
-            'limit'                      : 0, 
-            'count'                      : 0, 
-            'block'                      : 0, 
-            'entries'                    : 0, 
-            }
-        
-        self.dx_node = {
-            'fake_inode'                 : 0,  
-            'fake_rec_len'               : 0,  
-            'fake_name_len'              : 0,  
-            'fake_file_type'             : 0,  
-            'limit'                      : 0,  
-            'count'                      : 0,  
-            'block'                      : 0,  
-            'entries'                    : 0,  
-            }
-        
-        self.dx_entry = {
-            'hash'                       : 0,  
-            'block'                      : 0,  
-            }
-        
-        self.ext4_xattr_header = {
-            'xh_magic'                   : EXT4_XATTR_MAGIC,  
-            'xh_refcount'                : 0,  
-            'xh_blocks'                  : 0,  
-            'xh_hash'                    : 0,  
-            'xh_reserved'                : 0,  
-            }
-        
-        self.ext4_xattr_entry = {
-            'xe_name_len'                : 0,  
-            'xe_name_index'              : 0,  
-            'xe_value_offs'              : 0,                                    
-            'xe_value_block'             : 0,                                  
-            'xe_value_size'              : 0,  
-            'xe_hash'                    : 0,  
-            'xe_name'                    : "", 
-            }
-
-            
         self.DEBUG = False
         
+    def close(self):
+        self.f.close()
+
+    def cache_stats(self):
+        # hit / miss counters of the block cache, None when it is not used
+        return self.f.stats() if isinstance(self.f, CachedImage) else None
+
     def str2int_le(self, str_list):
         return int.from_bytes(str_list.encode(), byteorder='little')
 
-    def parse_ext4(self):
+    def parse_ext4(self, jobs=1):
         offset = 0
         offset = offset+1024 # Superblock is at 1024 bytes
         self.parse_ext4_superblock(offset)
         # exit()
-        offset = offset + 1024 #end of superblock
-        offset = offset + 2048 #start of block group descriptor and end of free space
         # count_of_blocks = self.ext4_superblock['sb_blocks_count_lo']
         # bg_num =math.ceil((count_of_blocks - self.ext4_superblock['sb_first_data_block']) / self.ext4_superblock['sb_blocks_per_group'])
         # print(f"Total Block Groups: {bg_num}")
-        count_of_bg=math.ceil(self.ext4_superblock['sb_blocks_count_lo']/self.ext4_superblock['sb_blocks_per_group'])
-        print(f"Total Block Groups: {count_of_bg}")
+        count_of_bg=self.ext4_group_count()
+        self.renderer.write(f"Total Block Groups: {count_of_bg}")
         # exit()
-        og_offset=offset
         self.maxinode=self.ext4_superblock['sb_inodes_count']
         for i in range(count_of_bg):
-            print(f"\n\nParsing Block Group {i}:\n\n")
-            self.parse_ext4_block_group_descriptor(og_offset)
-            if self.ext4_superblock['sb_desc_size'] == 32:
-                # print("Azr43l")
-                # exit()
-                og_offset = og_offset + 32
-            else:
-                og_offset = og_offset + 64
+            self.renderer.write(f"\n\nParsing Block Group {i}:\n\n")
+            self.parse_ext4_block_group_descriptor(self.ext4_group_desc_offset(i))
         # if self.ext4_superblock['sb_feature_ro_compat'] & EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_SPARSE_SUPER']:
         #     offset=offset + 32 * count_of_bg
         # else:
         #     offset = offset + 64 * count_of_bg
         # print(f"End of Block Group Descriptor Table: {hex(offset)}")
-        # print("OFFSET: ",hex(og_offset))
         # exit()
+        if jobs > 1:
+            self.parse_ext4_inode_tables_parallel(count_of_bg, jobs)
+            return
         for i in range(count_of_bg):
-            print(f"\n\nParsing Inode Table for Block Group {i}:\n\n")
-            current_bg_offset = int.from_bytes(self.f[offset+8:offset+12], byteorder='little')
-            inode_table_offset=current_bg_offset*EXT4_BLOCK_SZ
+            self.renderer.write(f"\n\nParsing Inode Table for Block Group {i}:\n\n")
+            inode_table_offset=self.ext4_inode_table_offset(i)
             # print(f"Offset of Inode Table: {hex(inode_table_offset)}")
-            # print("offset",hex(offset))
             self.parse_ext4_inode_table(inode_table_offset,i)
-            if self.ext4_superblock['sb_desc_size'] == 32:
-                # print("Azr43l")
-                # exit()
-                offset=offset + 32
-            else:
-                offset = offset + 64
         # print(f"End of Inode Table: {hex(offset)}")
-   
+
+    def parse_ext4_inode_tables_parallel(self, count_of_bg, jobs):
+        # groups are sharded across a process pool, every worker maps the image
+        # itself and the output of each group is written back in group order
+        if isinstance(self.backend, Ext4Image):
+            raise ValueError("parallel scans need a backend name, not an opened image")
+        with multiprocessing.Pool(jobs, initializer=ext4_scan_worker_init, initargs=(self.filepath, self.backend, self.sweep_unallocated, self.group_table(), self.partition, self.cache_size)) as pool:
+            for i, output in enumerate(pool.imap(ext4_scan_worker_group, range(count_of_bg))):
+                self.renderer.write(f"\n\nParsing Inode Table for Block Group {i}:\n\n")
+                self.renderer.write(output, end="")
+
+    def read_ext4_superblock(self, offset=1024):
+        superblock = EXT4_SUPERBLOCK_LAYOUT.unpack(self.f, offset)
+        self.ext4_check_superblock(superblock, offset)
+        self.ext4_superblock.update(EXT4_SUPERBLOCK_LAYOUT.as_dict(superblock))
+        self.ext4_superblock_record = superblock
+        backup_bgs = struct.unpack('<2I', bytes(self.f[offset+EXT4_SB_BACKUP_BGS_OFFSET:offset+EXT4_SB_BACKUP_BGS_OFFSET+8]).ljust(8, b'\x00'))
+        self.ext4_geometry = Ext4Geometry(self.ext4_superblock, backup_bgs)
+        if isinstance(self.f, CachedImage) and self.f.block_size != self.geometry.block_size:
+            self.f.set_block_size(self.geometry.block_size)
+        self.ext4_group_table = None
+        self.maxinode=self.ext4_superblock['sb_inodes_count']
+        return superblock
+
+    def ext4_check_superblock(self, superblock, offset):
+        # the geometry divides by these, garbage here (a partition table, a
+        # wiped superblock) has to stop before it
+        problem = None
+        if superblock.sb_magic != EXT4_SUPER_MAGIC:
+            problem = f"bad magic {superblock.sb_magic:#06x}"
+        elif superblock.sb_blocks_per_group == 0 or superblock.sb_inodes_per_group == 0:
+            problem = f"{superblock.sb_blocks_per_group} blocks and {superblock.sb_inodes_per_group} inodes per group"
+        elif superblock.sb_log_block_size > EXT4_MAX_LOG_BLOCK_SIZE:
+            problem = f"log block size {superblock.sb_log_block_size}"
+        elif superblock.sb_rev_level != EXT4_REV_LEVEL['EXT4_GOOD_OLD_REV'] and superblock.sb_inode_size == 0:
+            problem = "inode size 0"
+        if problem is None:
+            return
+        message = f"no valid ext4 superblock at byte {offset}: {problem}"
+        if self.disk_partitions:
+            ext4_candidates = [candidate for candidate in self.disk_partitions if candidate.is_ext4]
+            if ext4_candidates:
+                message += f"; this is a {self.disk_partitions[0].scheme} disk image, choose a partition with --partition N: {', '.join(f'{candidate.index} ({candidate.name or candidate.type})' for candidate in ext4_candidates)}"
+            else:
+                message += f"; this is a {self.disk_partitions[0].scheme} disk image without ext4 partitions"
+        raise Ext4CorruptionError(message)
+
+    @property
+    def geometry(self):
+        # filled in with the superblock, on first use
+        self.superblock()
+        return self.ext4_geometry
+
+    def ext4_group_count(self):
+        return self.geometry.group_count
+
+    def ext4_group_desc_offset(self, group_num):
+        return self.geometry.group_desc_offset(group_num)
+
+    def group_table(self):
+        if self.ext4_group_table is None:
+            self.superblock()
+            desc_size = self.geometry.desc_size
+            data = b''.join(bytes(self.f[offset:offset+count*desc_size]).ljust(count*desc_size, b'\x00') for _, offset, count in self.geometry.group_desc_runs())
+            self.ext4_group_table = Ext4GroupTable(data, desc_size)
+        return self.ext4_group_table
+
+    def ext4_inode_table_offset(self, group_num):
+        return self.geometry.block_offset(self.group_table().inode_table[group_num])
+
+    def ext4_inode_table_array(self, offset):
+        # zero-copy numpy view of one group's inode table
+        dtype = ext4_inode_dtype(self.geometry.inode_size)
+        if offset >= len(self.f):
+            # past the end of a truncated image: no rows, as the scalar reads
+            # there come back as zeroed, unused inodes
+            return np.zeros(0, dtype=dtype)
+        count = min(self.ext4_superblock['sb_inodes_per_group'], max(0, len(self.f) - offset) // dtype.itemsize)
+        if self.f.buffer is not None:
+            return np.frombuffer(self.f.buffer, dtype=dtype, count=count, offset=offset)
+        return np.frombuffer(self.f[offset:offset+count*dtype.itemsize], dtype=dtype, count=count)
+
+    def ext4_inode_table_used_mask(self, table):
+        # same test parse_ext4_inode uses to skip empty slots
+        return (table['i_size_lo'] != 0) & ((table['i_uid'] != 0) | (table['i_block'][:, 0] != 0))
+
+    def ext4_inode_table_mask(self, table, allocated_only=True):
+        if allocated_only:
+            return (table['i_mode'] != 0) & (table['i_links_count'] != 0) & (table['i_dtime'] == 0)
+        return self.ext4_inode_table_used_mask(table)
+
+    def ext4_group_desc_csum(self):
+        # bg_flags and bg_itable_unused are only maintained with group descriptor checksums
+        ro_compat = self.ext4_superblock['sb_feature_ro_compat']
+        return bool(ro_compat & (EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_GDT_CSUM'] | EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_METADATA_CSUM']))
+
+    def ext4_inode_table_limit(self, group_num):
+        # slots from here on were never handed out since mkfs or the last fsck
+        inodes_per_group = self.ext4_superblock['sb_inodes_per_group']
+        if not self.ext4_group_desc_csum():
+            return inodes_per_group
+        table = self.group_table()
+        if table.flags[group_num] & EXT4_BG_FLAGS['EXT2_BG_INODE_UNINIT']:
+            return 0
+        return max(0, inodes_per_group - table.itable_unused[group_num])
+
+    def ext4_inode_bitmap(self, group_num, count):
+        # allocation bits of the first count slots, decoded in one go
+        offset = self.geometry.block_offset(self.group_table().inode_bitmap[group_num])
+        data = self.f[offset:offset+(count+7)//8]
+        if np is not None:
+            return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count, bitorder='little').astype(bool)
+        return [bool(data[slot >> 3] >> (slot & 7) & 1) for slot in range(min(count, len(data)*8))]
+
+    def ext4_inode_table_slots(self, group_num):
+        # allocated slots of a group, only the inode bitmap is read so zeroed
+        # and never used parts of the inode table are not touched
+        limit = self.ext4_inode_table_limit(group_num)
+        if limit == 0:
+            return np.zeros(0, dtype=np.int64) if np is not None else []
+        bitmap = self.ext4_inode_bitmap(group_num, limit)
+        if np is not None:
+            return np.flatnonzero(bitmap)
+        return [slot for slot, used in enumerate(bitmap) if used]
+
+    def ext4_masked_slots(self, table, slots, mask):
+        # slots whose rows pass mask, a range stands for the whole table
+        if isinstance(slots, range):
+            return np.flatnonzero(mask(table))
+        slots = slots[slots < len(table)]
+        return slots[mask(table[slots])]
+
+    def ext4_inode_candidates(self, group_num, allocated_only=True):
+        if allocated_only:
+            return self.ext4_inode_table_slots(group_num)
+        return range(self.ext4_superblock['sb_inodes_per_group'])
+
+    def scan_ext4_inode_table_batch(self, offset, group_num, allocated_only=True):
+        if np is None:
+            raise RuntimeError("numpy is required for batch inode table scans")
+        table = self.ext4_inode_table_array(offset)
+        slots = self.ext4_masked_slots(table, self.ext4_inode_candidates(group_num, allocated_only), lambda rows: self.ext4_inode_table_mask(rows, allocated_only))
+        return self.ext4_inode_columns(table[slots], slots, group_num)
+
+    def ext4_inode_columns(self, rows, slots, group_num):
+        u64 = np.uint64
+        columns = {
+            'ino'    : slots.astype(u64) + u64(group_num*self.ext4_superblock['sb_inodes_per_group'] + 1),
+            'mode'   : rows['i_mode'],
+            'uid'    : rows['i_uid'].astype(np.uint32) | (rows['l_i_uid_high'].astype(np.uint32) << 16),
+            'gid'    : rows['i_gid'].astype(np.uint32) | (rows['l_i_gid_high'].astype(np.uint32) << 16),
+            'size'   : rows['i_size_lo'].astype(u64) | (rows['i_size_high'].astype(u64) << u64(32)),
+            'atime'  : rows['i_atime'],
+            'ctime'  : rows['i_ctime'],
+            'mtime'  : rows['i_mtime'],
+            'dtime'  : rows['i_dtime'],
+            'crtime' : rows['l_i_crtime'] if 'l_i_crtime' in rows.dtype.names else np.zeros(len(rows), dtype=np.uint32),
+            'flags'  : rows['i_flags'],
+            'links'  : rows['i_links_count'],
+            'blocks' : rows['i_blocks_lo'].astype(u64) | (rows['l_i_blocks_high'].astype(u64) << u64(32)),
+            }
+        return columns
+
+    def iter_ext4_inode_batches(self, allocated_only=True):
+        for group_num in range(self.ext4_group_count()):
+            yield self.scan_ext4_inode_table_batch(self.ext4_inode_table_offset(group_num), group_num, allocated_only)
+
+    def scan_ext4_inodes(self, allocated_only=True):
+        # columnar arrays for every inode of the image, one entry per inode
+        batches = list(self.iter_ext4_inode_batches(allocated_only))
+        if not batches:
+            # no groups at all, same columns with no rows
+            return self.ext4_inode_columns(np.zeros(0, dtype=ext4_inode_dtype(self.geometry.inode_size)), np.zeros(0, dtype=np.intp), 0)
+        return {key: np.concatenate([batch[key] for batch in batches]) for key in batches[0]}
+
+    # Library API, everything below returns immutable records and never prints
+    def superblock(self):
+        if self.ext4_superblock_record is None:
+            self.read_ext4_superblock()
+        return self.ext4_superblock_record
+
+    def group_descriptors(self):
+        self.superblock()
+        desc_size = self.geometry.desc_size
+        for group_num in range(self.ext4_group_count()):
+            yield decode_ext4_group_descriptor(self.f, self.ext4_group_desc_offset(group_num), desc_size)
+
+    def ext4_inode_offset(self, ino):
+        self.superblock()
+        group_num, index = divmod(ino-1, self.ext4_superblock['sb_inodes_per_group'])
+        return self.ext4_inode_table_offset(group_num) + index*self.geometry.inode_size
+
+    def inode(self, ino):
+        return decode_ext4_inode(self.f, self.ext4_inode_offset(ino), self.geometry.inode_size)
+
+    def iter_inodes(self, allocated_only=True):
+        # (ino, inode) pairs, the numpy mask picks the slots when available
+        self.superblock()
+        inode_size = self.geometry.inode_size
+        inodes_per_group = self.ext4_superblock['sb_inodes_per_group']
+        for group_num in range(self.ext4_group_count()):
+            offset = self.ext4_inode_table_offset(group_num)
+            slots = self.ext4_inode_candidates(group_num, allocated_only)
+            if len(slots) == 0:
+                # uninitialized or empty group, its inode table is not touched
+                continue
+            if np is not None:
+                slots = self.ext4_masked_slots(self.ext4_inode_table_array(offset), slots, lambda rows: self.ext4_inode_table_mask(rows, allocated_only)).tolist()
+            for slot in slots:
+                inode = decode_ext4_inode(self.f, offset+slot*inode_size, inode_size)
+                if np is None and not ext4_inode_in_use(inode, allocated_only):
+                    continue
+                yield group_num*inodes_per_group+slot+1, inode
+
+    def iter_extents(self, ino):
+        # extent runs of an inode in logical order
+        inode = self.inode(ino)
+        if not inode.i_flags & EXT4_INODE_FLAGS['EXT4_EXTENTS_FL']:
+            return
+        yield from self.iter_extent_runs(inode.i_block)
+
+    def ext4_extent_node(self, block):
+        node = self.extent_node_cache.get(block)
+        if node is None:
+            if len(self.extent_node_cache) >= EXT4_EXTENT_NODE_CACHE_SIZE:
+                self.extent_node_cache.clear()
+            offset = self.geometry.block_offset(block)
+            node = decode_ext4_extent_node(self.f[offset:offset+self.geometry.block_size])
+            self.extent_node_cache[block] = node
+        return node
+
+    def walk_extent_tree(self, i_block):
+        # iterative pre-order walk over any depth, yields (level, header, entry)
+        # with entry None when a node is entered; loops and bad nodes raise
+        root = decode_ext4_extent_node(i_block)
+        stack = [(root, 0)]
+        seen = set()
+        yield 0, root.header, None
+        while stack:
+            node, position = stack.pop()
+            if position >= len(node.entries):
+                continue
+            stack.append((node, position+1))
+            entry = node.entries[position]
+            yield len(stack)-1, node.header, entry
+            if node.header.eh_depth == 0:
+                continue
+            leaf = ext4_block_addr(entry.ei_leaf_lo, entry.ei_leaf_hi)
+            if leaf in seen:
+                raise Ext4CorruptionError(f"extent tree loops back to block {leaf}")
+            seen.add(leaf)
+            child = self.ext4_extent_node(leaf)
+            if child.header.eh_depth != node.header.eh_depth - 1:
+                raise Ext4CorruptionError(f"extent node at block {leaf} has depth {child.header.eh_depth}, expected {node.header.eh_depth - 1}")
+            stack.append((child, 0))
+            yield len(stack)-1, child.header, None
+
+    def extent_map(self, ino):
+        return self.ext4_inode_map(self.inode(ino))
+
+    def ext4_inode_map(self, inode):
+        # logical -> physical map of extent and indirect block mapped inodes,
+        # empty for inline data and fast symlinks which keep data in i_block
+        if inode.i_flags & EXT4_INODE_FLAGS['EXT4_EXTENTS_FL']:
+            runs = self.iter_extent_runs(inode.i_block)
+        elif inode.i_flags & EXT4_INODE_FLAGS['EXT4_INLINE_DATA_FL'] or ext4_is_fast_symlink(inode):
+            runs = ()
+        else:
+            runs = self.iter_block_map_runs(inode.i_block, ext4_file_size(inode))
+        return Ext4ExtentMap(runs, self.geometry.block_size)
+
+    def iter_extent_runs(self, i_block):
+        for level, header, entry in self.walk_extent_tree(i_block):
+            if entry is not None and header.eh_depth == 0:
+                yield ext4_extent_run(entry)
+
+    def iter_block_map_blocks(self, pointer, depth, logical, count):
+        # (logical, physical) of the data blocks below a block pointer of the
+        # given indirection depth, at most count of them; zero pointers are holes
+        if pointer == 0:
+            return
+        if pointer >= self.geometry.blocks_count:
+            raise Ext4CorruptionError(f"block map points at block {pointer} past the end of the filesystem")
+        if depth == 0:
+            yield logical, pointer
+            return
+        block_size = self.geometry.block_size
+        per_block = block_size // 4
+        span = per_block ** (depth - 1)
+        offset = self.geometry.block_offset(pointer)
+        pointers = struct.unpack(f'<{per_block}I', self.f[offset:offset+block_size])
+        for i in range(min(per_block, -(-count // span))):
+            yield from self.iter_block_map_blocks(pointers[i], depth - 1, logical + i*span, count - i*span)
+
+    def iter_block_map_runs(self, i_block, size):
+        # runs of an ext2/ext3 style file: EXT4_NDIR_BLOCKS direct pointers in
+        # i_block, then a single, double and triple indirect block; contiguous
+        # blocks are merged into one run
+        per_block = self.geometry.block_size // 4
+        count = -(-size // self.geometry.block_size)
+        pointers = struct.unpack(f'<{EXT4_N_BLOCKS}I', i_block[:EXT4_N_BLOCKS*4])
+        roots = [(pointer, 0, logical) for logical, pointer in enumerate(pointers[:EXT4_NDIR_BLOCKS])]
+        logical = EXT4_NDIR_BLOCKS
+        for depth, pointer in enumerate(pointers[EXT4_IND_BLOCK:], 1):
+            roots.append((pointer, depth, logical))
+            logical += per_block ** depth
+        run = None
+        for pointer, depth, first in roots:
+            if first >= count:
+                break
+            for logical, physical in self.iter_block_map_blocks(pointer, depth, first, count - first):
+                if run is not None and run.logical + run.length == logical and run.physical + run.length == physical:
+                    run = run._replace(length=run.length + 1)
+                    continue
+                if run is not None:
+                    yield run
+                run = Ext4ExtentRun(logical, physical, 1, False)
+        if run is not None:
+            yield run
+
+    def iter_dir_entries(self, ino):
+        for run in self.extent_map(ino):
+            if run.unwritten:
+                continue
+            block_size = self.geometry.block_size
+            offset = self.geometry.block_offset(run.physical)
+            for block in range(run.length):
+                block_offset = offset + block*block_size
+                yield from ext4_iter_dir_block(self.f[block_offset:block_offset+block_size], ino)
+
+    def open(self, ino):
+        # read-only binary file object over an inode's contents
+        inode = self.inode(ino)
+        size = ext4_file_size(inode)
+        if inode.i_flags & EXT4_INODE_FLAGS['EXT4_INLINE_DATA_FL']:
+            # the first 60 bytes live in i_block, the rest in the system.data xattr
+            data = inode.i_block + b''.join(xattr.value for xattr in self.iter_xattrs(ino) if xattr.name == 'system.data')
+            size = min(size, len(data))
+            return Ext4File(data, [[0, size, 0]] if size else [], size)
+        if ext4_is_fast_symlink(inode):
+            # the target is stored in i_block
+            return Ext4File(inode.i_block, [[0, size, 0]] if size else [], size)
+        # extent tree or indirect block map
+        return Ext4File(self.f, ext4_file_segments(self.ext4_inode_map(inode), size), size)
+
+    def extract(self, path, dest):
+        # copy a file out by path or inode number, dest is a path or a writable
+        # binary file; returns the number of bytes written
+        ino = path if isinstance(path, int) else self.lookup(path)
+        if ino is None:
+            raise FileNotFoundError(f"'{path}' not found in the image")
+        with self.open(ino) as src:
+            if isinstance(dest, (str, os.PathLike)):
+                with open(dest, 'wb') as out:
+                    return src.copy_to(out)
+            return src.copy_to(dest)
+
+    def walk(self, path='/'):
+        # (path, entry) for everything below path, depth first; '.' and '..'
+        # are skipped and every directory is entered only once
+        ino = self.lookup(path)
+        if ino is None:
+            raise FileNotFoundError(f"'{path}' not found in the image")
+        stack = [(path.rstrip('/'), ino)]
+        seen = {ino}
+        while stack:
+            parent, dir_ino = stack.pop()
+            for entry in self.iter_dir_entries(dir_ino):
+                if entry.name in ('.', '..'):
+                    continue
+                child = f"{parent}/{entry.name}"
+                yield child, entry
+                if entry.inode in seen:
+                    continue
+                if entry.file_type == EXT4_FILE_TYPE['EXT4_FT_DIR'] or entry.file_type == EXT4_FILE_TYPE['EXT4_FT_UNKNOWN'] and (self.inode(entry.inode).i_mode & 0xF000) == EXT4_INODE_MODE['S_IFDIR']:
+                    seen.add(entry.inode)
+                    stack.append((child, entry.inode))
+
+    def extract_tree(self, path, dest, workers=EXT4_EXTRACT_WORKERS):
+        # bulk extraction of everything below path into the directory dest; the
+        # data of all files is read in one forward sweep ordered by physical
+        # address while a thread pool writes it out, returns (files, bytes)
+        # names come from an untrusted image: every target is resolved below
+        # dest, nothing already on disk is followed, files are created with
+        # O_EXCL | O_NOFOLLOW and symlinks only once everything else exists
+        os.makedirs(dest, exist_ok=True)
+        root = os.path.realpath(dest)
+        files = []
+        links = []
+        claimed = set()
+        # entries are only extracted into directories made here, the rest of
+        # a directory that lost its name to another entry is skipped
+        directories = {root}
+        for name, entry in self.walk(path):
+            target = ext4_extract_target(root, os.path.relpath(name, path))
+            if target is None or target in claimed or os.path.dirname(target) not in directories:
+                continue
+            claimed.add(target)
+            kind = self.inode(entry.inode).i_mode & 0xF000
+            if kind == EXT4_INODE_MODE['S_IFDIR']:
+                os.makedirs(target, exist_ok=True)
+                directories.add(target)
+            elif kind == EXT4_INODE_MODE['S_IFLNK']:
+                with self.open(entry.inode) as src:
+                    links.append((target, os.fsdecode(src.read())))
+            elif kind == EXT4_INODE_MODE['S_IFREG']:
+                if os.path.lexists(target) and not os.path.isdir(target):
+                    # left over from an earlier extraction, unlinking never follows
+                    os.unlink(target)
+                files.append((target, self.open(entry.inode)))
+
+        # (image offset, file, file offset, length) for every piece of data
+        pieces = []
+        remaining = {}
+        for index, (target, src) in enumerate(files):
+            if isinstance(src.source, Ext4Image):
+                for offset, length, physical in src.segments:
+                    if physical is None:
+                        continue
+                    for start in range(0, length, EXT4_READ_CHUNK_SIZE):
+                        pieces.append((physical+start, index, offset+start, min(EXT4_READ_CHUNK_SIZE, length-start)))
+                        remaining[index] = remaining.get(index, 0) + 1
+            if index not in remaining:
+                # inline data, or nothing but holes
+                with os.fdopen(ext4_extract_create(target), 'wb') as out:
+                    src.copy_to(out)
+        pieces.sort()
+
+        fds = {}
+        lock = threading.Lock()
+        # bounds the data held in memory while the writers catch up
+        window = threading.BoundedSemaphore(2 * max(1, workers))
+
+        def write(index, data, offset):
+            try:
+                while data:
+                    written = os.pwrite(fds[index], data, offset)
+                    data, offset = data[written:], offset + written
+            finally:
+                window.release()
+                with lock:
+                    remaining[index] -= 1
+                    if remaining[index] == 0:
+                        os.close(fds.pop(index))
+
+        futures = []
+        block_size = self.geometry.block_size
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            i = 0
+            while i < len(pieces):
+                # pieces of neighbouring blocks, even of different files, share
+                # one read; the slack after a file tail is read and dropped
+                start = end = pieces[i][0]
+                j = i
+                while j < len(pieces) and pieces[j][0] < end + block_size and pieces[j][0] + pieces[j][3] - start <= EXT4_READ_CHUNK_SIZE:
+                    end = max(end, pieces[j][0] + pieces[j][3])
+                    j += 1
+                data = memoryview(self.f.read(start, end - start))
+                for physical, index, offset, length in pieces[i:j]:
+                    with lock:
+                        if index not in fds:
+                            # created at full size so holes stay sparse
+                            fds[index] = ext4_extract_create(files[index][0])
+                            os.ftruncate(fds[index], files[index][1].size)
+                    window.acquire()
+                    futures.append(pool.submit(write, index, data[physical-start:physical-start+length], offset))
+                i = j
+        for future in futures:
+            future.result()
+        for target, link in links:
+            # placed last so no write above can pass through one of them
+            if ext4_extract_target(root, os.path.relpath(target, root)) != target:
+                continue
+            if os.path.lexists(target):
+                if os.path.isdir(target) and not os.path.islink(target):
+                    continue
+                os.unlink(target)
+            os.symlink(link, target)
+        return len(files), sum(src.size for target, src in files)
+
+    def ext4_dir_block(self, extent_map, logical):
+        offset = extent_map.offset(logical)
+        if offset is None:
+            return bytes(self.geometry.block_size)
+        return self.f[offset:offset+self.geometry.block_size]
+
+    def ext4_hash_seed(self):
+        return struct.unpack('<4I', self.superblock().sb_hash_seed)
+
+    def ext4_dx_root_info(self, extent_map):
+        # dx_root_info of an indexed directory, None when the index cannot be used
+        info = EXT4_DX_ROOT_INFO_LAYOUT.unpack(self.ext4_dir_block(extent_map, 0), EXT4_DX_ROOT_INFO_OFFSET)
+        if info.reserved_zero != 0 or info.info_length != EXT4_DX_ROOT_INFO_LAYOUT.size or info.indirect_levels >= EXT4_HTREE_LEVEL:
+            return None
+        return info
+
+    def ext4_dx_node(self, extent_map, logical, info=None):
+        # dx entries of the root (with its info) or of an interior index block,
+        # the count/limit header doubles as entry 0 whose hash is implicitly 0
+        node = self.ext4_dir_block(extent_map, logical)
+        offset = EXT4_DX_ROOT_INFO_OFFSET + info.info_length if info else EXT4_DX_NODE_ENTRIES_OFFSET
+        countlimit = EXT4_DX_COUNTLIMIT_LAYOUT.unpack(node, offset)
+        if countlimit.count == 0 or countlimit.count > countlimit.limit or offset + countlimit.count*EXT4_DX_ENTRY_LAYOUT.size > len(node):
+            return None
+        entries = [EXT4_DX_ENTRY_LAYOUT.record(0, countlimit.block)]
+        entries += [EXT4_DX_ENTRY_LAYOUT.unpack(node, offset + i*EXT4_DX_ENTRY_LAYOUT.size) for i in range(1, countlimit.count)]
+        return entries
+
+    def ext4_dx_frames(self, extent_map, info, target=None):
+        # path from the root to a leaf as one [entries, position] frame per
+        # level, following the hash target or the first entries when None
+        frames = []
+        node = self.ext4_dx_node(extent_map, 0, info)
+        for level in range(info.indirect_levels + 1):
+            if node is None:
+                return None
+            i = 0 if target is None else bisect.bisect_right([entry.hash for entry in node], target) - 1
+            frames.append([node, i])
+            if level < info.indirect_levels:
+                node = self.ext4_dx_node(extent_map, node[i].block)
+        return frames
+
+    def ext4_dx_next_leaf(self, extent_map, frames):
+        # step frames to the next leaf: climb while a level is used up, advance
+        # there and take the first entries back down. Returns the level that
+        # advanced, None once the tree is done
+        level = len(frames) - 1
+        while frames[level][1] + 1 >= len(frames[level][0]):
+            if level == 0:
+                return None
+            level -= 1
+        frames[level][1] += 1
+        for below in range(level + 1, len(frames)):
+            entries, i = frames[below - 1]
+            node = self.ext4_dx_node(extent_map, entries[i].block)
+            if node is None:
+                return None
+            frames[below] = [node, 0]
+        return level
+
+    def ext4_dx_leaf_blocks(self, extent_map, name):
+        # logical leaf blocks that can hold name, found by descending the htree
+        # with the on-disk hash; None when the index cannot be used
+        info = self.ext4_dx_root_info(extent_map)
+        if info is None:
+            return None
+        hash_version = info.hash_version
+        if hash_version <= EXT4_HASH_VERSION['DX_HASH_TEA'] and self.ext4_superblock['sb_flags'] & EXT4_MISC_FLAGS['EXT2_FLAGS_UNSIGNED_HASH']:
+            hash_version += EXT4_HASH_VERSION['DX_HASH_LEGACY_UNSIGNED']
+        if hash_version > EXT4_HASH_VERSION['DX_HASH_TEA_UNSIGNED']:
+            return None
+        target = ext4_dx_hash(name, hash_version, self.ext4_hash_seed())[0]
+        frames = self.ext4_dx_frames(extent_map, info, target)
+        if frames is None:
+            return None
+        entries, i = frames[-1]
+        blocks = [entries[i].block]
+        # colliding hashes spill into the next leaf, marked by the low bit of
+        # the hash that starts it; like ext4_htree_next_block that hash can be
+        # in a parent when the leaf is the first one below the next index node
+        while True:
+            level = self.ext4_dx_next_leaf(extent_map, frames)
+            if level is None:
+                break
+            entries, i = frames[level]
+            if entries[i].hash & ~1 != target:
+                break
+            entries, i = frames[-1]
+            blocks.append(entries[i].block)
+        return blocks
+
+    def lookup_dir_entry(self, dir_ino, name):
+        if isinstance(name, str):
+            name = name.encode('utf-8', 'surrogateescape')
+        extent_map = self.extent_map(dir_ino)
+        blocks = None
+        if self.inode(dir_ino).i_flags & EXT4_INODE_FLAGS['EXT4_INDEX_FL'] and name not in (b'.', b'..'):
+            blocks = self.ext4_dx_leaf_blocks(extent_map, name)
+        if blocks is None:
+            # linear directory, or an index we cannot use
+            blocks = [run.logical + i for run in extent_map if not run.unwritten for i in range(run.length)]
+        wanted = ext4_decode_name(name)
+        for logical in blocks:
+            for entry in ext4_iter_dir_block(self.ext4_dir_block(extent_map, logical), dir_ino):
+                if entry.name == wanted:
+                    return entry
+        return None
+
+    def dir_tree(self):
+        # every directory edge in one pass over the allocated directories, kept
+        if self.ext4_dir_tree is None:
+            tree = Ext4DirTree()
+            for ino, inode in self.iter_inodes():
+                if (inode.i_mode & 0xF000) != EXT4_INODE_MODE['S_IFDIR']:
+                    continue
+                for entry in self.iter_dir_entries(ino):
+                    if entry.name not in ('.', '..'):
+                        tree.add(ino, entry.inode, entry.file_type, entry.name)
+            tree.finish()
+            self.ext4_dir_tree = tree
+        return self.ext4_dir_tree
+
+    def path_of(self, ino):
+        return self.dir_tree().path_of(ino)
+
+    def lookup(self, path):
+        # inode number of an absolute path, symlinks are not followed
+        self.superblock()
+        ino = EXT4_ROOT_INO
+        for name in path.split('/'):
+            if not name:
+                continue
+            entry = self.lookup_dir_entry(ino, name)
+            if entry is None:
+                return None
+            ino = entry.inode
+        return ino
+
+    def iter_xattrs(self, ino):
+        inode = self.inode(ino)
+        inode_size = self.geometry.inode_size
+        if inode_size > EXT4_INODE_ENTRY_SZ:
+            offset = self.ext4_inode_offset(ino)
+            data = self.f[offset:offset+inode_size]
+            start = EXT4_INODE_ENTRY_SZ + inode.l_i_extra_isize
+            if int.from_bytes(data[start:start+4], byteorder='little') == EXT4_XATTR_MAGIC:
+                yield from ext4_iter_xattr_entries(data, start+4, start+4)
+        acl = inode.i_file_acl_lo | (inode.l_i_file_acl_high << 32)
+        if acl:
+            offset = self.geometry.block_offset(acl)
+            data = self.f[offset:offset+self.geometry.block_size]
+            if EXT4_XATTR_HEADER_LAYOUT.unpack(data).xh_magic == EXT4_XATTR_MAGIC:
+                yield from ext4_iter_xattr_entries(data, EXT4_XATTR_HEADER_LAYOUT.size, 0)
+
+    def timeline(self, paths=True, run_events=EXT4_TIMELINE_RUN_EVENTS):
+        # Ext4TimelineEvent rows of every allocated inode in time order, path
+        # is the first name of the inode (None for orphans) or None with paths=False
+        tree = self.dir_tree() if paths else None
+        events = ((time_ns, event, ino) for ino, inode in self.iter_inodes() for time_ns, event in ext4_inode_times(inode))
+        for time_ns, event, ino in ext4_sorted_events(events, run_events):
+            yield Ext4TimelineEvent(time_ns, EXT4_TIMELINE_EVENTS[event], ino, tree.path_of(ino) if tree is not None else None)
+
+    def write_bodyfile(self, out):
+        # one line per name, mactime does the sorting; returns the line count
+        tree = self.dir_tree()
+        count = 0
+        for ino, inode in self.iter_inodes():
+            for path in tree.paths_of(ino) or [ext4_orphan_path(ino) if ino != EXT4_ROOT_INO else '/']:
+                out.write(ext4_bodyfile_line(path, ino, inode))
+                count += 1
+        return count
+
+    def write_timeline(self, path, fmt=None):
+        if fmt is None:
+            fmt = EXT4_TIMELINE_SUFFIXES.get(Path(path).suffix.lower(), 'csv')
+        if fmt not in EXT4_TIMELINE_WRITERS:
+            raise ValueError(f"unknown timeline format '{fmt}', expected one of {', '.join(sorted(EXT4_TIMELINE_WRITERS))}")
+        with open(path, 'w', encoding='utf-8', errors='surrogateescape', newline='') as out:
+            if fmt == 'bodyfile':
+                return self.write_bodyfile(out)
+            return EXT4_TIMELINE_WRITERS[fmt](self.timeline(), out)
+
+    def fingerprint(self):
+        # cheap identity of the image: size, uuid, mount/write times and a
+        # handful of sampled blocks, enough to notice the image was changed
+        sb = self.superblock()
+        digest = hashlib.sha256(f"{len(self.f)}:{sb.sb_uuid.hex()}:{sb.sb_mtime}:{sb.sb_wtime}:{sb.sb_kbytes_written}".encode())
+        block_size = self.geometry.block_size
+        blocks = [self.geometry.first_data_block, self.geometry.group_desc_block(0)]
+        blocks += [self.geometry.blocks_count * i // EXT4_FINGERPRINT_SAMPLES for i in range(1, EXT4_FINGERPRINT_SAMPLES)]
+        for block in blocks:
+            offset = self.geometry.block_offset(block)
+            digest.update(self.f[offset:offset+block_size])
+        return digest.hexdigest()
+
+    def index(self, path=None, rebuild=False):
+        # open the persistent index of this image, by default a file in
+        # EXT4_CACHE_DIR named after the fingerprint so nothing is written next
+        # to the image; a missing or stale one (other fingerprint or version)
+        # is rebuilt
+        fingerprint = self.fingerprint()
+        if path is None:
+            os.makedirs(EXT4_CACHE_DIR, exist_ok=True)
+            path = os.path.join(EXT4_CACHE_DIR, f"{fingerprint[:32]}{EXT4_INDEX_SUFFIX}")
+        if not rebuild and os.path.exists(path):
+            index = Ext4Index(path)
+            if index.meta('fingerprint') == fingerprint and index.meta('version') == str(EXT4_INDEX_VERSION):
+                return index
+            index.close()
+        self.build_index(path, fingerprint)
+        return Ext4Index(path)
+
+    def build_index(self, path, fingerprint=None):
+        # one pass over the allocated inodes; written to a temporary file and
+        # moved in place so an interrupted build never looks valid
+        sb = self.superblock()
+        if fingerprint is None:
+            fingerprint = self.fingerprint()
+        temp = f"{os.fspath(path)}.tmp"
+        if os.path.exists(temp):
+            os.remove(temp)
+        db = sqlite3.connect(temp)
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute(f"CREATE TABLE groups (group_num INTEGER PRIMARY KEY, {', '.join(f'{name} INTEGER' for name in EXT4_GROUP_TABLE_COLUMNS)})")
+        table = self.group_table()
+        db.executemany(f"INSERT INTO groups VALUES ({', '.join('?' * (len(EXT4_GROUP_TABLE_COLUMNS)+1))})",
+                       zip(range(len(table)), *(getattr(table, name) for name in EXT4_GROUP_TABLE_COLUMNS)))
+        sinks = {name: SqliteExportSink(temp, name, db=db) for name in EXT4_INDEX_TABLES}
+        for ino, inode in self.iter_inodes():
+            sinks['inodes'].write(ext4_inode_row(ino, inode))
+            if inode.i_flags & EXT4_INODE_FLAGS['EXT4_EXTENTS_FL']:
+                for run in self.iter_extent_runs(inode.i_block):
+                    sinks['extents'].write(ext4_extent_row(ino, run))
+            if (inode.i_mode & 0xF000) == EXT4_INODE_MODE['S_IFDIR']:
+                for entry in self.iter_dir_entries(ino):
+                    sinks['dirents'].write(ext4_dirent_row(entry))
+        for sink in sinks.values():
+            sink.close()
+        db.execute("CREATE UNIQUE INDEX inodes_ino ON inodes (ino)")
+        db.execute("CREATE INDEX extents_ino ON extents (ino, logical)")
+        db.execute("CREATE INDEX dirents_dir ON dirents (dir_ino, name)")
+        db.execute("CREATE INDEX dirents_inode ON dirents (inode)")
+        meta = {
+            'version'     : EXT4_INDEX_VERSION,
+            'fingerprint' : fingerprint,
+            'superblock'  : json.dumps(EXT4_SUPERBLOCK_LAYOUT.as_dict(sb), default=bytes.hex),
+            }
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [(key, str(value)) for key, value in meta.items()])
+        db.commit()
+        db.close()
+        os.replace(temp, path)
+
+    def export(self, sink, allocated_only=True):
+        # stream one table into an export sink, inodes go columnar per group with numpy
+        if sink.table == 'inodes' and np is not None:
+            for batch in self.iter_ext4_inode_batches(allocated_only):
+                sink.write_columns(batch)
+            return
+        for ino, inode in self.iter_inodes(allocated_only):
+            if sink.table == 'inodes':
+                sink.write(ext4_inode_row(ino, inode))
+            elif sink.table == 'extents':
+                for run in self.iter_extents(ino):
+                    sink.write(ext4_extent_row(ino, run))
+            elif sink.table == 'dirents':
+                if (inode.i_mode & 0xF000) == EXT4_INODE_MODE['S_IFDIR']:
+                    for entry in self.iter_dir_entries(ino):
+                        sink.write(ext4_dirent_row(entry))
+            elif sink.table == 'xattrs':
+                for xattr in self.iter_xattrs(ino):
+                    sink.write(ext4_xattr_row(ino, xattr))
+
+    def ext4_checksum_seed(self):
+        # crc32c seed shared by all metadata, None without metadata_csum
+        sb = self.superblock()
+        if not sb.sb_feature_ro_compat & EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_METADATA_CSUM']:
+            return None
+        if sb.sb_feature_incompat & EXT4_FEATURE_INCOMPAT['EXT4_FEATURE_INCOMPAT_CSUM_SEED']:
+            offset = EXT4_SUPERBLOCK_OFFSET + EXT4_SB_CHECKSUM_SEED_OFFSET
+            return int.from_bytes(self.f[offset:offset+4], byteorder='little')
+        return ext4_crc32c(0xFFFFFFFF, sb.sb_uuid)
+
+    def ext4_inode_checksum_seed(self, ino, generation):
+        return ext4_crc32c(ext4_crc32c(self.ext4_checksum_seed(), ext4_le32(ino)), ext4_le32(generation))
+
+    def verify_superblock(self):
+        if self.ext4_checksum_seed() is None:
+            return []
+        data = self.f[EXT4_SUPERBLOCK_OFFSET:EXT4_SUPERBLOCK_OFFSET+EXT4_SB_CHECKSUM_OFFSET+4]
+        stored = int.from_bytes(data[EXT4_SB_CHECKSUM_OFFSET:], byteorder='little')
+        computed = ext4_crc32c(0xFFFFFFFF, data[:EXT4_SB_CHECKSUM_OFFSET])
+        if stored != computed:
+            return [Ext4ChecksumMismatch('superblock', 0, stored, computed)]
+        return []
+
+    def verify_group_descriptors(self):
+        # metadata_csum uses the low 16 bits of a crc32c, gdt_csum a crc16
+        sb = self.superblock()
+        seed = self.ext4_checksum_seed()
+        if seed is None and not sb.sb_feature_ro_compat & EXT4_FEATURE_RO_COMPAT['EXT4_FEATURE_RO_COMPAT_GDT_CSUM']:
+            return []
+        desc_size = self.geometry.desc_size
+        mismatches = []
+        for group_num in range(self.ext4_group_count()):
+            offset = self.ext4_group_desc_offset(group_num)
+            data = self.f[offset:offset+desc_size]
+            stored = int.from_bytes(data[EXT4_BG_CHECKSUM_OFFSET:EXT4_BG_CHECKSUM_OFFSET+2], byteorder='little')
+            rest = data[EXT4_BG_CHECKSUM_OFFSET+2:]
+            if seed is not None:
+                computed = ext4_crc32c(ext4_crc32c(seed, ext4_le32(group_num)), data[:EXT4_BG_CHECKSUM_OFFSET] + bytes(2) + rest) & 0xFFFF
+            else:
+                computed = ext4_crc16(ext4_crc16(0xFFFF, sb.sb_uuid), ext4_le32(group_num) + data[:EXT4_BG_CHECKSUM_OFFSET])
+                if sb.sb_feature_incompat & EXT4_FEATURE_INCOMPAT['EXT4_FEATURE_INCOMPAT_64BIT']:
+                    computed = ext4_crc16(computed, rest)
+            if stored != computed:
+                mismatches.append(Ext4ChecksumMismatch('group_descriptor', group_num, stored, computed))
+        return mismatches
+
+    def ext4_inode_checksum_parts(self, data):
+        # inode bytes with the checksum fields zeroed, and whether the high
+        # half of the checksum is present
+        inode_size = len(data)
+        data = bytearray(data)
+        data[EXT4_INODE_CHECKSUM_LO_OFFSET:EXT4_INODE_CHECKSUM_LO_OFFSET+2] = bytes(2)
+        has_hi = False
+        if inode_size > EXT4_INODE_ENTRY_SZ:
+            extra_isize = int.from_bytes(data[EXT4_INODE_ENTRY_SZ:EXT4_INODE_ENTRY_SZ+2], byteorder='little')
+            has_hi = EXT4_INODE_ENTRY_SZ + extra_isize >= EXT4_INODE_CHECKSUM_HI_OFFSET + 2
+            if has_hi:
+                data[EXT4_INODE_CHECKSUM_HI_OFFSET:EXT4_INODE_CHECKSUM_HI_OFFSET+2] = bytes(2)
+        return data, has_hi
+
+    def verify_inode_checksum(self, ino):
+        if self.ext4_checksum_seed() is None:
+            return []
+        offset = self.ext4_inode_offset(ino)
+        raw = self.f[offset:offset+self.geometry.inode_size]
+        if raw == bytes(len(raw)):
+            return []
+        inode = decode_ext4_inode(raw, 0, len(raw))
+        data, has_hi = self.ext4_inode_checksum_parts(raw)
+        computed = ext4_crc32c(self.ext4_inode_checksum_seed(ino, inode.i_generation), data)
+        stored = inode.l_i_checksum_lo
+        if has_hi:
+            stored |= inode.l_i_checksum_hi << 16
+        else:
+            computed &= 0xFFFF
+        if stored != computed:
+            return [Ext4ChecksumMismatch('inode', ino, stored, computed)]
+        return []
+
+    def verify_inode_table(self, group_num):
+        # every slot of one group's inode table, all-zero slots are never
+        # checksummed; vectorized over the whole table when numpy is there
+        seed = self.ext4_checksum_seed()
+        if seed is None:
+            return []
+        # slots past bg_itable_unused were never written
+        limit = self.ext4_inode_table_limit(group_num)
+        first_ino = group_num*self.ext4_superblock['sb_inodes_per_group'] + 1
+        if np is None:
+            return [mismatch for slot in range(limit) for mismatch in self.verify_inode_checksum(first_ino + slot)]
+        inode_size = self.geometry.inode_size
+        offset = self.ext4_inode_table_offset(group_num)
+        table = self.ext4_inode_table_array(offset)[:limit]
+        rows = table.view(np.uint8).reshape(len(table), inode_size)
+        slots = np.flatnonzero(rows.any(axis=1))
+        if len(slots) == 0:
+            return []
+        rows = rows[slots].copy()
+        table = table[slots]
+        u32 = np.uint32
+        inos = slots.astype(u32) + u32(first_ino)
+        stored = table['l_i_checksum_lo'].astype(u32)
+        mask = np.full(len(rows), 0xFFFF, dtype=u32)
+        rows[:, EXT4_INODE_CHECKSUM_LO_OFFSET:EXT4_INODE_CHECKSUM_LO_OFFSET+2] = 0
+        if inode_size > EXT4_INODE_ENTRY_SZ:
+            has_hi = EXT4_INODE_ENTRY_SZ + table['l_i_extra_isize'].astype(u32) >= EXT4_INODE_CHECKSUM_HI_OFFSET + 2
+            stored |= np.where(has_hi, table['l_i_checksum_hi'].astype(u32) << u32(16), u32(0))
+            mask[has_hi] = 0xFFFFFFFF
+            rows[has_hi, EXT4_INODE_CHECKSUM_HI_OFFSET:EXT4_INODE_CHECKSUM_HI_OFFSET+2] = 0
+        # per inode seed from the inode number and the generation
+        seeds = ext4_crc32c_rows(seed, inos.astype('<u4').view(np.uint8).reshape(-1, 4))
+        seeds = ext4_crc32c_rows(seeds, table['i_generation'].astype('<u4').view(np.uint8).reshape(-1, 4))
+        computed = ext4_crc32c_rows(seeds, rows) & mask
+        bad = np.flatnonzero(computed != stored)
+        return [Ext4ChecksumMismatch('inode', int(inos[i]), int(stored[i]), int(computed[i])) for i in bad]
+
+    def verify_extent_blocks(self, ino, inode):
+        # the tail after eh_max entries of every non-root extent node
+        if not inode.i_flags & EXT4_INODE_FLAGS['EXT4_EXTENTS_FL']:
+            return []
+        inode_seed = self.ext4_inode_checksum_seed(ino, inode.i_generation)
+        block_size = self.geometry.block_size
+        mismatches = []
+        try:
+            for level, header, entry in self.walk_extent_tree(inode.i_block):
+                if entry is None or header.eh_depth == 0:
+                    continue
+                block = ext4_block_addr(entry.ei_leaf_lo, entry.ei_leaf_hi)
+                offset = self.geometry.block_offset(block)
+                data = self.f[offset:offset+block_size]
+                tail = EXT4_EXTENT_HEADER_LAYOUT.size + EXT4_EXTENT_HEADER_LAYOUT.unpack(data).eh_max*EXT4_EXTENT_LAYOUT.size
+                if tail + 4 > block_size:
+                    continue
+                stored = int.from_bytes(data[tail:tail+4], byteorder='little')
+                computed = ext4_crc32c(inode_seed, data[:tail])
+                if stored != computed:
+                    mismatches.append(Ext4ChecksumMismatch('extent_block', block, stored, computed))
+        except Ext4CorruptionError as error:
+            # the walk can not go on, what was checked so far still counts
+            mismatches.append(Ext4ChecksumMismatch('extent_tree', ino, None, None, str(error)))
+        return mismatches
+
+    def verify_dir_blocks(self, ino, inode):
+        # leaf blocks end in a fake dirent holding the checksum, htree index
+        # blocks keep theirs in a dx_tail right after the dx entries
+        inode_seed = self.ext4_inode_checksum_seed(ino, inode.i_generation)
+        block_size = self.geometry.block_size
+        extent_map = self.extent_map(ino)
+        mismatches = []
+        for run in extent_map:
+            if run.unwritten:
+                continue
+            for i in range(run.length):
+                block = run.physical + i
+                offset = self.geometry.block_offset(block)
+                data = self.f[offset:offset+block_size]
+                tail = EXT4_DIR_ENTRY_2_LAYOUT.unpack(data, block_size - EXT4_DIR_TAIL_SIZE)
+                if tail.inode == 0 and tail.rec_len == EXT4_DIR_TAIL_SIZE and tail.name_len == 0 and tail.file_type == EXT4_DIR_TAIL_FT:
+                    stored = int.from_bytes(data[block_size-4:], byteorder='little')
+                    computed = ext4_crc32c(inode_seed, data[:block_size-EXT4_DIR_TAIL_SIZE])
+                else:
+                    first = EXT4_DIR_ENTRY_2_LAYOUT.unpack(data)
+                    if run.logical + i == 0 and inode.i_flags & EXT4_INODE_FLAGS['EXT4_INDEX_FL']:
+                        count_offset = EXT4_DX_ROOT_INFO_OFFSET + EXT4_DX_ROOT_INFO_LAYOUT.unpack(data, EXT4_DX_ROOT_INFO_OFFSET).info_length
+                    elif first.inode == 0 and first.rec_len == block_size:
+                        count_offset = EXT4_DX_NODE_ENTRIES_OFFSET
+                    else:
+                        continue
+                    countlimit = EXT4_DX_COUNTLIMIT_LAYOUT.unpack(data, count_offset)
+                    tail = count_offset + countlimit.limit*EXT4_DX_ENTRY_LAYOUT.size
+                    if countlimit.count > countlimit.limit or tail + 8 > block_size:
+                        continue
+                    stored = int.from_bytes(data[tail+4:tail+8], byteorder='little')
+                    computed = ext4_crc32c(ext4_crc32c(inode_seed, data[:count_offset+countlimit.count*EXT4_DX_ENTRY_LAYOUT.size]), data[tail:tail+4] + bytes(4))
+                if stored != computed:
+                    mismatches.append(Ext4ChecksumMismatch('dir_block', block, stored, computed))
+        return mismatches
+
+    def verify_xattr_block(self, inode):
+        block = ext4_block_addr(inode.i_file_acl_lo, inode.l_i_file_acl_high)
+        if not block:
+            return []
+        offset = self.geometry.block_offset(block)
+        data = bytearray(self.f[offset:offset+self.geometry.block_size])
+        stored = int.from_bytes(data[EXT4_XATTR_CHECKSUM_OFFSET:EXT4_XATTR_CHECKSUM_OFFSET+4], byteorder='little')
+        data[EXT4_XATTR_CHECKSUM_OFFSET:EXT4_XATTR_CHECKSUM_OFFSET+4] = bytes(4)
+        computed = ext4_crc32c(ext4_crc32c(self.ext4_checksum_seed(), block.to_bytes(8, byteorder='little')), data)
+        if stored != computed:
+            return [Ext4ChecksumMismatch('xattr_block', block, stored, computed)]
+        return []
+
+    def verify_inode_blocks(self, ino, inode):
+        mismatches = self.verify_extent_blocks(ino, inode)
+        # directory blocks are found through the same extent tree
+        if (inode.i_mode & 0xF000) == EXT4_INODE_MODE['S_IFDIR'] and not any(mismatch.kind == 'extent_tree' for mismatch in mismatches):
+            try:
+                mismatches += self.verify_dir_blocks(ino, inode)
+            except Ext4CorruptionError as error:
+                mismatches.append(Ext4ChecksumMismatch('extent_tree', ino, None, None, str(error)))
+        return mismatches + self.verify_xattr_block(inode)
+
+    def verify_inode(self, ino):
+        # the inode and every metadata block hanging off it
+        if self.ext4_checksum_seed() is None:
+            return []
+        return self.verify_inode_checksum(ino) + self.verify_inode_blocks(ino, self.inode(ino))
+
+    def verify(self, deep=False):
+        # Ext4ChecksumMismatch records for the superblock, the group
+        # descriptors and every inode table; deep also follows the extent,
+        # directory and xattr blocks of every allocated inode
+        yield from self.verify_superblock()
+        yield from self.verify_group_descriptors()
+        for group_num in range(self.ext4_group_count()):
+            yield from self.verify_inode_table(group_num)
+        if deep and self.ext4_checksum_seed() is not None:
+            for ino, inode in self.iter_inodes():
+                yield from self.verify_inode_blocks(ino, inode)
+
+    def ext4_journal_offset(self, journal_block):
+        # image offset of a block of the journal inode
+        if self.ext4_journal_map is None:
+            sb = self.superblock()
+            if not sb.sb_feature_compat & EXT4_FEATURE_COMPAT['EXT4_FEATURE_COMPAT_HAS_JOURNAL'] or sb.sb_journal_inum == 0:
+                raise ValueError("the filesystem has no internal journal")
+            inode = self.inode(sb.sb_journal_inum)
+            if not inode.i_flags & EXT4_INODE_FLAGS['EXT4_EXTENTS_FL']:
+                raise ValueError(f"journal inode {sb.sb_journal_inum} is mapped through indirect blocks, only extent mapped journals can be read")
+            self.ext4_journal_map = Ext4ExtentMap(self.iter_extent_runs(inode.i_block), self.geometry.block_size)
+        offset = self.ext4_journal_map.offset(journal_block)
+        if offset is None:
+            raise Ext4CorruptionError(f"journal block {journal_block} is not mapped")
+        return offset
+
+    def ext4_journal_block(self, journal_block):
+        offset = self.ext4_journal_offset(journal_block)
+        return self.f[offset:offset+self.geometry.block_size]
+
+    def journal_superblock(self):
+        jsb = JBD2_SUPERBLOCK_LAYOUT.unpack(self.ext4_journal_block(0))
+        if jsb.h_magic != JBD2_MAGIC_NUMBER or jsb.h_blocktype not in (EXT4_JNL_BLOCK_TYPE['JBD2_SUPERBLOCK_V1'], EXT4_JNL_BLOCK_TYPE['JBD2_SUPERBLOCK_V2']):
+            raise Ext4CorruptionError(f"bad journal superblock magic {jsb.h_magic:#x} type {jsb.h_blocktype}")
+        if jsb.s_blocksize != self.geometry.block_size:
+            raise Ext4CorruptionError(f"journal block size {jsb.s_blocksize} differs from the filesystem block size {self.geometry.block_size}")
+        return jsb
+
+    def iter_journal(self):
+        # committed transactions in log order, oldest first; the circular log
+        # is walked once starting right after the newest commit block, so
+        # transactions that were already checkpointed are found as well
+        jsb = self.journal_superblock()
+        incompat = jsb.s_feature_incompat if jsb.h_blocktype == EXT4_JNL_BLOCK_TYPE['JBD2_SUPERBLOCK_V2'] else 0
+        first, end = jsb.s_first, ext4_journal_log_end(jsb, incompat)
+        length = end - first
+        if first == 0 or length <= 0:
+            raise Ext4CorruptionError(f"journal log area {first}..{end} is empty")
+        descriptor = EXT4_JNL_BLOCK_TYPE['JBD2_DESCRIPTOR_BLOCK']
+        commit = EXT4_JNL_BLOCK_TYPE['JBD2_COMMIT_BLOCK']
+        revoke = EXT4_JNL_BLOCK_TYPE['JBD2_REVOKE_BLOCK']
+
+        start, newest = first, None
+        for journal_block in range(first, end):
+            header = JBD2_HEADER_LAYOUT.unpack(self.f, self.ext4_journal_offset(journal_block))
+            if header.h_magic == JBD2_MAGIC_NUMBER and header.h_blocktype == commit:
+                if newest is None or ext4_journal_tid_after(header.h_sequence, newest):
+                    start, newest = journal_block + 1, header.h_sequence
+
+        tid = None
+        walked = 0
+        while walked < length:
+            journal_block = first + (start - first + walked) % length
+            header = JBD2_HEADER_LAYOUT.unpack(self.f, self.ext4_journal_offset(journal_block))
+            walked += 1
+            if header.h_magic != JBD2_MAGIC_NUMBER or header.h_blocktype not in (descriptor, commit, revoke):
+                # anything but a header outside a transaction ends it unfinished
+                tid = None
+                continue
+            if header.h_sequence != tid:
+                tid, begin, tags, revoked = header.h_sequence, journal_block, [], []
+            if header.h_blocktype == descriptor:
+                # the logged copies follow the descriptor block in tag order
+                for fs_block, flags in ext4_iter_journal_tags(self.ext4_journal_block(journal_block), incompat):
+                    tags.append(Ext4JournalTag(fs_block, first + (start - first + walked) % length, flags))
+                    walked += 1
+            elif header.h_blocktype == revoke:
+                revoked.extend(ext4_iter_journal_revokes(self.ext4_journal_block(journal_block), incompat))
+            else:
+                record = JBD2_COMMIT_LAYOUT.unpack(self.f, self.ext4_journal_offset(journal_block))
+                yield Ext4JournalTransaction(tid, begin, tuple(tags), tuple(revoked), record.h_commit_sec, record.h_commit_nsec)
+                tid = None
+
+    def journal_index(self):
+        # fs block -> [(tid, journal block), ...] oldest first, built once
+        if self.ext4_journal_index is None:
+            index = {}
+            escaped = set()
+            # fs block -> tids of the transactions that revoked it, oldest first
+            revokes = {}
+            for transaction in self.iter_journal():
+                for tag in transaction.tags:
+                    index.setdefault(tag.fs_block, []).append((transaction.tid, tag.journal_block))
+                    if tag.flags & EXT4_JNL_FLAGS['JBD2_FLAG_ESCAPE']:
+                        escaped.add(tag.journal_block)
+                for fs_block in transaction.revoked:
+                    revokes.setdefault(fs_block, []).append(transaction.tid)
+            self.ext4_journal_index = index
+            self.ext4_journal_escaped = escaped
+            self.ext4_journal_revokes = revokes
+        return self.ext4_journal_index
+
+    def journal_copy(self, journal_block):
+        # contents of a logged block, a copy that started with the jbd2 magic
+        # had it zeroed when logged and gets it back here
+        self.journal_index()
+        data = self.ext4_journal_block(journal_block)
+        if journal_block in self.ext4_journal_escaped:
+            data = JBD2_MAGIC_NUMBER.to_bytes(4, byteorder='big') + data[4:]
+        return data
+
+    def block_as_of(self, block, tid):
+        # fs block as logged by the newest transaction up to tid, the block on
+        # disk when the journal holds no such copy; like replay, a copy is
+        # dropped when a transaction from its own on, up to tid, revoked it
+        copies = [copy for copy in self.journal_index().get(block, ()) if not ext4_journal_tid_after(copy[0], tid)]
+        if copies:
+            revoked = [revoke for revoke in self.ext4_journal_revokes.get(block, ()) if not ext4_journal_tid_after(revoke, tid)]
+            if any(not ext4_journal_tid_after(copies[-1][0], revoke) for revoke in revoked):
+                copies = []
+        if not copies:
+            offset = self.geometry.block_offset(block)
+            return self.f[offset:offset+self.geometry.block_size]
+        return self.journal_copy(copies[-1][1])
+
+    # Legacy walk, decodes and renders everything
     def parse_ext4_superblock(self,offset):
-        self.ext4_superblock['sb_inodes_count'] = int.from_bytes(self.f[offset+0x00:offset+0x04], byteorder='little')
-        print(f"Total Inodes: {self.ext4_superblock['sb_inodes_count']}")
-        self.ext4_superblock['sb_blocks_count_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-        print(f"Total Blocks: {self.ext4_superblock['sb_blocks_count_lo']}")
-        self.ext4_superblock['sb_r_blocks_count_lo'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Reserved Blocks: {self.ext4_superblock['sb_r_blocks_count_lo']}")
-        self.ext4_superblock['sb_free_blocks_count_lo'] = int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-        print(f"Free Blocks: {self.ext4_superblock['sb_free_blocks_count_lo']}")
-        self.ext4_superblock['sb_free_inodes_count'] = int.from_bytes(self.f[offset+0x10:offset+0x14], byteorder='little')
-        print(f"Free Inodes: {self.ext4_superblock['sb_free_inodes_count']}")
-        self.ext4_superblock['sb_first_data_block'] = int.from_bytes(self.f[offset+0x14:offset+0x18], byteorder='little')
-        print(f"First Data Block: {self.ext4_superblock['sb_first_data_block']}")
-        self.ext4_superblock['sb_log_block_size'] = int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
-        print(f"Log Block Size: {self.ext4_superblock['sb_log_block_size']}")
-        self.ext4_superblock['sb_obso_log_frag_size'] = int.from_bytes(self.f[offset+0x1C:offset+0x20], byteorder='little')
-        print(f"Obsolete Log Fragment Size: {self.ext4_superblock['sb_obso_log_frag_size']}")
-        self.ext4_superblock['sb_blocks_per_group'] = int.from_bytes(self.f[offset+0x20:offset+0x24], byteorder='little')
-        print(f"Blocks per Group: {self.ext4_superblock['sb_blocks_per_group']}")
-        self.ext4_superblock['sb_obso_frags_per_group'] = int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
-        print(f"Obsolete Fragments per Group: {self.ext4_superblock['sb_obso_frags_per_group']}")
-        self.ext4_superblock['sb_inodes_per_group'] = int.from_bytes(self.f[offset+0x28:offset+0x2C], byteorder='little')
-        print(f"Inodes per Group: {self.ext4_superblock['sb_inodes_per_group']}")
-        self.ext4_superblock['sb_mtime'] = int.from_bytes(self.f[offset+0x2C:offset+0x30], byteorder='little')
-        print(f"Mount Time: {datetime.utcfromtimestamp(self.ext4_superblock['sb_mtime']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_superblock['sb_wtime'] = int.from_bytes(self.f[offset+0x30:offset+0x34], byteorder='little')
-        print(f"Write Time: {datetime.utcfromtimestamp(self.ext4_superblock['sb_wtime']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_superblock['sb_mnt_count'] = int.from_bytes(self.f[offset+0x34:offset+0x36], byteorder='little')
-        print(f"Mount Count: {self.ext4_superblock['sb_mnt_count']}")
-        self.ext4_superblock['sb_max_mnt_count'] = int.from_bytes(self.f[offset+0x36:offset+0x38], byteorder='little')
-        print(f"Max Mount Count: {self.ext4_superblock['sb_max_mnt_count']}")
-        self.ext4_superblock['sb_magic'] = int.from_bytes(self.f[offset+0x38:offset+0x3A], byteorder='little')
-        print(f"Magic Number: {self.ext4_superblock['sb_magic']}")
-        self.ext4_superblock['sb_state'] = int.from_bytes(self.f[offset+0x3A:offset+0x3C], byteorder='little')
+        self.read_ext4_superblock(offset)
+        self.renderer.write(f"Total Inodes: {self.ext4_superblock['sb_inodes_count']}")
+        self.renderer.write(f"Total Blocks: {self.ext4_superblock['sb_blocks_count_lo']}")
+        self.renderer.write(f"Reserved Blocks: {self.ext4_superblock['sb_r_blocks_count_lo']}")
+        self.renderer.write(f"Free Blocks: {self.ext4_superblock['sb_free_blocks_count_lo']}")
+        self.renderer.write(f"Free Inodes: {self.ext4_superblock['sb_free_inodes_count']}")
+        self.renderer.write(f"First Data Block: {self.ext4_superblock['sb_first_data_block']}")
+        self.renderer.write(f"Log Block Size: {self.ext4_superblock['sb_log_block_size']}")
+        self.renderer.write(f"Obsolete Log Fragment Size: {self.ext4_superblock['sb_obso_log_frag_size']}")
+        self.renderer.write(f"Blocks per Group: {self.ext4_superblock['sb_blocks_per_group']}")
+        self.renderer.write(f"Obsolete Fragments per Group: {self.ext4_superblock['sb_obso_frags_per_group']}")
+        self.renderer.write(f"Inodes per Group: {self.ext4_superblock['sb_inodes_per_group']}")
+        self.renderer.write(f"Mount Time: {datetime.utcfromtimestamp(self.ext4_superblock['sb_mtime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"Write Time: {datetime.utcfromtimestamp(self.ext4_superblock['sb_wtime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"Mount Count: {self.ext4_superblock['sb_mnt_count']}")
+        self.renderer.write(f"Max Mount Count: {self.ext4_superblock['sb_max_mnt_count']}")
+        self.renderer.write(f"Magic Number: {self.ext4_superblock['sb_magic']}")
         state = ""
         if self.ext4_superblock['sb_state'] == 1:
             state = "Valid FS"
@@ -637,8 +4162,7 @@ class Ext4Parser:
             state = "Error FS"
         elif self.ext4_superblock['sb_state'] == 4:
             state = "Orphan FS"
-        print(f"State: {state}")
-        self.ext4_superblock['sb_errors'] = int.from_bytes(self.f[offset+0x3C:offset+0x3E], byteorder='little')
+        self.renderer.write(f"State: {state}")
         errors = ""
         if self.ext4_superblock['sb_errors'] == 1:
             errors = "Continue"
@@ -646,14 +4170,10 @@ class Ext4Parser:
             errors = "Read-Only"
         elif self.ext4_superblock['sb_errors'] == 3:
             errors = "Panic"
-        print(f"Errors: {errors}")
-        self.ext4_superblock['sb_minor_rev_level'] = int.from_bytes(self.f[offset+0x3E:offset+0x40], byteorder='little')
-        print(f"Minor Revision Level: {self.ext4_superblock['sb_minor_rev_level']}")
-        self.ext4_superblock['sb_lastcheck'] = int.from_bytes(self.f[offset+0x40:offset+0x44], byteorder='little')
-        print(f"Last Check: {datetime.utcfromtimestamp(self.ext4_superblock['sb_lastcheck']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_superblock['sb_checkinterval'] = int.from_bytes(self.f[offset+0x44:offset+0x48], byteorder='little')
-        print(f"Check Interval: {self.ext4_superblock['sb_checkinterval']}")
-        self.ext4_superblock['sb_creator_os'] = int.from_bytes(self.f[offset+0x48:offset+0x4C], byteorder='little')
+        self.renderer.write(f"Errors: {errors}")
+        self.renderer.write(f"Minor Revision Level: {self.ext4_superblock['sb_minor_rev_level']}")
+        self.renderer.write(f"Last Check: {datetime.utcfromtimestamp(self.ext4_superblock['sb_lastcheck']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"Check Interval: {self.ext4_superblock['sb_checkinterval']}")
         creator_os = ""
         if self.ext4_superblock['sb_creator_os'] == 0:
             creator_os = "Linux"
@@ -665,26 +4185,19 @@ class Ext4Parser:
             creator_os = "FreeBSD"
         elif self.ext4_superblock['sb_creator_os'] == 4:
             creator_os = "Lites"
-        print(f"Creator OS: {creator_os}")
-        self.ext4_superblock['sb_rev_level'] = int.from_bytes(self.f[offset+0x4C:offset+0x50], byteorder='little')
+        self.renderer.write(f"Creator OS: {creator_os}")
         rev_level = ""
         if self.ext4_superblock['sb_rev_level'] == 0:
             rev_level = "Good Old Rev"
         elif self.ext4_superblock['sb_rev_level'] == 1:
             rev_level = "Dynamic Rev"
-        print(f"Revision Level: {rev_level}")
-        self.ext4_superblock['sb_def_resuid'] = int.from_bytes(self.f[offset+0x50:offset+0x52], byteorder='little')
-        print(f"Default Reserved UID: {self.ext4_superblock['sb_def_resuid']}")
-        self.ext4_superblock['sb_def_resgid'] = int.from_bytes(self.f[offset+0x52:offset+0x54], byteorder='little')
-        print(f"Default Reserved GID: {self.ext4_superblock['sb_def_resgid']}")
-        print("\n\nFor EXT4_DYNAMIC_REV Super Blocks Only\n\n")
-        self.ext4_superblock['sb_first_ino'] = int.from_bytes(self.f[offset+0x54:offset+0x58], byteorder='little')
-        print(f"First Inode: {self.ext4_superblock['sb_first_ino']}")
-        self.ext4_superblock['sb_inode_size'] = int.from_bytes(self.f[offset+0x58:offset+0x5A], byteorder='little')
-        print(f"Inode Size: {self.ext4_superblock['sb_inode_size']}")
-        self.ext4_superblock['sb_block_group_nr'] = int.from_bytes(self.f[offset+0x5A:offset+0x5C], byteorder='little')
-        print(f"Block Group Number: {self.ext4_superblock['sb_block_group_nr']}")
-        self.ext4_superblock['sb_feature_compat'] = int.from_bytes(self.f[offset+0x5C:offset+0x60], byteorder='little')
+        self.renderer.write(f"Revision Level: {rev_level}")
+        self.renderer.write(f"Default Reserved UID: {self.ext4_superblock['sb_def_resuid']}")
+        self.renderer.write(f"Default Reserved GID: {self.ext4_superblock['sb_def_resgid']}")
+        self.renderer.write("\n\nFor EXT4_DYNAMIC_REV Super Blocks Only\n\n")
+        self.renderer.write(f"First Inode: {self.ext4_superblock['sb_first_ino']}")
+        self.renderer.write(f"Inode Size: {self.ext4_superblock['sb_inode_size']}")
+        self.renderer.write(f"Block Group Number: {self.ext4_superblock['sb_block_group_nr']}")
         feature_compat = ""
         if self.ext4_superblock['sb_feature_compat'] & 0x0001:
             feature_compat += " Directory Preallocation "
@@ -698,8 +4211,7 @@ class Ext4Parser:
             feature_compat += " Resize Inode "
         if self.ext4_superblock['sb_feature_compat'] & 0x0020:
             feature_compat += " Directory Index "
-        print("Compatible feature: " + feature_compat)
-        self.ext4_superblock['sb_feature_incompat'] = int.from_bytes(self.f[offset+0x60:offset+0x64], byteorder='little')
+        self.renderer.write("Compatible feature: " + feature_compat)
         feature_incompat = ""
         if self.ext4_superblock['sb_feature_incompat'] & 0x0001:
             feature_incompat += " Compression"
@@ -733,8 +4245,7 @@ class Ext4Parser:
             feature_incompat += " Encrypted "
         if self.ext4_superblock['sb_feature_incompat'] & 0x20000:
             feature_incompat += " Casefold "
-        print("Incompatible feature: " + feature_incompat)
-        self.ext4_superblock['sb_feature_ro_compat'] = int.from_bytes(self.f[offset+0x64:offset+0x68], byteorder='little')
+        self.renderer.write("Incompatible feature: " + feature_incompat)
         feature_ro_compat = ""
         if self.ext4_superblock['sb_feature_ro_compat'] & 0x0001:
             feature_ro_compat += " Sparse_Super "
@@ -750,36 +4261,23 @@ class Ext4Parser:
             feature_ro_compat += " Directory_NLink "
         if self.ext4_superblock['sb_feature_ro_compat'] & 0x0040:
             feature_ro_compat += " Extra_ISize "
-        print("Read-Only Compatible feature: " + feature_ro_compat)
-        self.ext4_superblock['sb_uuid'] = self.f[offset+0x68:offset+0x78].hex()
+        self.renderer.write("Read-Only Compatible feature: " + feature_ro_compat)
         formatted_uuid = ' '.join(self.ext4_superblock['sb_uuid'][i:i+2] for i in range(0, len(self.ext4_superblock['sb_uuid']), 2))
-        print(f"UUID: {formatted_uuid}")
-        self.ext4_superblock['sb_volume_name'] = self.f[offset+0x78:offset+0x88].decode('utf-8').rstrip('\x00')
-        print(f"Volume Name: {self.ext4_superblock['sb_volume_name']}")
-        self.ext4_superblock['sb_last_mounted'] = self.f[offset+0x88:offset+0xc8].decode('utf-8').rstrip('\x00')
-        print(f"Last Mounted: {self.ext4_superblock['sb_last_mounted']}")
-        self.ext4_superblock['sb_algorithm_usage_bitmap'] = int.from_bytes(self.f[offset+0xC8:offset+0xCC], byteorder='little')
-        print(f"Algorithm Usage Bitmap: {self.ext4_superblock['sb_algorithm_usage_bitmap']}")
-        self.ext4_superblock['sb_prealloc_blocks'] = int.from_bytes(self.f[offset+0xCC:offset+0xCD], byteorder='little')
-        print("\n\nEXT4_FEATURE_COMPAT_DIR_PREALLOC on for performance hints Directory preallocation\n\n")
-        print(f"Preallocated Blocks: {self.ext4_superblock['sb_prealloc_blocks']}")
-        self.ext4_superblock['sb_prealloc_dir_blocks'] = int.from_bytes(self.f[offset+0xCD:offset+0xCE], byteorder='little')
-        print(f"Preallocated Directory Blocks: {self.ext4_superblock['sb_prealloc_dir_blocks']}")
-        self.ext4_superblock['sb_reserved_gdt_blocks'] = int.from_bytes(self.f[offset+0xCE:offset+0xD0], byteorder='little')
-        print(f"Reserved GDT Blocks: {self.ext4_superblock['sb_reserved_gdt_blocks']}")
-        print("\n\nFor EXT4_FEATURE_COMPAT_HAS_JOURNAL Only\n\n")
-        self.ext4_superblock['sb_journal_uuid'] = self.f[offset+0xD0:offset+0xE0].hex()
+        self.renderer.write(f"UUID: {formatted_uuid}")
+        self.renderer.write(f"Volume Name: {self.ext4_superblock['sb_volume_name']}")
+        self.renderer.write(f"Last Mounted: {self.ext4_superblock['sb_last_mounted']}")
+        self.renderer.write(f"Algorithm Usage Bitmap: {self.ext4_superblock['sb_algorithm_usage_bitmap']}")
+        self.renderer.write("\n\nEXT4_FEATURE_COMPAT_DIR_PREALLOC on for performance hints Directory preallocation\n\n")
+        self.renderer.write(f"Preallocated Blocks: {self.ext4_superblock['sb_prealloc_blocks']}")
+        self.renderer.write(f"Preallocated Directory Blocks: {self.ext4_superblock['sb_prealloc_dir_blocks']}")
+        self.renderer.write(f"Reserved GDT Blocks: {self.ext4_superblock['sb_reserved_gdt_blocks']}")
+        self.renderer.write("\n\nFor EXT4_FEATURE_COMPAT_HAS_JOURNAL Only\n\n")
         formatted_journal_uuid = ' '.join(self.ext4_superblock['sb_journal_uuid'][i:i+2] for i in range(0, len(self.ext4_superblock['sb_journal_uuid']), 2))
-        print(f"Journal UUID: {formatted_journal_uuid}")
-        self.ext4_superblock['sb_journal_inum'] = int.from_bytes(self.f[offset+0xE0:offset+0xE4], byteorder='little')
-        print(f"Journal Inode: {self.ext4_superblock['sb_journal_inum']}")
-        self.ext4_superblock['sb_journal_dev'] = int.from_bytes(self.f[offset+0xE4:offset+0xE8], byteorder='little')
-        print(f"Journal Device: {self.ext4_superblock['sb_journal_dev']}")
-        self.ext4_superblock['sb_last_orphan'] = int.from_bytes(self.f[offset+0xE8:offset+0xEC], byteorder='little')
-        print(f"Last Orphan: {self.ext4_superblock['sb_last_orphan']}")
-        self.ext4_superblock['sb_hash_seed'] = int.from_bytes(self.f[offset+0xEC:offset+0xFC], byteorder='little')
-        print(f"HTREE Hash Seed: {self.ext4_superblock['sb_hash_seed']}")
-        self.ext4_superblock['sb_def_hash_version'] = int.from_bytes(self.f[offset+0xFC:offset+0xFD], byteorder='little')
+        self.renderer.write(f"Journal UUID: {formatted_journal_uuid}")
+        self.renderer.write(f"Journal Inode: {self.ext4_superblock['sb_journal_inum']}")
+        self.renderer.write(f"Journal Device: {self.ext4_superblock['sb_journal_dev']}")
+        self.renderer.write(f"Last Orphan: {self.ext4_superblock['sb_last_orphan']}")
+        self.renderer.write(f"HTREE Hash Seed: {self.ext4_superblock['sb_hash_seed']}")
         def_hashversion = ""
         if self.ext4_superblock['sb_def_hash_version'] == 0:
             def_hashversion = "Legacy"
@@ -793,12 +4291,9 @@ class Ext4Parser:
             def_hashversion = "Half MD4 Unsigned"
         elif self.ext4_superblock['sb_def_hash_version'] == 5:
             def_hashversion = "TEA Unsigned"
-        print(f"Default Hash Version: {def_hashversion}")
-        self.ext4_superblock['sb_reserved_char_pad'] = int.from_bytes(self.f[offset+0xFD:offset+0xFE], byteorder='little')
-        print(f"Reserved Char Pad: {self.ext4_superblock['sb_reserved_char_pad']}")
-        self.ext4_superblock['sb_desc_size'] = int.from_bytes(self.f[offset+0xFE:offset+0x100], byteorder='little')
-        print(f"Descriptor Size: {self.ext4_superblock['sb_desc_size']}")
-        self.ext4_superblock['sb_default_mount_opts'] = int.from_bytes(self.f[offset+0x100:offset+0x104], byteorder='little')
+        self.renderer.write(f"Default Hash Version: {def_hashversion}")
+        self.renderer.write(f"Reserved Char Pad: {self.ext4_superblock['sb_reserved_char_pad']}")
+        self.renderer.write(f"Descriptor Size: {self.ext4_superblock['sb_desc_size']}")
         default_mount_opts = ""
         if self.ext4_superblock['sb_default_mount_opts'] & 0x0001:
             default_mount_opts += " Debug "
@@ -824,19 +4319,10 @@ class Ext4Parser:
             default_mount_opts += " Discard "
         if self.ext4_superblock['sb_default_mount_opts'] & 0x0800:
             default_mount_opts += " No Delayed Allocation "
-        print(f"Default Mount Options: {default_mount_opts}")
-        self.ext4_superblock['sb_first_meta_bg'] = int.from_bytes(self.f[offset+0x104:offset+0x108], byteorder='little')
-        print(f"First Meta Block Group: {self.ext4_superblock['sb_first_meta_bg']}")
-        self.ext4_superblock['sb_mkfs_time'] = int.from_bytes(self.f[offset+0x108:offset+0x10C], byteorder='little')
-        print(f"MKFS Time: {datetime.utcfromtimestamp(self.ext4_superblock['sb_mkfs_time']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_superblock['sb_jnl_blocks'] = int.from_bytes(self.f[offset+0x108:offset+0x150], byteorder='little')
+        self.renderer.write(f"Default Mount Options: {default_mount_opts}")
+        self.renderer.write(f"First Meta Block Group: {self.ext4_superblock['sb_first_meta_bg']}")
+        self.renderer.write(f"MKFS Time: {datetime.utcfromtimestamp(self.ext4_superblock['sb_mkfs_time']).strftime('%Y-%m-%d %H:%M:%S')}")
         # print(f"Journal Backup: {self.ext4_superblock['sb_jnl_blocks']}")
-        self.ext4_superblock['sb_blocks_count_hi'] = int.from_bytes(self.f[offset+0x150:offset+0x154], byteorder='little')
-        self.ext4_superblock['sb_r_blocks_count_hi'] = int.from_bytes(self.f[offset+0x154:offset+0x158], byteorder='little')
-        self.ext4_superblock['sb_free_blocks_count_hi'] = int.from_bytes(self.f[offset+0x158:offset+0x15C], byteorder='little')
-        self.ext4_superblock['sb_min_extra_isize'] = int.from_bytes(self.f[offset+0x15C:offset+0x15E], byteorder='little')
-        self.ext4_superblock['sb_want_extra_isize'] = int.from_bytes(self.f[offset+0x15E:offset+0x160], byteorder='little')
-        self.ext4_superblock['sb_flags'] = int.from_bytes(self.f[offset+0x160:offset+0x164], byteorder='little')
         miscflags = ""
         if self.ext4_superblock['sb_flags'] & 0x0001:
             miscflags += " Signed_Directory_Hash "
@@ -850,660 +4336,174 @@ class Ext4Parser:
             miscflags += " Snapshot_Fix "
         if self.ext4_superblock['sb_flags'] & 0x0040:
             miscflags += " Fix_Exclude "                    
-        self.ext4_superblock['sb_raid_stride'] = int.from_bytes(self.f[offset+0x164:offset+0x166], byteorder='little')
-        self.ext4_superblock['sb_mmp_interval'] = int.from_bytes(self.f[offset+0x166:offset+0x168], byteorder='little')
-        self.ext4_superblock['sb_mmp_block'] = int.from_bytes(self.f[offset+0x168:offset+0x170], byteorder='little')
-        self.ext4_superblock['sb_raid_stripe_width'] = int.from_bytes(self.f[offset+0x170:offset+0x174], byteorder='little')
-        self.ext4_superblock['sb_log_groups_per_flex'] = int.from_bytes(self.f[offset+0x174:offset+0x175], byteorder='little')
         # print(f"Log Groups per Flex: {self.ext4_superblock['sb_log_groups_per_flex']}")
-        self.ext4_superblock['sb_reserved_char_pad2'] = int.from_bytes(self.f[offset+0x175:offset+0x176], byteorder='little')
-        self.ext4_superblock['sb_reserved_pad'] = self.f[offset+0x176:offset+0x178].hex()
-        self.ext4_superblock['sb_kbytes_written'] = int.from_bytes(self.f[offset+0x178:offset+0x180], byteorder='little')
-        self.ext4_superblock['sb_reserved'] = self.f[offset+0x180:offset+0x400].hex()
-        print("\n\nEnd of Superblock Parsing\n\n")
+        self.renderer.write("\n\nEnd of Superblock Parsing\n\n")
             
     
     def parse_ext4_block_group_descriptor(self,offset): 
-        self.ext4_blockgroupdescriptor['bg_block_bitmap_lo'] = int.from_bytes(self.f[offset+0x00:offset+0x04], byteorder='little')
-        print(f"Block Bitmap: {self.ext4_blockgroupdescriptor['bg_block_bitmap_lo']}")
-        self.ext4_blockgroupdescriptor['bg_inode_bitmap_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-        print(f"Inode Bitmap: {self.ext4_blockgroupdescriptor['bg_inode_bitmap_lo']}")
-        self.ext4_blockgroupdescriptor['bg_inode_table_lo'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Inode Table: {self.ext4_blockgroupdescriptor['bg_inode_table_lo']}")
-        self.ext4_blockgroupdescriptor['bg_free_blocks_count_lo'] = int.from_bytes(self.f[offset+0x0C:offset+0x0E], byteorder='little')
-        print(f"Free Blocks: {self.ext4_blockgroupdescriptor['bg_free_blocks_count_lo']}")
-        self.ext4_blockgroupdescriptor['bg_free_inodes_count_lo'] = int.from_bytes(self.f[offset+0x0E:offset+0x10], byteorder='little')
-        print(f"Free Inodes: {self.ext4_blockgroupdescriptor['bg_free_inodes_count_lo']}")
-        self.ext4_blockgroupdescriptor['bg_used_dirs_count_lo'] = int.from_bytes(self.f[offset+0x10:offset+0x12], byteorder='little')
-        print(f"Used Directories: {self.ext4_blockgroupdescriptor['bg_used_dirs_count_lo']}")
-        self.ext4_blockgroupdescriptor['bg_flags'] = int.from_bytes(self.f[offset+0x12:offset+0x14], byteorder='little')
+        ext4_blockgroupdescriptor = decode_ext4_group_descriptor(self.f, offset, self.geometry.desc_size)._asdict()
+        self.renderer.write(f"Block Bitmap: {ext4_blockgroupdescriptor['bg_block_bitmap_lo']}")
+        self.renderer.write(f"Inode Bitmap: {ext4_blockgroupdescriptor['bg_inode_bitmap_lo']}")
+        self.renderer.write(f"Inode Table: {ext4_blockgroupdescriptor['bg_inode_table_lo']}")
+        self.renderer.write(f"Free Blocks: {ext4_blockgroupdescriptor['bg_free_blocks_count_lo']}")
+        self.renderer.write(f"Free Inodes: {ext4_blockgroupdescriptor['bg_free_inodes_count_lo']}")
+        self.renderer.write(f"Used Directories: {ext4_blockgroupdescriptor['bg_used_dirs_count_lo']}")
         flags = ""
-        if self.ext4_blockgroupdescriptor['bg_flags'] == 0:
+        if ext4_blockgroupdescriptor['bg_flags'] == 0:
             flags = "Inode Uninit"
-        elif self.ext4_blockgroupdescriptor['bg_flags'] == 1:
+        elif ext4_blockgroupdescriptor['bg_flags'] == 1:
             flags = "Block Uninit"
-        print(f"Flags: {flags}")
-        self.ext4_blockgroupdescriptor['bg_exclude_bitmap_lo'] = int.from_bytes(self.f[offset+0x14:offset+0x18], byteorder='little')
-        print(f"Exclude Bitmap: {self.ext4_blockgroupdescriptor['bg_exclude_bitmap_lo']}")
-        self.ext4_blockgroupdescriptor['bg_reserved1'] = int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
-        print(f"Reserved1: {self.ext4_blockgroupdescriptor['bg_reserved1']}")
-        self.ext4_blockgroupdescriptor['bg_itable_unused_lo'] = int.from_bytes(self.f[offset+0x1C:offset+0x1E], byteorder='little')
-        print(f"Unused Inode Table: {self.ext4_blockgroupdescriptor['bg_itable_unused_lo']}")
-        self.ext4_blockgroupdescriptor['bg_checksum'] = int.from_bytes(self.f[offset+0x1E:offset+0x20], byteorder='little')
-        print(f"Checksum: {self.ext4_blockgroupdescriptor['bg_checksum']}")
+        self.renderer.write(f"Flags: {flags}")
+        self.renderer.write(f"Exclude Bitmap: {ext4_blockgroupdescriptor['bg_exclude_bitmap_lo']}")
+        self.renderer.write(f"Reserved1: {ext4_blockgroupdescriptor['bg_reserved1']}")
+        self.renderer.write(f"Unused Inode Table: {ext4_blockgroupdescriptor['bg_itable_unused_lo']}")
+        self.renderer.write(f"Checksum: {ext4_blockgroupdescriptor['bg_checksum']}")
         if self.ext4_superblock['sb_feature_incompat'] & EXT4_FEATURE_INCOMPAT['EXT4_FEATURE_INCOMPAT_64BIT'] and self.ext4_superblock['sb_desc_size'] > 32:
-            print("\n\nFor EXT4_FEATURE_INCOMPAT_64BIT and 'sb_desc_size' > 32\n\n")
-            self.ext4_blockgroupdescriptor['bg_block_bitmap_hi'] = int.from_bytes(self.f[offset+0x20:offset+0x24], byteorder='little')
-            print(f"Block Bitmap Hi: {self.ext4_blockgroupdescriptor['bg_block_bitmap_hi']}")
-            self.ext4_blockgroupdescriptor['bg_inode_bitmap_hi'] = int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
-            print(f"Inode Bitmap Hi: {self.ext4_blockgroupdescriptor['bg_inode_bitmap_hi']}")
-            self.ext4_blockgroupdescriptor['bg_inode_table_hi'] = int.from_bytes(self.f[offset+0x28:offset+0x2C], byteorder='little')
-            print(f"Inode Table Hi: {self.ext4_blockgroupdescriptor['bg_inode_table_hi']}")
-            self.ext4_blockgroupdescriptor['bg_free_blocks_count_hi'] = int.from_bytes(self.f[offset+0x2C:offset+0x2E], byteorder='little')
-            print(f"Free Blocks Hi: {self.ext4_blockgroupdescriptor['bg_free_blocks_count_hi']}")
-            self.ext4_blockgroupdescriptor['bg_free_inodes_count_hi'] = int.from_bytes(self.f[offset+0x2E:offset+0x30], byteorder='little')
-            print(f"Free Inodes Hi: {self.ext4_blockgroupdescriptor['bg_free_inodes_count_hi']}")
-            self.ext4_blockgroupdescriptor['bg_used_dirs_count_hi'] = int.from_bytes(self.f[offset+0x30:offset+0x32], byteorder='little')
-            print(f"Used Directories Hi: {self.ext4_blockgroupdescriptor['bg_used_dirs_count_hi']}")
-            self.ext4_blockgroupdescriptor['bg_itable_unused_hi'] = int.from_bytes(self.f[offset+0x32:offset+0x34], byteorder='little')
-            print(f"Unused Inode Table Hi: {self.ext4_blockgroupdescriptor['bg_itable_unused_hi']}")
-            self.ext4_blockgroupdescriptor['bg_exclude_bitmap_hi'] = int.from_bytes(self.f[offset+0x34:offset+0x38], byteorder='little')
-            print(f"Exclude Bitmap Hi: {self.ext4_blockgroupdescriptor['bg_exclude_bitmap_hi']}")
-            self.ext4_blockgroupdescriptor['bg_reserved2'] = int.from_bytes(self.f[offset+0x38:offset+0x3C], byteorder='little')
-            print(f"Reserved2: {self.ext4_blockgroupdescriptor['bg_reserved2']}")
-            self.ext4_blockgroupdescriptor['bg_reserved3'] = int.from_bytes(self.f[offset+0x3C:offset+0x40], byteorder='little')
-            print(f"Reserved3: {self.ext4_blockgroupdescriptor['bg_reserved3']}")
+            self.renderer.write("\n\nFor EXT4_FEATURE_INCOMPAT_64BIT and 'sb_desc_size' > 32\n\n")
+            self.renderer.write(f"Block Bitmap Hi: {ext4_blockgroupdescriptor['bg_block_bitmap_hi']}")
+            self.renderer.write(f"Inode Bitmap Hi: {ext4_blockgroupdescriptor['bg_inode_bitmap_hi']}")
+            self.renderer.write(f"Inode Table Hi: {ext4_blockgroupdescriptor['bg_inode_table_hi']}")
+            self.renderer.write(f"Free Blocks Hi: {ext4_blockgroupdescriptor['bg_free_blocks_count_hi']}")
+            self.renderer.write(f"Free Inodes Hi: {ext4_blockgroupdescriptor['bg_free_inodes_count_hi']}")
+            self.renderer.write(f"Used Directories Hi: {ext4_blockgroupdescriptor['bg_used_dirs_count_hi']}")
+            self.renderer.write(f"Unused Inode Table Hi: {ext4_blockgroupdescriptor['bg_itable_unused_hi']}")
+            self.renderer.write(f"Exclude Bitmap Hi: {ext4_blockgroupdescriptor['bg_exclude_bitmap_hi']}")
+            self.renderer.write(f"Reserved2: {ext4_blockgroupdescriptor['bg_reserved2']}")
+            self.renderer.write(f"Reserved3: {ext4_blockgroupdescriptor['bg_reserved3']}")
+        return ext4_blockgroupdescriptor
         
     def parse_ext4_inode_table(self,offset,group_num):
-        inode_size = self.ext4_superblock['sb_inode_size']
-        inode_count = self.ext4_superblock['sb_inodes_per_group']
-        for i in range(inode_count):
-            # print(f"\n\nParsing Inode {i}:\n\n")
-            # if i==784898:
-                # exit()
-            # print(f"\n\nParsing Inode {(group_num*self.ext4_superblock['sb_inodes_per_group'])+i}:\n\n")
-            # if (group_num*self.ext4_superblock['sb_inodes_per_group'])+i ==784897:
-            #     exit()
-            self.parse_ext4_inode(offset+(i*inode_size),i, group_num)
+        inode_size = self.geometry.inode_size
+        # allocated slots from the inode bitmap unless sweeping for deleted inodes
+        slots = self.ext4_inode_candidates(group_num, not self.sweep_unallocated)
+        if self.skip_empty_inodes and np is not None:
+            # only visit the slots parse_ext4_inode would not skip
+            slots = self.ext4_masked_slots(self.ext4_inode_table_array(offset), slots, self.ext4_inode_table_used_mask).tolist()
+        if len(slots):
+            # the loop below reads inode by inode, fetch their span in one go
+            self.f.prefetch(offset + slots[0]*inode_size, (slots[-1] + 1 - slots[0])*inode_size)
+        for i in slots:
             inodeoffset=offset+(i*inode_size)
-            if int.from_bytes(self.f[inodeoffset+0x04:inodeoffset+0x08], byteorder='little') == 0:
+            inode = self.parse_ext4_inode(inodeoffset,i, group_num)
+            # the record is decoded once, the checks below use its fields
+            if inode is None or inode.i_size_lo == 0:
                 continue
-            if int.from_bytes(self.f[inodeoffset+0x02:inodeoffset+0x04], byteorder='little') == 0 and int.from_bytes(self.f[inodeoffset+0x28:inodeoffset+0x2C], byteorder='little') == 0:
-                continue 
-            print("\n-----Parsing Extended Attributes-----\n")
-            self.ext4_parse_xattr((offset+(i*inode_size))+160)
-            print("\n-----End of Extended Attributes-----\n")
-            print("\n-----Parsing Extent Tree-----\n")
-            self.parse_ext4_extenttree(offset+(i*inode_size)+0x28)
-            print("\n-----End of Extent Tree-----\n")
-            extoffset=offset+((i*inode_size)+0x28)
-            # print(self.ext4_inode['i_flags'])
-            if ((self.ext4_inode['i_flags'] & EXT4_INODE_FLAGS['EXT4_INDEX_FL'])&1) == 1:
-                self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                if self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==0:
-                    ee_block=[]
-                    save_extoffset=extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                            self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                            self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                            self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                            self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                            ee_block.append(self.ext4_extent['ee_block'])
-                            extoffset=extoffset+12
-                    log_offset=[]
-                    log_number=[]
-                    extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        ogloglen=len(log_number)
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        for i in range(len(log_number),ee_block[i]):
-                            log_number.append(i)
-                            log_offset.append(self.ext4_extent['ee_start_lo']*(i-ogloglen)*4096)
-                        extoffset=extoffset+0x12
-                    extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')    
-                        self.ext4_parse_hashtree(self.ext4_extent['ee_start_lo'],log_number,log_offset)
-                        extoffset=extoffset+0x18
-                elif self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==1:
-                    self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                    extoffset=extoffset+0x18
-                    extoffset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                    self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                    self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                    self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                    self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                    self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                    ee_block=[]
-                    save_extoffset=extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        ee_block.append(self.ext4_extent['ee_block'])
-                        extoffset=extoffset+12
-                        log_offset=[]
-                        log_number=[]
-                        extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        ogloglen=len(log_number)
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        for i in range(len(log_number),ee_block[i]):
-                            log_number.append(i)
-                            log_offset.append(self.ext4_extent['ee_start_lo']*(i-ogloglen)*4096)
-                        extoffset=extoffset+0x12
-                    extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')    
-                        self.ext4_parse_hashtree(self.ext4_extent['ee_start_lo'],log_number,log_offset)
-                        extoffset=extoffset+0x18
-                elif self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==2:
-                    self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                    extoffset=extoffset+0x18
-                    extoffset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                    self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                    self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                    self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                    self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                    self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                    extoffset=extoffset+0x18
-                    extoffset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                    self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                    self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                    self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                    self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                    self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                    ee_block=[]
-                    save_extoffset=extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        ee_block.append(self.ext4_extent['ee_block'])
-                        extoffset=extoffset+12
-                        log_offset=[]
-                        log_number=[]
-                        extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        ogloglen=len(log_number)
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        for i in range(len(log_number),ee_block[i]):
-                            log_number.append(i)
-                            log_offset.append(self.ext4_extent['ee_start_lo']*(i-ogloglen)*4096)
-                        extoffset=extoffset+0x12
-                    extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')    
-                        self.ext4_parse_hashtree(self.ext4_extent['ee_start_lo'],log_number,log_offset)
-                        extoffset=extoffset+0x18
-                elif self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==3:
-                    self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                    extoffset=extoffset+0x18
-                    extoffset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                    self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                    self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                    self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                    self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                    self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                    extoffset=extoffset+0x18
-                    extoffset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                    self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                    self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                    self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                    self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                    self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                    self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                    extoffset=extoffset+0x18
-                    extoffset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                    self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                    self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                    self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                    self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                    self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                    ee_block=[]
-                    save_extoffset=extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        ee_block.append(self.ext4_extent['ee_block'])
-                        extoffset=extoffset+12
-                        log_offset=[]
-                        log_number=[]
-                        extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        ogloglen=len(log_number)
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')
-                        for i in range(len(log_number),ee_block[i]):
-                            log_number.append(i)
-                            log_offset.append(self.ext4_extent['ee_start_lo']*(i-ogloglen)*4096)
-                        extoffset=extoffset+0x12
-                    extoffset=save_extoffset
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_extent['ee_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent['ee_len'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x12], byteorder='little')
-                        self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[extoffset+0x12:extoffset+0x14], byteorder='little')
-                        self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x18], byteorder='little')    
-                        self.ext4_parse_hashtree(self.ext4_extent['ee_start_lo'],log_number,log_offset)
-                        extoffset=extoffset+0x18
-                    # print(f"Block: {self.ext4_extent['ee_block']} Length: {self.ext4_extent['ee_len']} Start: {self.ext4_extent['ee_start_hi']}:{self.ext4_extent['ee_start_lo']}")
+            if inode.i_uid == 0 and inode.i_block[:4] == bytes(4):
+                continue
+            self.renderer.write("\n-----Parsing Extended Attributes-----\n")
+            self.ext4_parse_xattr(inodeoffset+160)
+            self.renderer.write("\n-----End of Extended Attributes-----\n")
+            self.renderer.write("\n-----Parsing Extent Tree-----\n")
+            self.parse_ext4_extenttree(inodeoffset+0x28)
+            self.renderer.write("\n-----End of Extent Tree-----\n")
+            try:
+                runs = list(self.iter_extent_runs(inode.i_block))
+            except Ext4CorruptionError:
+                runs = []
+            if inode.i_flags & EXT4_INODE_FLAGS['EXT4_INDEX_FL']:
+                extent_map = Ext4ExtentMap(runs, self.geometry.block_size)
+                if extent_map.physical(0) is not None:
+                    self.ext4_parse_hashtree(extent_map.physical(0),extent_map)
             else:
-                self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[extoffset+0x00:extoffset+0x02], byteorder='little')
-                self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[extoffset+0x02:extoffset+0x04], byteorder='little')
-                self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[extoffset+0x04:extoffset+0x06], byteorder='little')
-                self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[extoffset+0x06:extoffset+0x08], byteorder='little')
-                self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[extoffset+0x08:extoffset+0x0C], byteorder='little')
-                # print("well")
-                if self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==0:
-                    # print("depth1")
-                    for i in range(self.ext4_extent_header_copy['eh_entries']):
-                        self.ext4_parse_direntry(extoffset+(0x0C*(i+1)))
-                    # if self.ext4_inode['i_flags'] & EXT4_INODE_FLAGS['EXT4_INDEX_FL'] != 0:
-                    #     continue
-                elif self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==1:
-                    for ent in range(self.ext4_extent_header_copy['eh_entries']):
-                        extoffset=extoffset+(0x0C*ent)
-                        self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                        new_offset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                        self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[new_offset+0x00:new_offset+0x02], byteorder='little')
-                        self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[new_offset+0x02:new_offset+0x04], byteorder='little')
-                        self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[new_offset+0x04:new_offset+0x06], byteorder='little')
-                        self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[new_offset+0x06:new_offset+0x08], byteorder='little')
-                        self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[new_offset+0x08:new_offset+0x0C], byteorder='little')
-                        new_offset1=new_offset+0x0C
-                        for i in range(self.ext4_extent_header_copy['eh_entries']):
-                            self.ext4_parse_direntry(new_offset1+(0x0C*i))
-                    # if self.ext4_inode['i_flags'] & EXT4_INODE_FLAGS['EXT4_INDEX_FL'] != 0:
-                    #     continue
-                elif self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==2:
-                    for ent in range(self.ext4_extent_header_copy['eh_entries']):
-                        extoffset=extoffset+(0x0C*ent)
-                        self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                        new_offset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                        self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[new_offset+0x00:new_offset+0x02], byteorder='little')
-                        self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[new_offset+0x02:new_offset+0x04], byteorder='little')
-                        self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[new_offset+0x04:new_offset+0x06], byteorder='little')
-                        self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[new_offset+0x06:new_offset+0x08], byteorder='little')
-                        self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[new_offset+0x08:new_offset+0x0C], byteorder='little')
-                        for ent1 in range(self.ext4_extent_header_copy['eh_entries']):
-                            new_offset=new_offset+(0x0C*ent1)
-                            self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[new_offset+0x0C:new_offset+0x10], byteorder='little')
-                            self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[new_offset+0x10:new_offset+0x14], byteorder='little')
-                            self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[new_offset+0x14:new_offset+0x16], byteorder='little')
-                            self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[new_offset+0x16:new_offset+0x18], byteorder='little')
-                            new_offset1=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                            self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[new_offset1+0x00:new_offset1+0x02], byteorder='little')
-                            self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[new_offset1+0x02:new_offset1+0x04], byteorder='little')
-                            self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[new_offset1+0x04:new_offset1+0x06], byteorder='little')
-                            self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[new_offset1+0x06:new_offset1+0x08], byteorder='little')
-                            self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[new_offset1+0x08:new_offset1+0x0C], byteorder='little')
-                            new_offset2=new_offset1+0x0C
-                            for ent2 in range(self.ext4_extent_header_copy['eh_entries']):
-                                self.ext4_parse_direntry(new_offset2*ent2)
-                            # if self.ext4_inode['i_flags'] & EXT4_INODE_FLAGS['EXT4_INDEX_FL'] != 0:
-                            #     continue
-                elif self.ext4_extent_header_copy['eh_magic']==0xF30A and self.ext4_extent_header_copy['eh_depth']==3:
-                    for ent in range(self.ext4_extent_header_copy['eh_entries']):
-                        extoffset=extoffset+(0x0C*ent)
-                        self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[extoffset+0x0C:extoffset+0x10], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[extoffset+0x10:extoffset+0x14], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[extoffset+0x14:extoffset+0x16], byteorder='little')
-                        self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[extoffset+0x16:extoffset+0x18], byteorder='little')
-                        new_offset=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                        self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[new_offset+0x00:new_offset+0x02], byteorder='little')
-                        self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[new_offset+0x02:new_offset+0x04], byteorder='little')
-                        self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[new_offset+0x04:new_offset+0x06], byteorder='little')
-                        self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[new_offset+0x06:new_offset+0x08], byteorder='little')
-                        self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[new_offset+0x08:new_offset+0x0C], byteorder='little')
-                        for ent1 in range(self.ext4_extent_header_copy['eh_entries']):
-                            new_offset=new_offset+(0x0C*ent1)
-                            self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[new_offset+0x0C:new_offset+0x10], byteorder='little')
-                            self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[new_offset+0x10:new_offset+0x14], byteorder='little')
-                            self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[new_offset+0x14:new_offset+0x16], byteorder='little')
-                            self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[new_offset+0x16:new_offset+0x18], byteorder='little')
-                            new_offset1=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                            self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[new_offset1+0x00:new_offset1+0x02], byteorder='little')
-                            self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[new_offset1+0x02:new_offset1+0x04], byteorder='little')
-                            self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[new_offset1+0x04:new_offset1+0x06], byteorder='little')
-                            self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[new_offset1+0x06:new_offset1+0x08], byteorder='little')
-                            self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[new_offset1+0x08:new_offset1+0x0C], byteorder='little')
-                            new_offset2=new_offset1+0x0C
-                            for ent2 in range(self.ext4_extent_header_copy['eh_entries']):
-                                new_offset2=new_offset2+(0x0C*ent2)
-                                self.ext4_extent_idx_copy['ei_block'] = int.from_bytes(self.f[new_offset2+0x0C:new_offset2+0x10], byteorder='little')
-                                self.ext4_extent_idx_copy['ei_leaf_lo'] = int.from_bytes(self.f[new_offset2+0x10:new_offset2+0x14], byteorder='little')
-                                self.ext4_extent_idx_copy['ei_leaf_hi'] = int.from_bytes(self.f[new_offset2+0x14:new_offset2+0x16], byteorder='little')
-                                self.ext4_extent_idx_copy['ei_unused'] = int.from_bytes(self.f[new_offset2+0x16:new_offset2+0x18], byteorder='little')
-                                new_offset3=self.ext4_extent_idx_copy['ei_leaf_lo']*4096
-                                self.ext4_extent_header_copy['eh_magic'] = int.from_bytes(self.f[new_offset3+0x00:new_offset3+0x02], byteorder='little')
-                                self.ext4_extent_header_copy['eh_entries'] = int.from_bytes(self.f[new_offset3+0x02:new_offset3+0x04], byteorder='little')
-                                self.ext4_extent_header_copy['eh_max'] = int.from_bytes(self.f[new_offset3+0x04:new_offset3+0x06], byteorder='little')
-                                self.ext4_extent_header_copy['eh_depth'] = int.from_bytes(self.f[new_offset3+0x06:new_offset3+0x08], byteorder='little')
-                                self.ext4_extent_header_copy['eh_generation'] = int.from_bytes(self.f[new_offset3+0x08:new_offset3+0x0C], byteorder='little')
-                                new_offset3=new_offset3+0x0C
-                                for ent3 in range(self.ext4_extent_header_copy['eh_entries']):
-                                    self.ext4_parse_direntry(new_offset3*ent3)
-                    # if self.ext4_inode['i_flags'] & EXT4_INODE_FLAGS['EXT4_INDEX_FL'] != 0:
-                    
-                    #     continue
-                                
-                # self.ext4_parse_dir(offset+(i*inode_size))
-
-
-    def ext4_parse_hashtree(self, offset, log_number, log_offset):
-        offset=offset*4096
-        self.dx_root['dot_inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-        print(f"Inode: {self.dx_root['dot_inode']}")
-        self.dx_root['dot_rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
-        print(f"Record Length: {self.dx_root['dot_rec_len']}")
-        rec_len=self.dx_root['dot_rec_len']
-        self.dx_root['dot_name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
-        print(f"Name Length: {self.dx_root['dot_name_len']}")
-        self.dx_root['dot_file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
-        print(f"File Type: {self.dx_root['dot_file_type']}")
-        self.dx_root['dot_name']=self.f[offset+0x08:offset+0x0C].hex()
-        print(f"Name: {self.dx_root['dot_name']}")
-        self.dx_root['dot_dot_inode']=int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-        print(f"Inode: {self.dx_root['dot_dot_inode']}")
-        self.dx_root['dot_dot_rec_len']=int.from_bytes(self.f[offset+0x10:offset+0x12],byteorder='little')
-        print(f"Record Length: {self.dx_root['dot_dot_rec_len']}")
-        rec_len=self.dx_root['dot_dot_rec_len']
-        self.dx_root['dot_dot_name_len']=int.from_bytes(self.f[offset+0x12:offset+0x13],byteorder='little')
-        print(f"Name Length: {self.dx_root['dot_dot_name_len']}")
-        self.dx_root['dot_dot_file_type']=int.from_bytes(self.f[offset+0x13:offset+0x14],byteorder='little')
-        print(f"File Type: {self.dx_root['dot_dot_file_type']}")
-        self.dx_root['dot_dot_name']=self.f[offset+0x14:offset+0x18].hex()
-        print(f"Name: {self.dx_root['dot_dot_name']}")
-        self.dx_root['reserved_zero']=int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
-        print(f"Reserved Zero: {self.dx_root['reserved_zero']}")
-        self.dx_root['hash_version']=int.from_bytes(self.f[offset+0x1C:offset+0x1D], byteorder='little')
-        # print(f"Hash Version: {self.dx_root['hash_version']}")
-        hash_version=""
-        if self.dx_root['hash_version'] == 0:
-            hash_version="Legacy"
-        elif self.dx_root['hash_version'] == 1:
-            hash_version="Half MD4"
-        elif self.dx_root['hash_version'] == 2:
-            hash_version="Tea"
-        elif self.dx_root['hash_version'] == 3:
-            hash_version="Legacy Unsigned"
-        elif self.dx_root['hash_version'] == 4:
-            hash_version="Unsigned,Half MD4"
-        elif self.dx_root['hash_version'] == 5:
-            hash_version="Unsigned,Tea"
-        elif self.dx_root['hash_version'] == 6:
-            hash_version="Splash"
-        print(f"Hash Version: {hash_version}")
-        self.dx_root['info_length']=int.from_bytes(self.f[offset+0x1D:offset+0x1E], byteorder='little')
-        print(f"Info Length: {self.dx_root['info_length']}")  
-        self.dx_root['indirect_levels']=int.from_bytes(self.f[offset+0x1E:offset+0x1F], byteorder='little')
-        print(f"Indirect Levels: {self.dx_root['indirect_levels']}")
-        self.dx_root['unused_flags']=int.from_bytes(self.f[offset+0x1F:offset+0x20], byteorder='little')
-        print(f"Unused Flags: {self.dx_root['unused_flags']}")
-        self.dx_root['limit']=int.from_bytes(self.f[offset+0x20:offset+0x22], byteorder='little')
-        print(f"Limit: {self.dx_root['limit']}")
-        self.dx_root['count']=int.from_bytes(self.f[offset+0x22:offset+0x24], byteorder='little')
-        print(f"Count: {self.dx_root['count']}")
-        self.dx_root['block']=int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
-        print(f"Block: {self.dx_root['block']}")        
-        offset=offset+0x28
-        valid_ent=self.dx_root['count']
-        indirectlevel=self.dx_root['indirect_levels']
-        if self.dx_root['indirect_levels']==0:
-            for i in range(0, valid_ent, 1):
-                print(f"Entry: {i}")
-                self.dx_entry['hash']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                print(f"Hash: {self.dx_entry['hash']}")
-                self.dx_entry['block']=int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                print(f"Block: {self.dx_entry['block']}")
-                diroff=0
-                for i in range(len(log_number)):
-                    if log_number[i]==self.dx_root['block']:
-                        diroff=log_offset[i]
-                        break
-                offset=offset+0x08
-                if self.dx_entry['hash']==0:
-                    continue
-                self.ext4_parse_linear_dir_entry_info(diroff)
-        elif self.dx_root['indirect_levels']==1:
-            for i in range(0, valid_ent, 1):
-                print(f"Entry: {i}")
-                self.dx_entry['hash']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                print(f"Hash: {self.dx_entry['hash']}")
-                self.dx_entry['block']=int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                print(f"Block: {self.dx_entry['block']}")
-                diroff=0
-                for i in range(len(log_number)):
-                    if log_number[i]==self.dx_root['block']:
-                        diroff=log_offset[i]
-                        self.print_ext4_htree(diroff)
-                        diroff=diroff+0x08
-                        for i in range(0, self.dx_root['count'], 1):
-                            
-                            self.dx_entry['hash']=int.from_bytes(self.f[diroff:diroff+0x04], byteorder='little')
-                            print(f"Hash: {self.dx_entry['hash']}")
-                            self.dx_entry['block']=int.from_bytes(self.f[diroff+0x04:diroff+0x08], byteorder='little')
-                            print(f"Block: {self.dx_entry['block']}")
-                            dir2=0
-                            for i in range(len(log_number)):
-                                if log_number[i]==self.dx_entry['block']:
-                                    dir2=log_offset[i]
-                                    break
-                            if self.dx_entry['hash']==0:
-                                continue
-                            self.ext4_parse_linear_dir_entry_info(dir2)
-                            diroff=diroff+0x08
-                offset=offset+0x08
-        elif self.dx_root['indirect_levels']==2:
-            for i in range(0, valid_ent, 1):
-                print(f"Entry: {i}")
-                self.dx_entry['hash']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                print(f"Hash: {self.dx_entry['hash']}")
-                self.dx_entry['block']=int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                print(f"Block: {self.dx_entry['block']}")
-                diroff=0
-                for i in range(len(log_number)):
-                    if log_number[i]==self.dx_root['block']:
-                        diroff=log_offset[i]
-                        self.print_ext4_htree(diroff)
-                        diroff=diroff+0x08
-                        for i in range(0, self.dx_root['count'], 1):
-                            self.dx_entry['hash']=int.from_bytes(self.f[diroff:diroff+0x04], byteorder='little')
-                            print(f"Hash: {self.dx_entry['hash']}")
-                            self.dx_entry['block']=int.from_bytes(self.f[diroff+0x04:diroff+0x08], byteorder='little')
-                            print(f"Block: {self.dx_entry['block']}")
-                            diroff2=0
-                            for i in range(len(log_number)):
-                                if log_number[i]==self.dx_entry['block']:
-                                    diroff2=log_offset[i]
-                                    self.print_ext4_htree(diroff2)
-                                    diroff2=diroff2+0x08
-                                    for i in range(0, self.dx_root['count'], 1):
-                                        self.dx_entry['hash']=int.from_bytes(self.f[diroff2:diroff2+0x04], byteorder='little')
-                                        print(f"Hash: {self.dx_entry['hash']}")
-                                        self.dx_entry['block']=int.from_bytes(self.f[diroff2+0x04:diroff2+0x08], byteorder='little')
-                                        print(f"Block: {self.dx_entry['block']}")
-                                        dir3=0
-                                        for i in range(len(log_number)):
-                                            if log_number[i]==self.dx_entry['block']:
-                                                dir3=log_offset[i]
-                                                break
-                                        if self.dx_entry['hash']==0:
-                                            continue
-                                        self.ext4_parse_linear_dir_entry_info(dir3)
-                                        diroff2=diroff2+0x08
-                            diroff=diroff+0x08
-                offset=offset+0x08
-        elif self.dx_root['indirect_levels']==3:
-            for i in range(0, valid_ent, 1):
-                print(f"Entry: {i}")
-                self.dx_entry['hash']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                print(f"Hash: {self.dx_entry['hash']}")
-                self.dx_entry['block']=int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                print(f"Block: {self.dx_entry['block']}")
-                diroff=0
-                for i in range(len(log_number)):
-                    if log_number[i]==self.dx_root['block']:
-                        diroff=log_offset[i]
-                        self.print_ext4_htree(diroff)
-                        diroff=diroff+0x08
-                        for i in range(0, self.dx_root['count'], 1):
-                            self.dx_entry['hash']=int.from_bytes(self.f[diroff:diroff+0x04], byteorder='little')
-                            print(f"Hash: {self.dx_entry['hash']}")
-                            self.dx_entry['block']=int.from_bytes(self.f[diroff+0x04:diroff+0x08], byteorder='little')
-                            print(f"Block: {self.dx_entry['block']}")
-                            diroff2=0
-                            for i in range(len(log_number)):
-                                if log_number[i]==self.dx_entry['block']:
-                                    diroff2=log_offset[i]
-                                    self.print_ext4_htree(diroff2)
-                                    diroff2=diroff2+0x08
-                                    for i in range(0, self.dx_root['count'], 1):
-                                        self.dx_entry['hash']=int.from_bytes(self.f[diroff2:diroff2+0x04], byteorder='little')
-                                        print(f"Hash: {self.dx_entry['hash']}")
-                                        self.dx_entry['block']=int.from_bytes(self.f[diroff2+0x04:diroff2+0x08], byteorder='little')
-                                        print(f"Block: {self.dx_entry['block']}")
-                                        diroff3=0
-                                        for i in range(len(log_number)):
-                                            if log_number[i]==self.dx_entry['block']:
-                                                diroff3=log_offset[i]
-                                                self.print_ext4_htree(diroff3)
-                                                diroff3=diroff3+0x08
-                                                for i in range(0, self.dx_root['count'], 1):
-                                                    self.dx_entry['hash']=int.from_bytes(self.f[diroff3:diroff3+0x04], byteorder='little')
-                                                    print(f"Hash: {self.dx_entry['hash']}")
-                                                    self.dx_entry['block']=int.from_bytes(self.f[diroff3+0x04:diroff3+0x08], byteorder='little')
-                                                    print(f"Block: {self.dx_entry['block']}")
-                                                    dir4=0
-                                                    for i in range(len(log_number)):
-                                                        if log_number[i]==self.dx_entry['block']:
-                                                            dir4=log_offset[i]
-                                                            break
-                                                    if self.dx_entry['hash']==0:
-                                                        continue
-                                                    self.ext4_parse_linear_dir_entry_info(dir4)
-                                                    diroff3=diroff3+0x08
-                                        diroff2=diroff2+0x08
-                            diroff=diroff+0x08
-                offset=offset+0x08
+                for run in runs:
+                    self.ext4_parse_direntry(run, inode.i_flags)
 
-    
-    def print_ext4_htree(self,offset):
-        self.dx_root['dot_inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-        print(f"Inode: {self.dx_root['dot_inode']}")
-        self.dx_root['dot_rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
-        print(f"Record Length: {self.dx_root['dot_rec_len']}")
-        rec_len=self.dx_root['dot_rec_len']
-        self.dx_root['dot_name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
-        print(f"Name Length: {self.dx_root['dot_name_len']}")
-        self.dx_root['dot_file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
-        print(f"File Type: {self.dx_root['dot_file_type']}")
-        self.dx_root['dot_name']=self.f[offset+0x08:offset+0x0C].hex()
-        print(f"Name: {self.dx_root['dot_name']}")
-        self.dx_root['dot_dot_inode']=int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-        print(f"Inode: {self.dx_root['dot_dot_inode']}")
-        self.dx_root['dot_dot_rec_len']=int.from_bytes(self.f[offset+0x10:offset+0x12],byteorder='little')
-        print(f"Record Length: {self.dx_root['dot_dot_rec_len']}")
-        rec_len=self.dx_root['dot_dot_rec_len']
-        self.dx_root['dot_dot_name_len']=int.from_bytes(self.f[offset+0x12:offset+0x13],byteorder='little')
-        print(f"Name Length: {self.dx_root['dot_dot_name_len']}")
-        self.dx_root['dot_dot_file_type']=int.from_bytes(self.f[offset+0x13:offset+0x14],byteorder='little')
-        print(f"File Type: {self.dx_root['dot_dot_file_type']}")
-        self.dx_root['dot_dot_name']=self.f[offset+0x14:offset+0x18].hex()
-        print(f"Name: {self.dx_root['dot_dot_name']}")
-        self.dx_root['reserved_zero']=int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
-        print(f"Reserved Zero: {self.dx_root['reserved_zero']}")
-        self.dx_root['hash_version']=int.from_bytes(self.f[offset+0x1C:offset+0x1D], byteorder='little')
-        # print(f"Hash Version: {self.dx_root['hash_version']}")
+
+    def ext4_parse_hashtree(self, offset, extent_map):
+        dx_root = {}
+        offset=offset*self.geometry.block_size
+        dx_root['dot_inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
+        self.renderer.write(f"Inode: {dx_root['dot_inode']}")
+        dx_root['dot_rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
+        self.renderer.write(f"Record Length: {dx_root['dot_rec_len']}")
+        rec_len=dx_root['dot_rec_len']
+        dx_root['dot_name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
+        self.renderer.write(f"Name Length: {dx_root['dot_name_len']}")
+        dx_root['dot_file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
+        self.renderer.write(f"File Type: {dx_root['dot_file_type']}")
+        dx_root['dot_name']=self.f[offset+0x08:offset+0x0C].hex()
+        self.renderer.write(f"Name: {dx_root['dot_name']}")
+        dx_root['dot_dot_inode']=int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
+        self.renderer.write(f"Inode: {dx_root['dot_dot_inode']}")
+        dx_root['dot_dot_rec_len']=int.from_bytes(self.f[offset+0x10:offset+0x12],byteorder='little')
+        self.renderer.write(f"Record Length: {dx_root['dot_dot_rec_len']}")
+        rec_len=dx_root['dot_dot_rec_len']
+        dx_root['dot_dot_name_len']=int.from_bytes(self.f[offset+0x12:offset+0x13],byteorder='little')
+        self.renderer.write(f"Name Length: {dx_root['dot_dot_name_len']}")
+        dx_root['dot_dot_file_type']=int.from_bytes(self.f[offset+0x13:offset+0x14],byteorder='little')
+        self.renderer.write(f"File Type: {dx_root['dot_dot_file_type']}")
+        dx_root['dot_dot_name']=self.f[offset+0x14:offset+0x18].hex()
+        self.renderer.write(f"Name: {dx_root['dot_dot_name']}")
+        dx_root['reserved_zero']=int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
+        self.renderer.write(f"Reserved Zero: {dx_root['reserved_zero']}")
+        dx_root['hash_version']=int.from_bytes(self.f[offset+0x1C:offset+0x1D], byteorder='little')
+        # print(f"Hash Version: {dx_root['hash_version']}")
         hash_version=""
-        if self.dx_root['hash_version'] == 0:
+        if dx_root['hash_version'] == 0:
             hash_version="Legacy"
-        elif self.dx_root['hash_version'] == 1:
+        elif dx_root['hash_version'] == 1:
             hash_version="Half MD4"
-        elif self.dx_root['hash_version'] == 2:
+        elif dx_root['hash_version'] == 2:
             hash_version="Tea"
-        elif self.dx_root['hash_version'] == 3:
+        elif dx_root['hash_version'] == 3:
             hash_version="Legacy Unsigned"
-        elif self.dx_root['hash_version'] == 4:
+        elif dx_root['hash_version'] == 4:
             hash_version="Unsigned,Half MD4"
-        elif self.dx_root['hash_version'] == 5:
+        elif dx_root['hash_version'] == 5:
             hash_version="Unsigned,Tea"
-        elif self.dx_root['hash_version'] == 6:
+        elif dx_root['hash_version'] == 6:
             hash_version="Splash"
-        print(f"Hash Version: {hash_version}")
-        self.dx_root['info_length']=int.from_bytes(self.f[offset+0x1D:offset+0x1E], byteorder='little')
-        print(f"Info Length: {self.dx_root['info_length']}")  
-        self.dx_root['indirect_levels']=int.from_bytes(self.f[offset+0x1E:offset+0x1F], byteorder='little')
-        print(f"Indirect Levels: {self.dx_root['indirect_levels']}")
-        self.dx_root['unused_flags']=int.from_bytes(self.f[offset+0x1F:offset+0x20], byteorder='little')
-        print(f"Unused Flags: {self.dx_root['unused_flags']}")
-        self.dx_root['limit']=int.from_bytes(self.f[offset+0x20:offset+0x22], byteorder='little')
-        print(f"Limit: {self.dx_root['limit']}")
-        self.dx_root['count']=int.from_bytes(self.f[offset+0x22:offset+0x24], byteorder='little')
-        print(f"Count: {self.dx_root['count']}")
-        self.dx_root['block']=int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
-        print(f"Block: {self.dx_root['block']}")  
+        self.renderer.write(f"Hash Version: {hash_version}")
+        dx_root['info_length']=int.from_bytes(self.f[offset+0x1D:offset+0x1E], byteorder='little')
+        self.renderer.write(f"Info Length: {dx_root['info_length']}")  
+        dx_root['indirect_levels']=int.from_bytes(self.f[offset+0x1E:offset+0x1F], byteorder='little')
+        self.renderer.write(f"Indirect Levels: {dx_root['indirect_levels']}")
+        dx_root['unused_flags']=int.from_bytes(self.f[offset+0x1F:offset+0x20], byteorder='little')
+        self.renderer.write(f"Unused Flags: {dx_root['unused_flags']}")
+        dx_root['limit']=int.from_bytes(self.f[offset+0x20:offset+0x22], byteorder='little')
+        self.renderer.write(f"Limit: {dx_root['limit']}")
+        dx_root['count']=int.from_bytes(self.f[offset+0x22:offset+0x24], byteorder='little')
+        self.renderer.write(f"Count: {dx_root['count']}")
+        dx_root['block']=int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
+        self.renderer.write(f"Block: {dx_root['block']}")        
+        # every index level in tree order, the block of each dx entry goes
+        # through the extent map; interior blocks are listed by the shared walk
+        info = self.ext4_dx_root_info(extent_map)
+        frames = None if info is None else self.ext4_dx_frames(extent_map, info)
+        level = 0
+        while frames is not None and level is not None:
+            for depth in range(level, len(frames)):
+                entries, i = frames[depth]
+                self.renderer.write(f"Level: {depth}")
+                self.renderer.write(f"Entry: {i}")
+                self.renderer.write(f"Hash: {entries[i].hash}")
+                self.renderer.write(f"Block: {entries[i].block}")
+            entries, i = frames[-1]
+            self.ext4_parse_dx_leaf(extent_map, entries[i].block)
+            level = self.ext4_dx_next_leaf(extent_map, frames)
+
+    def ext4_parse_dx_leaf(self, extent_map, logical):
+        offset = extent_map.offset(logical)
+        if offset is None:
+            return
+        end = offset + self.geometry.block_size
+        while offset + 8 <= end:
+            rec_len = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
+            if rec_len < 8:
+                break
+            # unused records and the checksum tail are not listed
+            if int.from_bytes(self.f[offset:offset+0x04], byteorder='little') != 0:
+                self.ext4_parse_linear_dir_entry_info(offset)
+            offset += rec_len
 
     def parse_ext4_inode(self,offset,inode_num,group_num):
-        if self.DEBUG==False and int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little') == 0:
+        inode = decode_ext4_inode(self.f, offset, self.geometry.inode_size)
+        if self.skip_empty_inodes and inode.i_size_lo == 0:
             return 
-        if int.from_bytes(self.f[offset+0x02:offset+0x04],byteorder = 'little')==0 and int.from_bytes(self.f[offset+0x28:offset+0x2C],byteorder='little')==0:
+        if self.skip_empty_inodes and inode.i_uid==0 and inode.i_block[:4]==bytes(4):
             return
-        print(f"\n\nParsing Inode {(group_num*self.ext4_superblock['sb_inodes_per_group'])+inode_num+1}:\n\n")
+        ext4_inode = EXT4_INODE_LAYOUT.as_dict(inode)
+        self.renderer.write(f"\n\nParsing Inode {(group_num*self.ext4_superblock['sb_inodes_per_group'])+inode_num+1}:\n\n")
         idchk=((group_num*self.ext4_superblock['sb_inodes_per_group'])+inode_num+1)
         # print(hex(offset))
         # if idchk == 525749:
@@ -1511,246 +4511,110 @@ class Ext4Parser:
         # print(inode_num)
         # print(group_num)
         # print(self.ext4_superblock['sb_inodes_per_group'])
-        self.ext4_inode['i_mode'] = int.from_bytes(self.f[offset+0x00:offset+0x02], byteorder='little')
-        print(f"Mode: {self.ext4_inode['i_mode']}")
-        self.ext4_inode['i_uid'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
-        print(f"UID: {self.ext4_inode['i_uid']}")
-        self.ext4_inode['i_size_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-        print(f"Size: {self.ext4_inode['i_size_lo']}")
-        self.ext4_inode['i_atime'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Access Time: {datetime.utcfromtimestamp(self.ext4_inode['i_atime']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_inode['i_ctime'] = int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-        print(f"Creation Time: {datetime.utcfromtimestamp(self.ext4_inode['i_ctime']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_inode['i_mtime'] = int.from_bytes(self.f[offset+0x10:offset+0x14], byteorder='little')
-        print(f"Modification Time: {datetime.utcfromtimestamp(self.ext4_inode['i_mtime']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_inode['i_dtime'] = int.from_bytes(self.f[offset+0x14:offset+0x18], byteorder='little')
-        print(f"Deletion Time: {datetime.utcfromtimestamp(self.ext4_inode['i_dtime']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.ext4_inode['i_gid'] = int.from_bytes(self.f[offset+0x18:offset+0x1A], byteorder='little')
-        print(f"GID: {self.ext4_inode['i_gid']}")
-        self.ext4_inode['i_links_count'] = int.from_bytes(self.f[offset+0x1A:offset+0x1C], byteorder='little')
-        print(f"Links Count: {self.ext4_inode['i_links_count']}")
-        self.ext4_inode['i_blocks_lo'] = int.from_bytes(self.f[offset+0x1C:offset+0x20], byteorder='little')
-        print(f"Blocks: {self.ext4_inode['i_blocks_lo']}")
-        self.ext4_inode['i_flags'] = int.from_bytes(self.f[offset+0x20:offset+0x24], byteorder='little')
-        print(f"Flags: {self.ext4_inode['i_flags']}")
-        self.ext4_inode['i_osd1'] = self.f[offset+0x24:offset+0x28].hex()
-        print(f"OSD1: {self.ext4_inode['i_osd1']}")
-        self.ext4_inode['i_block'] = []
-        for i in range(15):
-            self.ext4_inode['i_block'].append(int.from_bytes(self.f[offset+0x28+(i*4):offset+0x2C+(i*4)], byteorder='little'))
-        print(f"Blocks: {self.ext4_inode['i_block']}")
-        self.ext4_inode['i_generation'] = int.from_bytes(self.f[offset+0x64:offset+0x68], byteorder='little')
-        print(f"Generation: {self.ext4_inode['i_generation']}")
-        self.ext4_inode['i_file_acl_lo'] = int.from_bytes(self.f[offset+0x68:offset+0x6C], byteorder='little')
-        print(f"File ACL: {self.ext4_inode['i_file_acl_lo']}")
-        self.ext4_inode['i_size_high'] = int.from_bytes(self.f[offset+0x6C:offset+0x70], byteorder='little')
-        print(f"Size High: {self.ext4_inode['i_size_high']}")
-        self.ext4_inode['i_obso_faddr'] = int.from_bytes(self.f[offset+0x70:offset+0x74], byteorder='little')
-        print(f"Obsolete Fragment Address: {self.ext4_inode['i_obso_faddr']}")
-        self.ext4_inode['l_i_blocks_high'] = int.from_bytes(self.f[offset+0x74:offset+0x78], byteorder='little')
-        print(f"Blocks High: {self.ext4_inode['l_i_blocks_high']}")
-        self.ext4_inode['l_i_file_acl_high'] = int.from_bytes(self.f[offset+0x78:offset+0x7C], byteorder='little')
-        print(f"File ACL High: {self.ext4_inode['l_i_file_acl_high']}")
-        self.ext4_inode['l_i_uid_high'] = int.from_bytes(self.f[offset+0x7C:offset+0x80], byteorder='little')
-        print(f"UID High: {self.ext4_inode['l_i_uid_high']}")
-        self.ext4_inode['l_i_gid_high'] = int.from_bytes(self.f[offset+0x80:offset+0x84], byteorder='little')
-        print(f"GID High: {self.ext4_inode['l_i_gid_high']}")
-        self.ext4_inode['l_i_checksum_lo'] = int.from_bytes(self.f[offset+0x84:offset+0x88], byteorder='little')
-        print(f"Checksum: {self.ext4_inode['l_i_checksum_lo']}")
-        self.ext4_inode['l_i_reserved'] = int.from_bytes(self.f[offset+0x88:offset+0x90], byteorder='little')
-        print(f"Reserved: {self.ext4_inode['l_i_reserved']}")
-        self.ext4_inode['l_i_checksum_hi'] = int.from_bytes(self.f[offset+0x90:offset+0x94], byteorder='little')
-        print(f"Checksum High: {self.ext4_inode['l_i_checksum_hi']}")
-        self.ext4_inode['l_i_extra_isize'] = int.from_bytes(self.f[offset+0x94:offset+0x96], byteorder='little')
-        print(f"Extra ISize: {self.ext4_inode['l_i_extra_isize']}")
-        self.ext4_inode['l_i_ctime_extra'] = int.from_bytes(self.f[offset+0x96:offset+0x98], byteorder='little')
-        print(f"CTime Extra: {self.ext4_inode['l_i_ctime_extra']}")
-        self.ext4_inode['l_i_mtime_extra'] = int.from_bytes(self.f[offset+0x98:offset+0x9A], byteorder='little')
-        print(f"MTime Extra: {self.ext4_inode['l_i_mtime_extra']}")
-        self.ext4_inode['l_i_atime_extra'] = int.from_bytes(self.f[offset+0x9A:offset+0x9C], byteorder='little')
-        print(f"ATime Extra: {self.ext4_inode['l_i_atime_extra']}")
-        self.ext4_inode['l_i_crtime'] = int.from_bytes(self.f[offset+0x9C:offset+0xA0], byteorder='little')
-        print(f"CRTime: {self.ext4_inode['l_i_crtime']}")
-        self.ext4_inode['l_i_crtime_extra'] = int.from_bytes(self.f[offset+0xA0:offset+0xA2], byteorder='little')
-        print(f"CRTime Extra: {self.ext4_inode['l_i_crtime_extra']}")
-        self.ext4_inode['l_i_version_hi'] = int.from_bytes(self.f[offset+0xA2:offset+0xA4], byteorder='little')
-        print(f"Version High: {self.ext4_inode['l_i_version_hi']}")
-        self.ext4_inode['l_i_projid'] = int.from_bytes(self.f[offset+0xA4:offset+0xA6], byteorder='little')
-        print(f"Project ID: {self.ext4_inode['l_i_projid']}")
-        self.ext4_inode['l_i_reserved2'] = int.from_bytes(self.f[offset+0xA6:offset+0x100], byteorder='little')
-        print("\n")
+        self.renderer.write(f"Mode: {ext4_inode['i_mode']}")
+        self.renderer.write(f"UID: {ext4_inode['i_uid']}")
+        self.renderer.write(f"Size: {ext4_inode['i_size_lo']}")
+        self.renderer.write(f"Access Time: {datetime.utcfromtimestamp(ext4_inode['i_atime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"Creation Time: {datetime.utcfromtimestamp(ext4_inode['i_ctime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"Modification Time: {datetime.utcfromtimestamp(ext4_inode['i_mtime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"Deletion Time: {datetime.utcfromtimestamp(ext4_inode['i_dtime']).strftime('%Y-%m-%d %H:%M:%S')}")
+        self.renderer.write(f"GID: {ext4_inode['i_gid']}")
+        self.renderer.write(f"Links Count: {ext4_inode['i_links_count']}")
+        self.renderer.write(f"Blocks: {ext4_inode['i_blocks_lo']}")
+        self.renderer.write(f"Flags: {ext4_inode['i_flags']}")
+        self.renderer.write(f"OSD1: {ext4_inode['i_osd1']}")
+        self.renderer.write(f"Blocks: {ext4_inode['i_block']}")
+        self.renderer.write(f"Generation: {ext4_inode['i_generation']}")
+        self.renderer.write(f"File ACL: {ext4_inode['i_file_acl_lo']}")
+        self.renderer.write(f"Size High: {ext4_inode['i_size_high']}")
+        self.renderer.write(f"Obsolete Fragment Address: {ext4_inode['i_obso_faddr']}")
+        self.renderer.write(f"Blocks High: {ext4_inode['l_i_blocks_high']}")
+        self.renderer.write(f"File ACL High: {ext4_inode['l_i_file_acl_high']}")
+        self.renderer.write(f"UID High: {ext4_inode['l_i_uid_high']}")
+        self.renderer.write(f"GID High: {ext4_inode['l_i_gid_high']}")
+        self.renderer.write(f"Checksum: {ext4_inode['l_i_checksum_lo']}")
+        self.renderer.write(f"Reserved: {ext4_inode['l_i_reserved']}")
+        self.renderer.write(f"Checksum High: {ext4_inode['l_i_checksum_hi']}")
+        self.renderer.write(f"Extra ISize: {ext4_inode['l_i_extra_isize']}")
+        self.renderer.write(f"CTime Extra: {ext4_inode['l_i_ctime_extra']}")
+        self.renderer.write(f"MTime Extra: {ext4_inode['l_i_mtime_extra']}")
+        self.renderer.write(f"ATime Extra: {ext4_inode['l_i_atime_extra']}")
+        self.renderer.write(f"CRTime: {ext4_inode['l_i_crtime']}")
+        self.renderer.write(f"CRTime Extra: {ext4_inode['l_i_crtime_extra']}")
+        self.renderer.write(f"Version High: {ext4_inode['l_i_version_hi']}")
+        self.renderer.write(f"Project ID: {ext4_inode['l_i_projid']}")
+        self.renderer.write("\n")
+        return inode
         
     def parse_ext4_extenttree(self,offset):
-        self.ext4_extent_header['eh_magic'] = int.from_bytes(self.f[offset+0x00:offset+0x02], byteorder='little')
-        print(f"Magic: {self.ext4_extent_header['eh_magic']}")
-        self.ext4_extent_header['eh_entries'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
-        print(f"Entries: {self.ext4_extent_header['eh_entries']}")
-        self.ext4_extent_header['eh_max'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-        print(f"Max: {self.ext4_extent_header['eh_max']}")
-        self.ext4_extent_header['eh_depth'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-        print(f"Depth: {self.ext4_extent_header['eh_depth']}")
-        self.ext4_extent_header['eh_generation'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Generation: {self.ext4_extent_header['eh_generation']}")
-        offset=offset+0x0C
-        for i in range(0, self.ext4_extent_header['eh_entries'], 1):
-            if self.ext4_extent_header['eh_depth'] == 0:
-                self.ext4_extent['ee_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                self.ext4_extent['ee_len'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-                self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-                self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-                print("\n-----Parsing ext4 extent-----\n")
-                print(f"Block: {self.ext4_extent['ee_block']}")
-                print(f"Length: {self.ext4_extent['ee_len']}")
-                print(f"Start Hi: {self.ext4_extent['ee_start_hi']}")
-                print(f"Start Lo: {self.ext4_extent['ee_start_lo']}")
-                offset=offset+0x0C
-            elif self.ext4_extent_header['eh_depth'] == 1:
-                self.ext4_extent_idx['ei_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                self.ext4_extent_idx['ei_leaf_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                self.ext4_extent_idx['ei_leaf_hi'] = int.from_bytes(self.f[offset+0x08:offset+0x0A], byteorder='little')
-                self.ext4_extent_idx['ei_unused'] = int.from_bytes(self.f[offset+0x0A:offset+0x0C], byteorder='little')
-                print("\n-----Parsing 1D ext4 extent index-----\n")
-                print(f"Block: {self.ext4_extent_idx['ei_block']}")
-                print(f"Leaf Lo: {self.ext4_extent_idx['ei_leaf_lo']}")
-                print(f"Leaf Hi: {self.ext4_extent_idx['ei_leaf_hi']}")
-                print(f"Unused: {self.ext4_extent_idx['ei_unused']}")
-                offset=offset+0x0C
-                self.ext4_parse_extenttree_idx1_pointer(self.ext4_extent_idx['ei_leaf_lo']*4096)
-            elif self.ext4_extent_header['eh_depth'] == 2:
-                self.ext4_extent_idx['ei_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                self.ext4_extent_idx['ei_leaf_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                self.ext4_extent_idx['ei_leaf_hi'] = int.from_bytes(self.f[offset+0x08:offset+0x0A], byteorder='little')
-                self.ext4_extent_idx['ei_unused'] = int.from_bytes(self.f[offset+0x0A:offset+0x0C], byteorder='little')
-                print("\n-----Parsing 2D ext4 extent index-----\n")
-                print(f"Block: {self.ext4_extent_idx['ei_block']}")
-                print(f"Leaf Lo: {self.ext4_extent_idx['ei_leaf_lo']}")
-                print(f"Leaf Hi: {self.ext4_extent_idx['ei_leaf_hi']}")
-                print(f"Unused: {self.ext4_extent_idx['ei_unused']}")
-                offset=offset+0x0C
-                self.ext4_parse_extenttree_idx2_pointer(self.ext4_extent_idx['ei_leaf_lo']*4096)
-            elif self.ext4_extent_header['eh_depth'] == 3:
-                self.ext4_extent_idx['ei_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-                self.ext4_extent_idx['ei_leaf_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-                self.ext4_extent_idx['ei_leaf_hi'] = int.from_bytes(self.f[offset+0x08:offset+0x0A], byteorder='little')
-                self.ext4_extent_idx['ei_unused'] = int.from_bytes(self.f[offset+0x0A:offset+0x0C], byteorder='little')
-                print("\n-----Parsing 3D ext4 extent index-----\n")
-                print(f"Block: {self.ext4_extent_idx['ei_block']}")
-                print(f"Leaf Lo: {self.ext4_extent_idx['ei_leaf_lo']}")
-                print(f"Leaf Hi: {self.ext4_extent_idx['ei_leaf_hi']}")
-                print(f"Unused: {self.ext4_extent_idx['ei_unused']}")
-                offset=offset+0x0C
-                self.ext4_parse_extenttree_idx3_pointer(self.ext4_extent_idx['ei_leaf_lo']*4096)    
-                
-                
-                
-    def ext4_parse_extenttree_idx1_pointer(self,offset):
-        self.ext4_extent_header['eh_magic'] = int.from_bytes(self.f[offset+0x00:offset+0x02], byteorder='little')
-        print(f"Magic: {self.ext4_extent_header['eh_magic']}")
-        self.ext4_extent_header['eh_entries'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
-        print(f"Entries: {self.ext4_extent_header['eh_entries']}")
-        self.ext4_extent_header['eh_max'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-        print(f"Max: {self.ext4_extent_header['eh_max']}")
-        self.ext4_extent_header['eh_depth'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-        print(f"Depth: {self.ext4_extent_header['eh_depth']}")
-        self.ext4_extent_header['eh_generation'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Generation: {self.ext4_extent_header['eh_generation']}")
-        offset=offset+0x0C
-        for i in range(0, self.ext4_extent_header['eh_entries'], 1):
-            self.ext4_extent['ee_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-            self.ext4_extent['ee_len'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-            self.ext4_extent['ee_start_hi'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-            self.ext4_extent['ee_start_lo'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-            print("\n-----Parsing 1D ext4 extent-----\n")
-            print(f"Block: {self.ext4_extent['ee_block']}")
-            print(f"Length: {self.ext4_extent['ee_len']}")
-            print(f"Start Hi: {self.ext4_extent['ee_start_hi']}")
-            print(f"Start Lo: {self.ext4_extent['ee_start_lo']}")
-            offset=offset+0x0C
-    
-    def ext4_parse_extenttree_idx2_pointer(self,offset):
-        self.ext4_extent_header['eh_magic'] = int.from_bytes(self.f[offset+0x00:offset+0x02], byteorder='little')
-        print(f"Magic: {self.ext4_extent_header['eh_magic']}")
-        self.ext4_extent_header['eh_entries'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
-        print(f"Entries: {self.ext4_extent_header['eh_entries']}")
-        self.ext4_extent_header['eh_max'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-        print(f"Max: {self.ext4_extent_header['eh_max']}")
-        self.ext4_extent_header['eh_depth'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-        print(f"Depth: {self.ext4_extent_header['eh_depth']}")
-        self.ext4_extent_header['eh_generation'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Generation: {self.ext4_extent_header['eh_generation']}")
-        offset=offset+0x0C
-        for i in range(0, self.ext4_extent_header['eh_entries'], 1):
-            self.ext4_extent_idx['ei_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-            self.ext4_extent_idx['ei_leaf_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-            self.ext4_extent_idx['ei_leaf_hi'] = int.from_bytes(self.f[offset+0x08:offset+0x0A], byteorder='little')
-            self.ext4_extent_idx['ei_unused'] = int.from_bytes(self.f[offset+0x0A:offset+0x0C], byteorder='little')
-            print("\n-----Parsing 2D ext4 extent index-----\n")
-            print(f"Block: {self.ext4_extent_idx['ei_block']}")
-            print(f"Leaf Lo: {self.ext4_extent_idx['ei_leaf_lo']}")
-            print(f"Leaf Hi: {self.ext4_extent_idx['ei_leaf_hi']}")
-            print(f"Unused: {self.ext4_extent_idx['ei_unused']}")
-            offset=offset+0x0C
-            self.ext4_parse_extenttree_idx1_pointer(self.ext4_extent_idx['ei_leaf_lo']*4096)
-        
-    def ext4_parse_extenttree_idx3_pointer(self,offset):
-        self.ext4_extent_header['eh_magic'] = int.from_bytes(self.f[offset+0x00:offset+0x02], byteorder='little')
-        print(f"Magic: {self.ext4_extent_header['eh_magic']}")
-        self.ext4_extent_header['eh_entries'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
-        print(f"Entries: {self.ext4_extent_header['eh_entries']}")
-        self.ext4_extent_header['eh_max'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-        print(f"Max: {self.ext4_extent_header['eh_max']}")
-        self.ext4_extent_header['eh_depth'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-        print(f"Depth: {self.ext4_extent_header['eh_depth']}")
-        self.ext4_extent_header['eh_generation'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Generation: {self.ext4_extent_header['eh_generation']}")
-        offset=offset+0x0C
-        for i in range(0, self.ext4_extent_header['eh_entries'], 1):
-            self.ext4_extent_idx['ei_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-            self.ext4_extent_idx['ei_leaf_lo'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-            self.ext4_extent_idx['ei_leaf_hi'] = int.from_bytes(self.f[offset+0x08:offset+0x0A], byteorder='little')
-            self.ext4_extent_idx['ei_unused'] = int.from_bytes(self.f[offset+0x0A:offset+0x0C], byteorder='little')
-            print("\n-----Parsing 3D ext4 extent index-----\n")
-            print(f"Block: {self.ext4_extent_idx['ei_block']}")
-            print(f"Leaf Lo: {self.ext4_extent_idx['ei_leaf_lo']}")
-            print(f"Leaf Hi: {self.ext4_extent_idx['ei_leaf_hi']}")
-            print(f"Unused: {self.ext4_extent_idx['ei_unused']}")
-            offset=offset+0x0C
-            self.ext4_parse_extenttree_idx2_pointer(self.ext4_extent_idx['ei_leaf_lo']*4096)        
-        
+        i_block = self.f[offset:offset+EXT4_EXTENT_ROOT_SZ]
+        self.print_ext4_extent_header(EXT4_EXTENT_HEADER_LAYOUT.unpack(i_block))
+        try:
+            for level, header, entry in self.walk_extent_tree(i_block):
+                if entry is None:
+                    if level:
+                        self.print_ext4_extent_header(header)
+                elif header.eh_depth == 0:
+                    if level:
+                        self.renderer.write("\n-----Parsing 1D ext4 extent-----\n")
+                    else:
+                        self.renderer.write("\n-----Parsing ext4 extent-----\n")
+                    self.renderer.write(f"Block: {entry.ee_block}")
+                    self.renderer.write(f"Length: {entry.ee_len}")
+                    self.renderer.write(f"Start Hi: {entry.ee_start_hi}")
+                    self.renderer.write(f"Start Lo: {entry.ee_start_lo}")
+                else:
+                    self.renderer.write(f"\n-----Parsing {header.eh_depth}D ext4 extent index-----\n")
+                    self.renderer.write(f"Block: {entry.ei_block}")
+                    self.renderer.write(f"Leaf Lo: {entry.ei_leaf_lo}")
+                    self.renderer.write(f"Leaf Hi: {entry.ei_leaf_hi}")
+                    self.renderer.write(f"Unused: {entry.ei_unused}")
+        except Ext4CorruptionError:
+            return
+
+    def print_ext4_extent_header(self,header):
+        self.renderer.write(f"Magic: {header.eh_magic}")
+        self.renderer.write(f"Entries: {header.eh_entries}")
+        self.renderer.write(f"Max: {header.eh_max}")
+        self.renderer.write(f"Depth: {header.eh_depth}")
+        self.renderer.write(f"Generation: {header.eh_generation}")
+
     def ext4_parse_xattr(self,offset):
-        self.ext4_xattr_header['xh_magic'] = int.from_bytes(self.f[offset+0x00:offset+0x04], byteorder='little')
-        print(f"Magic: {self.ext4_xattr_header['xh_magic']}")
-        self.ext4_xattr_header['xh_refcount'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-        print(f"Refcount: {self.ext4_xattr_header['xh_refcount']}")
-        self.ext4_xattr_header['xh_blocks'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Blocks: {self.ext4_xattr_header['xh_blocks']}")
-        self.ext4_xattr_header['xh_hash'] = int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-        print(f"Hash: {self.ext4_xattr_header['xh_hash']}")
-        self.ext4_xattr_header['xh_reserved'] = []
+        ext4_xattr_header = {}
+        ext4_xattr_entry = {}
+        ext4_xattr_header['xh_magic'] = int.from_bytes(self.f[offset+0x00:offset+0x04], byteorder='little')
+        self.renderer.write(f"Magic: {ext4_xattr_header['xh_magic']}")
+        ext4_xattr_header['xh_refcount'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
+        self.renderer.write(f"Refcount: {ext4_xattr_header['xh_refcount']}")
+        ext4_xattr_header['xh_blocks'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
+        self.renderer.write(f"Blocks: {ext4_xattr_header['xh_blocks']}")
+        ext4_xattr_header['xh_hash'] = int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
+        self.renderer.write(f"Hash: {ext4_xattr_header['xh_hash']}")
+        ext4_xattr_header['xh_reserved'] = []
         for i in range(4):
-            self.ext4_xattr_header['xh_reserved'].append(int.from_bytes(self.f[offset+0x10+(i*4):offset+0x14+(i*4)], byteorder='little'))
-        print(f"Reserved: {self.ext4_xattr_header['xh_reserved']}")
+            ext4_xattr_header['xh_reserved'].append(int.from_bytes(self.f[offset+0x10+(i*4):offset+0x14+(i*4)], byteorder='little'))
+        self.renderer.write(f"Reserved: {ext4_xattr_header['xh_reserved']}")
         offset=offset+0x20
         offset=offset+16
-        self.ext4_xattr_entry['xe_name_entry'] = int.from_bytes(self.f[offset:offset+0x01], byteorder='little')
-        print(f"Name Entry: {self.ext4_xattr_entry['xe_name_entry']}")
-        self.ext4_xattr_entry['xe_name_index'] = int.from_bytes(self.f[offset+0x01:offset+0x02], byteorder='little')
-        print(f"Name Index: {self.ext4_xattr_entry['xe_name_index']}")
-        self.ext4_xattr_entry['xe_value_offs'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
-        print(f"Value Offset: {self.ext4_xattr_entry['xe_value_offs']}")
-        self.ext4_xattr_entry['xe_value_block'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
-        print(f"Value Block: {self.ext4_xattr_entry['xe_value_block']}")
-        self.ext4_xattr_entry['xe_value_size'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        print(f"Value Size: {self.ext4_xattr_entry['xe_value_size']}")
-        self.ext4_xattr_entry['xe_hash'] = int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-        print(f"Hash: {self.ext4_xattr_entry['xe_hash']}")
-        self.ext4_xattr_entry['xe_name'] = int.from_bytes(self.f[offset+0x10:offset+0x30], byteorder='little')
+        ext4_xattr_entry['xe_name_entry'] = int.from_bytes(self.f[offset:offset+0x01], byteorder='little')
+        self.renderer.write(f"Name Entry: {ext4_xattr_entry['xe_name_entry']}")
+        ext4_xattr_entry['xe_name_index'] = int.from_bytes(self.f[offset+0x01:offset+0x02], byteorder='little')
+        self.renderer.write(f"Name Index: {ext4_xattr_entry['xe_name_index']}")
+        ext4_xattr_entry['xe_value_offs'] = int.from_bytes(self.f[offset+0x02:offset+0x04], byteorder='little')
+        self.renderer.write(f"Value Offset: {ext4_xattr_entry['xe_value_offs']}")
+        ext4_xattr_entry['xe_value_block'] = int.from_bytes(self.f[offset+0x04:offset+0x08], byteorder='little')
+        self.renderer.write(f"Value Block: {ext4_xattr_entry['xe_value_block']}")
+        ext4_xattr_entry['xe_value_size'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
+        self.renderer.write(f"Value Size: {ext4_xattr_entry['xe_value_size']}")
+        ext4_xattr_entry['xe_hash'] = int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
+        self.renderer.write(f"Hash: {ext4_xattr_entry['xe_hash']}")
+        ext4_xattr_entry['xe_name'] = int.from_bytes(self.f[offset+0x10:offset+0x30], byteorder='little')
         try:
             name = self.f[offset+0x10:offset+0x30].decode('utf-8')
-            print(f"Name: {name}")
+            self.renderer.write(f"Name: {name}")
         except:
             name = self.f[offset+0x10:offset+0x30].hex()
-            print(f"Name: {name}")
+            self.renderer.write(f"Name: {name}")
     
     #old parser code       
     # def ext4_parse_direntry(self,inodeoffset):
@@ -1793,178 +4657,364 @@ class Ext4Parser:
     #                     offset=offset+dirent_sz
     #         i=i+dirent_sz
      
-    def ext4_parse_direntry(self,inodeoffset):
+    def ext4_parse_direntry(self,run,inode_flags):
+        ext4_dir_entry_2 = {}
     
         # print("Reached")
-        offset=inodeoffset
-        self.ext4_extent_copy['ee_block'] = int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-        self.ext4_extent_copy['ee_len'] = int.from_bytes(self.f[offset+0x04:offset+0x06], byteorder='little')
-        self.ext4_extent_copy['ee_start_hi'] = int.from_bytes(self.f[offset+0x06:offset+0x08], byteorder='little')
-        self.ext4_extent_copy['ee_start_lo'] = int.from_bytes(self.f[offset+0x08:offset+0x0C], byteorder='little')
-        # print(self.ext4_extent_copy['ee_len'])
-        offset=self.ext4_extent_copy['ee_start_lo']*4096
-        dir_sz = self.ext4_extent_copy['ee_len'] * 4096
+        offset=self.geometry.block_offset(run.physical)
+        dir_sz = run.length * self.geometry.block_size
         # print("\ndirectory size is",dir_sz,"\n")
-        if dir_sz==0: 
+        if dir_sz==0 or run.unwritten: 
             return
         i=0
         while i < dir_sz:
             # print(f"i is {i}")
-            dirent_sz=self.ext4_parse_direntry_internal(offset)
+            dirent_sz=self.ext4_parse_direntry_internal(offset,ext4_dir_entry_2,inode_flags)
             # print(f"Directory Entry Size: {dirent_sz}")
             # print(f"\n{hex(offset)}")
             if int.from_bytes(self.f[offset:offset+0x13], byteorder='little')==0:
                 break
-            if self.ext4_dir_entry_2['name_len']==2 and self.ext4_dir_entry_2['name']=="..":
-                print(f"Inode: {self.ext4_dir_entry_2['inode']}")
-                print(f"Record Length: {self.ext4_dir_entry_2['rec_len']}")
-                print(f"Name Length: {self.ext4_dir_entry_2['name_len']}")
-                print(f"File Type: {self.ext4_dir_entry_2['file_type']}")
-                print(f"Name: {self.ext4_dir_entry_2['name']}")
+            if ext4_dir_entry_2['name_len']==2 and ext4_dir_entry_2['name']=="..":
+                self.renderer.write(f"Inode: {ext4_dir_entry_2['inode']}")
+                self.renderer.write(f"Record Length: {ext4_dir_entry_2['rec_len']}")
+                self.renderer.write(f"Name Length: {ext4_dir_entry_2['name_len']}")
+                self.renderer.write(f"File Type: {ext4_dir_entry_2['file_type']}")
+                self.renderer.write(f"Name: {ext4_dir_entry_2['name']}")
                 offset=offset+8
                 i=i+8
                 continue
-            if self.ext4_dir_entry_2['inode'] == 0 and self.ext4_dir_entry_2['rec_len'] > 263 and self.ext4_dir_entry_2['name_len']==0:
+            if ext4_dir_entry_2['inode'] == 0 and ext4_dir_entry_2['rec_len'] > 263 and ext4_dir_entry_2['name_len']==0:
                 offset=offset+4
                 i=i+4
                 continue
-            # if self.ext4_dir_entry_2['inode'] == 0 and self.ext4_dir_entry_2['rec_len'] ==0 and self.ext4_dir_entry_2['name_len']==0 and self.ext4_dir_entry_2['file_type']==0:
+            # if ext4_dir_entry_2['inode'] == 0 and ext4_dir_entry_2['rec_len'] ==0 and ext4_dir_entry_2['name_len']==0 and ext4_dir_entry_2['file_type']==0:
             #     offset=offset+0x04
             #     i=i+0x04
             #     continue
-            if self.ext4_dir_entry_2['inode'] > self.maxinode and self.ext4_dir_entry_2['rec_len'] ==0 and self.ext4_dir_entry_2['name_len']==0:
+            if ext4_dir_entry_2['inode'] > self.maxinode and ext4_dir_entry_2['rec_len'] ==0 and ext4_dir_entry_2['name_len']==0:
                 offset=offset+4
                 i=i+4
                 continue 
-            if self.ext4_dir_entry_2['inode'] == 0 and self.ext4_dir_entry_2['rec_len'] ==12 and self.ext4_dir_entry_2['name_len']==0:
+            if ext4_dir_entry_2['inode'] == 0 and ext4_dir_entry_2['rec_len'] ==12 and ext4_dir_entry_2['name_len']==0:
                 offset=offset+0x0c
                 i=i+0x0c
                 continue
-            if self.ext4_dir_entry_2['rec_len'] > 263 and self.ext4_dir_entry_2['inode'] < self.ext4_superblock['sb_first_ino'] and self.ext4_dir_entry_2['inode']>0:
+            if ext4_dir_entry_2['rec_len'] > 263 and ext4_dir_entry_2['inode'] < self.ext4_superblock['sb_first_ino'] and ext4_dir_entry_2['inode']>0:
                 offset=offset+0x08
                 i=i+0x08
                 continue
-            if self.ext4_dir_entry_2['file_type'] == 0:
+            if ext4_dir_entry_2['file_type'] == 0:
                 offset=offset+8
                 i=i+8
                 continue
-            if self.ext4_dir_entry_2['name_len'] == 0 and self.ext4_dir_entry_2['inode'] != 0:
+            if ext4_dir_entry_2['name_len'] == 0 and ext4_dir_entry_2['inode'] != 0:
                 offset=offset+0x08
                 i=i+0x08
                 continue
-            if self.ext4_dir_entry_2['rec_len'] > 263 and self.ext4_dir_entry_2['name_len']==0:
+            if ext4_dir_entry_2['rec_len'] > 263 and ext4_dir_entry_2['name_len']==0:
                 offset=offset+0x08
                 i=i+0x08
                 continue
-            if self.ext4_dir_entry_2['inode'] > self.maxinode:
+            if ext4_dir_entry_2['inode'] > self.maxinode:
                 offset=offset+4
                 i=i+4
                 continue
             if dirent_sz==0:
                 break                
-            if self.ext4_dir_entry_2['rec_len']!=0 and self.ext4_dir_entry_2['name_len']!=0:
+            if ext4_dir_entry_2['rec_len']!=0 and ext4_dir_entry_2['name_len']!=0:
                self.ext4_parse_linear_dir_entry_info(offset)
                offset=offset+dirent_sz
             i=i+dirent_sz     
      
     def ext4_parse_linear_dir_entry_info(self,offset):
-        self.ext4_dir_entry_2['inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-        print(f"Inode: {self.ext4_dir_entry_2['inode']}")
-        self.ext4_dir_entry_2['rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
-        print(f"Record Length: {self.ext4_dir_entry_2['rec_len']}")
-        self.ext4_dir_entry_2['name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
-        print(f"Name Length: {self.ext4_dir_entry_2['name_len']}")
-        self.ext4_dir_entry_2['file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
-        print(f"File Type: {self.ext4_dir_entry_2['file_type']}")
+        ext4_dir_entry_2 = {}
+        ext4_dir_entry_2['inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
+        self.renderer.write(f"Inode: {ext4_dir_entry_2['inode']}")
+        ext4_dir_entry_2['rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
+        self.renderer.write(f"Record Length: {ext4_dir_entry_2['rec_len']}")
+        ext4_dir_entry_2['name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
+        self.renderer.write(f"Name Length: {ext4_dir_entry_2['name_len']}")
+        ext4_dir_entry_2['file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
+        self.renderer.write(f"File Type: {ext4_dir_entry_2['file_type']}")
         try:
-            name = self.f[offset+0x08:offset+0x08+self.ext4_dir_entry_2['name_len']].decode('utf-8')
-            print(f"Name: {name}")
+            name = self.f[offset+0x08:offset+0x08+ext4_dir_entry_2['name_len']].decode('utf-8')
+            self.renderer.write(f"Name: {name}")
         except:
-            name = self.f[offset+0x08:offset+0x08+self.ext4_dir_entry_2['name_len']].hex()
-            print(f"Name: {name}")
-        return (offset+self.ext4_dir_entry_2['rec_len'])
+            name = self.f[offset+0x08:offset+0x08+ext4_dir_entry_2['name_len']].hex()
+            self.renderer.write(f"Name: {name}")
+        return (offset+ext4_dir_entry_2['rec_len'])
         
      
         
-    def ext4_parse_direntry_internal(self,offset):
+    def ext4_parse_direntry_internal(self,offset,ext4_dir_entry_2,inode_flags):
+        dx_root = {}
         rec_len=0
-        if (self.ext4_inode['i_flags'] & EXT4_INODE_FLAGS['EXT4_INDEX_FL'])&1 == 1: #check for hashed entries
-            self.dx_root['dot_inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-            # print(f"Inode: {self.dx_root['dot_inode']}")
-            self.dx_root['dot_rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
-            # print(f"Record Length: {self.dx_root['dot_rec_len']}")
-            rec_len=self.dx_root['dot_rec_len']
-            self.dx_root['dot_name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
-            # print(f"Name Length: {self.dx_root['dot_name_len']}")
-            self.dx_root['dot_file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
-            # print(f"File Type: {self.dx_root['dot_file_type']}")
-            self.dx_root['dot_name']=self.f[offset+0x08:offset+0x0C].hex()
-            # print(f"Name: {self.dx_root['dot_name']}")
-            self.dx_root['dot_dot_inode']=int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
-            # print(f"Inode: {self.dx_root['dot_dot_inode']}")
-            self.dx_root['dot_dot_rec_len']=int.from_bytes(self.f[offset+0x10:offset+0x12],byteorder='little')
-            # print(f"Record Length: {self.dx_root['dot_dot_rec_len']}")
-            rec_len=self.dx_root['dot_dot_rec_len']
-            self.dx_root['dot_dot_name_len']=int.from_bytes(self.f[offset+0x12:offset+0x13],byteorder='little')
-            # print(f"Name Length: {self.dx_root['dot_dot_name_len']}")
-            self.dx_root['dot_dot_file_type']=int.from_bytes(self.f[offset+0x13:offset+0x14],byteorder='little')
-            # print(f"File Type: {self.dx_root['dot_dot_file_type']}")
-            self.dx_root['dot_dot_name']=self.f[offset+0x14:offset+0x18].hex()
-            # print(f"Name: {self.dx_root['dot_dot_name']}")
-            self.dx_root['reserved_zero']=int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
-            # print(f"Reserved Zero: {self.dx_root['reserved_zero']}")
-            self.dx_root['hash_version']=int.from_bytes(self.f[offset+0x1C:offset+0x1D], byteorder='little')
-            # print(f"Hash Version: {self.dx_root['hash_version']}")
-            self.dx_root['info_length']=int.from_bytes(self.f[offset+0x1D:offset+0x1E], byteorder='little')
-            # print(f"Info Length: {self.dx_root['info_length']}")  
-            self.dx_root['indirect_levels']=int.from_bytes(self.f[offset+0x1E:offset+0x1F], byteorder='little')
-            # print(f"Indirect Levels: {self.dx_root['indirect_levels']}")
-            self.dx_root['unused_flags']=int.from_bytes(self.f[offset+0x1F:offset+0x20], byteorder='little')
-            # print(f"Unused Flags: {self.dx_root['unused_flags']}")
-            self.dx_root['limit']=int.from_bytes(self.f[offset+0x20:offset+0x22], byteorder='little')
-            # print(f"Limit: {self.dx_root['limit']}")
-            self.dx_root['count']=int.from_bytes(self.f[offset+0x22:offset+0x24], byteorder='little')
-            # print(f"Count: {self.dx_root['count']}")
-            self.dx_root['block']=int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
-            # print(f"Block: {self.dx_root['block']}")
-            return self.dx_root['count']
+        if (inode_flags & EXT4_INODE_FLAGS['EXT4_INDEX_FL'])&1 == 1: #check for hashed entries
+            dx_root['dot_inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
+            # print(f"Inode: {dx_root['dot_inode']}")
+            dx_root['dot_rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
+            # print(f"Record Length: {dx_root['dot_rec_len']}")
+            rec_len=dx_root['dot_rec_len']
+            dx_root['dot_name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')
+            # print(f"Name Length: {dx_root['dot_name_len']}")
+            dx_root['dot_file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
+            # print(f"File Type: {dx_root['dot_file_type']}")
+            dx_root['dot_name']=self.f[offset+0x08:offset+0x0C].hex()
+            # print(f"Name: {dx_root['dot_name']}")
+            dx_root['dot_dot_inode']=int.from_bytes(self.f[offset+0x0C:offset+0x10], byteorder='little')
+            # print(f"Inode: {dx_root['dot_dot_inode']}")
+            dx_root['dot_dot_rec_len']=int.from_bytes(self.f[offset+0x10:offset+0x12],byteorder='little')
+            # print(f"Record Length: {dx_root['dot_dot_rec_len']}")
+            rec_len=dx_root['dot_dot_rec_len']
+            dx_root['dot_dot_name_len']=int.from_bytes(self.f[offset+0x12:offset+0x13],byteorder='little')
+            # print(f"Name Length: {dx_root['dot_dot_name_len']}")
+            dx_root['dot_dot_file_type']=int.from_bytes(self.f[offset+0x13:offset+0x14],byteorder='little')
+            # print(f"File Type: {dx_root['dot_dot_file_type']}")
+            dx_root['dot_dot_name']=self.f[offset+0x14:offset+0x18].hex()
+            # print(f"Name: {dx_root['dot_dot_name']}")
+            dx_root['reserved_zero']=int.from_bytes(self.f[offset+0x18:offset+0x1C], byteorder='little')
+            # print(f"Reserved Zero: {dx_root['reserved_zero']}")
+            dx_root['hash_version']=int.from_bytes(self.f[offset+0x1C:offset+0x1D], byteorder='little')
+            # print(f"Hash Version: {dx_root['hash_version']}")
+            dx_root['info_length']=int.from_bytes(self.f[offset+0x1D:offset+0x1E], byteorder='little')
+            # print(f"Info Length: {dx_root['info_length']}")  
+            dx_root['indirect_levels']=int.from_bytes(self.f[offset+0x1E:offset+0x1F], byteorder='little')
+            # print(f"Indirect Levels: {dx_root['indirect_levels']}")
+            dx_root['unused_flags']=int.from_bytes(self.f[offset+0x1F:offset+0x20], byteorder='little')
+            # print(f"Unused Flags: {dx_root['unused_flags']}")
+            dx_root['limit']=int.from_bytes(self.f[offset+0x20:offset+0x22], byteorder='little')
+            # print(f"Limit: {dx_root['limit']}")
+            dx_root['count']=int.from_bytes(self.f[offset+0x22:offset+0x24], byteorder='little')
+            # print(f"Count: {dx_root['count']}")
+            dx_root['block']=int.from_bytes(self.f[offset+0x24:offset+0x28], byteorder='little')
+            # print(f"Block: {dx_root['block']}")
+            return dx_root['count']
             
         else:
-            self.ext4_dir_entry_2['inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
-            # print(f"Inode: {self.ext4_dir_entry_2['inode']}")
-            self.ext4_dir_entry_2['rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
-            # print(f"Record Length: {self.ext4_dir_entry_2['rec_len']}")
-            rec_len=self.ext4_dir_entry_2['rec_len']
-            self.ext4_dir_entry_2['name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')    
-            # print(f"Name Length: {self.ext4_dir_entry_2['name_len']}")
-            self.ext4_dir_entry_2['file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
-            # print(f"File Type: {self.ext4_dir_entry_2['file_type']}")
+            ext4_dir_entry_2['inode']=int.from_bytes(self.f[offset:offset+0x04], byteorder='little')
+            # print(f"Inode: {ext4_dir_entry_2['inode']}")
+            ext4_dir_entry_2['rec_len']=int.from_bytes(self.f[offset+0x04:offset+0x06],byteorder='little')
+            # print(f"Record Length: {ext4_dir_entry_2['rec_len']}")
+            rec_len=ext4_dir_entry_2['rec_len']
+            ext4_dir_entry_2['name_len']=int.from_bytes(self.f[offset+0x06:offset+0x07],byteorder='little')    
+            # print(f"Name Length: {ext4_dir_entry_2['name_len']}")
+            ext4_dir_entry_2['file_type']=int.from_bytes(self.f[offset+0x07:offset+0x08],byteorder='little')
+            # print(f"File Type: {ext4_dir_entry_2['file_type']}")
             offset=offset+0x08
-            rec_len=self.ext4_dir_entry_2['name_len']+0x08
+            rec_len=ext4_dir_entry_2['name_len']+0x08
             for i in range(4, rec_len, 4):
                 if i < rec_len and i+4 >= rec_len:
                     rec_len=i+4
                     break
-                    # print(f"Name: {self.ext4_dir_entry_2['name']}")
+                    # print(f"Name: {ext4_dir_entry_2['name']}")
             try:
-                self.ext4_dir_entry_2['name'] = self.f[offset:offset+self.ext4_dir_entry_2['name_len']].decode('utf-8')
+                ext4_dir_entry_2['name'] = self.f[offset:offset+ext4_dir_entry_2['name_len']].decode('utf-8')
             except:
-                self.ext4_dir_entry_2['name'] = self.f[offset:offset+self.ext4_dir_entry_2['name_len']].hex()
+                ext4_dir_entry_2['name'] = self.f[offset:offset+ext4_dir_entry_2['name_len']].hex()
             return rec_len
         
-def ext4parser(filepath):
-    ext4 = Ext4Parser(filepath)
-    ext4.parse_ext4()
+# Extraction targets
+def ext4_extract_target(root, relative):
+    # absolute path of an image entry below the resolved directory root, None
+    # when it would end up elsewhere through '..' or an existing symlink
+    relative = os.path.normpath(relative)
+    if os.path.isabs(relative) or relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return None
+    target = os.path.normpath(os.path.join(root, relative))
+    if os.path.realpath(target) != target:
+        return None
+    return target
+
+def ext4_extract_create(target):
+    # new file for extracted data, never through a symlink or over a file
+    # created earlier in the same extraction
+    return os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o666)
+
+# Parallel block group scan, one parser per worker process
+EXT4_SCAN_WORKER = None
+
+def ext4_scan_worker_init(filepath, backend, sweep_unallocated=False, group_table=None, partition=None, cache_size=None):
+    global EXT4_SCAN_WORKER
+    EXT4_SCAN_WORKER = Ext4Parser(filepath, backend, Ext4TextRenderer(), partition, cache_size)
+    EXT4_SCAN_WORKER.sweep_unallocated = sweep_unallocated
+    EXT4_SCAN_WORKER.read_ext4_superblock()
+    # the parent already decoded the descriptors, no need to do it per worker
+    EXT4_SCAN_WORKER.ext4_group_table = group_table
+
+def ext4_scan_worker_group(group_num):
+    ext4 = EXT4_SCAN_WORKER
+    output = io.StringIO()
+    with redirect_stdout(output):
+        ext4.parse_ext4_inode_table(ext4.ext4_inode_table_offset(group_num), group_num)
+    return output.getvalue()
+
+def ext4_scan_partition_worker(task):
+    # whole scan of one partition, written to a temporary file so the parent
+    # can stream the partitions out in order without holding them in memory
+    filepath, backend, partition, sweep_unallocated, cache_size = task
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8', errors='surrogateescape') as out:
+        ext4 = Ext4Parser(filepath, backend, Ext4TextRenderer(), partition, cache_size)
+        ext4.sweep_unallocated = sweep_unallocated
+        with redirect_stdout(out):
+            ext4.parse_ext4()
+        ext4.close()
+    return out.name
+
+def ext4_select_partition(filepath, backend, spec):
+    # partition record for a --partition number
+    with open_ext4_image(filepath, backend) as image:
+        partitions = ext4_partitions(image)
+    for partition in partitions:
+        if str(partition.index) == spec:
+            if not partition.is_ext4:
+                raise ValueError(f"partition {spec} holds no ext4 filesystem")
+            return partition
+    raise ValueError(f"no partition {spec}, --list-partitions shows {', '.join(str(partition.index) for partition in partitions)}")
+
+def ext4partitions(filepath, backend=None):
+    with open_ext4_image(filepath, backend) as image:
+        partitions = ext4_partitions(image)
+    console.print("[bold green]File opened successfully![/bold green]")
+    for partition in partitions:
+        kind = "[bold green]ext4[/bold green]" if partition.is_ext4 else "-"
+        console.print(f"{partition.index:>3} {partition.scheme:<4} {partition.offset:>16} {partition.size:>16} {kind:<4} {partition.type} {partition.name}")
+
+def ext4scanpartitions(filepath, backend=None, jobs=1, sweep_unallocated=False, cache_size=None):
+    # every ext4 partition of a disk image, jobs partitions scanned at once
+    with open_ext4_image(filepath, backend) as image:
+        partitions = [partition for partition in ext4_partitions(image) if partition.is_ext4]
+    console.print("[bold green]File opened successfully![/bold green]")
+    tasks = [(filepath, backend, partition, sweep_unallocated, cache_size) for partition in partitions]
+    with multiprocessing.Pool(max(1, jobs)) as pool:
+        for partition, path in zip(partitions, pool.imap(ext4_scan_partition_worker, tasks)):
+            print(f"\n\nPartition {partition.index} ({partition.name or partition.type}) at byte {partition.offset}:\n")
+            with open(path, encoding='utf-8', errors='surrogateescape') as output:
+                shutil.copyfileobj(output, sys.stdout)
+            os.remove(path)
+
+def ext4parser(filepath, backend=None, jobs=1, sweep_unallocated=False, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, Ext4TextRenderer(), partition, cache_size)
+    ext4.sweep_unallocated = sweep_unallocated
+    console.print("[bold green]File opened successfully![/bold green]")
+    ext4.parse_ext4(jobs)
+    ext4.close()
+
+def ext4export(filepath, path, table='inodes', fmt=None, backend=None, index=None, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, partition=partition, cache_size=cache_size)
+    console.print("[bold green]File opened successfully![/bold green]")
+    with open_ext4_export_sink(path, table, fmt) as sink:
+        if index is not None and table in EXT4_INDEX_TABLES:
+            with ext4.index(index or None) as cached:
+                cached.export(sink)
+        else:
+            ext4.export(sink)
+    console.print(f"[bold green]Exported {sink.count} {table} records to {path}[/bold green]")
+    ext4.close()
+
+def ext4timeline(filepath, path, fmt=None, backend=None, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, partition=partition, cache_size=cache_size)
+    console.print("[bold green]File opened successfully![/bold green]")
+    count = ext4.write_timeline(path, fmt)
+    console.print(f"[bold green]Wrote {count} timeline rows to {path}[/bold green]")
+    ext4.close()
+
+def ext4index(filepath, path, backend=None, rebuild=False, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, partition=partition, cache_size=cache_size)
+    console.print("[bold green]File opened successfully![/bold green]")
+    start = time.time()
+    with ext4.index(path or None, rebuild) as index:
+        counts = {table: index.query(f"SELECT COUNT(*) FROM {table}")[0][0] for table in EXT4_INDEX_TABLES}
+    console.print(f"[bold green]Index {index.path} ready in {time.time()-start:.2f}s: {', '.join(f'{count} {table}' for table, count in counts.items())}[/bold green]")
+    ext4.close()
+
+def ext4extract(filepath, path, dest, backend=None, jobs=EXT4_EXTRACT_WORKERS, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, partition=partition, cache_size=cache_size)
+    console.print("[bold green]File opened successfully![/bold green]")
+    ino = ext4.lookup(path)
+    if ino is not None and (ext4.inode(ino).i_mode & 0xF000) == EXT4_INODE_MODE['S_IFDIR']:
+        files, size = ext4.extract_tree(path, dest, jobs)
+        console.print(f"[bold green]Extracted {files} files ({size} bytes) of {path} to {dest}[/bold green]")
+    else:
+        size = ext4.extract(path, dest)
+        console.print(f"[bold green]Extracted {size} bytes of {path} to {dest}[/bold green]")
+    ext4.close()
+
+def ext4journal(filepath, backend=None, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, partition=partition, cache_size=cache_size)
+    console.print("[bold green]File opened successfully![/bold green]")
+    jsb = ext4.journal_superblock()
+    console.print(f"Journal: {jsb.s_maxlen} blocks of {jsb.s_blocksize} bytes, log starts at block {jsb.s_start}, sequence {jsb.s_sequence}")
+    for transaction in ext4.iter_journal():
+        console.print(f"Transaction {transaction.tid} at journal block {transaction.start}: {len(transaction.tags)} blocks logged, {len(transaction.revoked)} revoked, committed at {transaction.commit_sec}.{transaction.commit_nsec:09d}")
+    ext4.close()
+
+def ext4verify(filepath, backend=None, deep=False, partition=None, cache_size=None):
+    ext4 = Ext4Parser(filepath, backend, partition=partition, cache_size=cache_size)
+    console.print("[bold green]File opened successfully![/bold green]")
+    if ext4.ext4_checksum_seed() is None:
+        console.print("[bold yellow]metadata_csum is not enabled, only group descriptor checksums can be verified[/bold yellow]")
+    count = 0
+    for mismatch in ext4.verify(deep):
+        if mismatch.detail is not None:
+            console.print(f"[bold red]{mismatch.kind} {mismatch.location}: {mismatch.detail}[/bold red]")
+        else:
+            console.print(f"[bold red]{mismatch.kind} {mismatch.location}: stored {mismatch.stored:#010x}, computed {mismatch.computed:#010x}[/bold red]")
+        count += 1
+    console.print(f"[bold green]{count} checksum mismatches[/bold green]")
+    ext4.close()
 
 console = Console()    
-banner()
-argparse = ArgumentParser(description=__doc__)
-argparse.add_argument("extpart", metavar="EXT4 partition")
-args = argparse.parse_args()
-filename = args.extpart
-filepath = Path.cwd() / filename
-if filepath.exists():
-    console.print("\n[bold cyan]Start of Parsing...[/bold cyan]\n")
-else:
-    print(f"\nFile '{filepath}' not found. Please check the file path.\n")
-finalstatus = ext4parser(filepath)
\ No newline at end of file
+if __name__ == "__main__":
+    banner()
+    argparse = ArgumentParser(description=__doc__)
+    argparse.add_argument("extpart", metavar="EXT4 partition")
+    argparse.add_argument("--backend", choices=sorted(EXT4_IMAGE_BACKENDS), help="how the image is accessed (default: http for URLs, sparse / zstd / gzip from the file header, mmap otherwise)")
+    argparse.add_argument("--gzip-index", metavar="PATH", help="where the seek index of a gzip image is kept, implies the gzip backend (default: a file under ~/.cache/ext4parser)")
+    argparse.add_argument("--cache-size", type=int, metavar="MIB", default=EXT4_BLOCK_CACHE_BYTES >> 20, help="block cache budget in MiB for the backends that are not memory mapped, 0 disables it (default: %(default)s)")
+    argparse.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes scanning block groups, or writer threads for --extract (default: 1)")
+    argparse.add_argument("--sweep-unallocated", action="store_true", help="also decode inode slots the inode bitmap marks free, to recover deleted inodes")
+    argparse.add_argument("--export", metavar="PATH", help="stream records to PATH instead of printing them")
+    argparse.add_argument("--export-table", default="inodes", choices=sorted(EXT4_EXPORT_COLUMNS), help="records to export (default: inodes)")
+    argparse.add_argument("--export-format", choices=sorted(EXT4_EXPORT_SINKS), help="export format (default: from the file suffix, else jsonl)")
+    argparse.add_argument("--timeline", metavar="PATH", help="write a MAC-B timeline of all allocated inodes to PATH")
+    argparse.add_argument("--timeline-format", choices=sorted(EXT4_TIMELINE_WRITERS), help="timeline format (default: from the file suffix, else csv)")
+    argparse.add_argument("--index", nargs="?", const="", metavar="PATH", help="keep a metadata index of the image, rebuilt only when the image changes; --export is then answered from it (default: a file under ~/.cache/ext4parser named after the image fingerprint)")
+    argparse.add_argument("--rebuild-index", action="store_true", help="with --index, rebuild the index even if it is up to date")
+    argparse.add_argument("--verify", action="store_true", help="verify the superblock, group descriptor and inode checksums")
+    argparse.add_argument("--deep", action="store_true", help="with --verify, also verify extent, directory and xattr blocks")
+    argparse.add_argument("--journal", action="store_true", help="list the committed transactions found in the jbd2 journal")
+    argparse.add_argument("--list-partitions", action="store_true", help="list the MBR/GPT partitions of a disk image and which hold ext4")
+    argparse.add_argument("--partition", metavar="N", help="work on partition N of a disk image, 'all' scans every ext4 partition (-j at once)")
+    argparse.add_argument("--extract", nargs=2, metavar=("PATH", "DEST"), help="copy the file at PATH inside the image to DEST, a directory is copied with everything below it")
+    args = argparse.parse_args()
+    cache_size = max(0, args.cache_size) << 20
+    backend = args.backend
+    if args.gzip_index:
+        backend = functools.partial(GzipImage, index_path=args.gzip_index)
+    filename = args.extpart
+    filepath = filename if ext4_is_url(filename) else Path.cwd() / filename
+    if ext4_is_url(filepath) or filepath.exists():
+        console.print("\n[bold cyan]Start of Parsing...[/bold cyan]\n")
+    else:
+        print(f"\nFile '{filepath}' not found. Please check the file path.\n")
+    partition = None
+    if args.partition is not None and args.partition != 'all':
+        partition = ext4_select_partition(filepath, backend, args.partition)
+    if args.list_partitions:
+        finalstatus = ext4partitions(filepath, backend)
+    elif args.verify:
+        finalstatus = ext4verify(filepath, backend, args.deep, partition, cache_size)
+    elif args.journal:
+        finalstatus = ext4journal(filepath, backend, partition, cache_size)
+    elif args.extract:
+        finalstatus = ext4extract(filepath, args.extract[0], args.extract[1], backend, args.jobs, partition, cache_size)
+    elif args.timeline:
+        finalstatus = ext4timeline(filepath, args.timeline, args.timeline_format, backend, partition, cache_size)
+    elif args.export:
+        finalstatus = ext4export(filepath, args.export, args.export_table, args.export_format, backend, args.index, partition, cache_size)
+    elif args.index is not None:
+        finalstatus = ext4index(filepath, args.index, backend, args.rebuild_index, partition, cache_size)
+    elif args.partition == 'all':
+        finalstatus = ext4scanpartitions(filepath, backend, args.jobs, args.sweep_unallocated, cache_size)
+    else:
+        finalstatus = ext4parser(filepath, backend, args.jobs, args.sweep_unallocated, partition, cache_size)
\ No newline at end of file
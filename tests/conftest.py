@@ -0,0 +1,111 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PARSER_PATH = Path(__file__).resolve().parent.parent / "Azr43l-Ext4parser.py"
+
+# contents of the sample filesystem, see sample_tree()
+SAMPLE_TEXT = b"hello world\n"
+SAMPLE_MANY_FILES = 400
+
+
+@pytest.fixture(scope="session")
+def ext4():
+    # the script name is not importable, load it under a module name that
+    # multiprocessing can pickle workers from
+    if "ext4parser" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("ext4parser", PARSER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["ext4parser"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["ext4parser"]
+
+
+def need_tool(name):
+    if shutil.which(name) is None:
+        pytest.skip(f"{name} (e2fsprogs) is not installed")
+
+
+def make_image(path, size="8M", options=(), source=None):
+    need_tool("mkfs.ext4")
+    command = ["mkfs.ext4", "-q", "-F", *options]
+    if source is not None:
+        command += ["-d", str(source)]
+    subprocess.run(command + [str(path), size], check=True, env={**os.environ, "E2FSPROGS_FAKE_TIME": "1700000000"})
+    return path
+
+
+def run_debugfs(path, *commands, writable=True):
+    need_tool("debugfs")
+    result = subprocess.run(["debugfs", *(["-w"] if writable else []), "-f", "-", str(path)], input="\n".join(commands) + "\n", capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def index_directories(path):
+    # e2fsck -D rebuilds every directory, the big ones as htrees hashed the
+    # way the superblock says
+    need_tool("e2fsck")
+    result = subprocess.run(["e2fsck", "-f", "-y", "-D", str(path)], capture_output=True, text=True)
+    # 1: errors corrected, which the rebuild counts as
+    assert result.returncode in (0, 1), result.stdout
+    return path
+
+
+def sample_tree(root):
+    # a bit of everything: small and multi-block files, a sparse file, nested
+    # directories, fast and slow symlinks and a directory big enough for an htree
+    root.mkdir()
+    (root / "hello.txt").write_bytes(SAMPLE_TEXT)
+    (root / "big.bin").write_bytes(os.urandom(300 * 1024))
+    with open(root / "sparse.bin", "wb") as f:
+        f.seek(1 << 20)
+        f.write(b"tail")
+    (root / "sub" / "nested").mkdir(parents=True)
+    (root / "sub" / "nested" / "deep.txt").write_bytes(b"deep\n" * 1000)
+    (root / "sub" / "empty").touch()
+    os.symlink("hello.txt", root / "link")
+    os.symlink("sub/nested/" + "x" * 80, root / "longlink")
+    (root / "many").mkdir()
+    for number in range(SAMPLE_MANY_FILES):
+        (root / "many" / f"file-{number:04d}-{'n' * (number % 40)}").write_bytes(b"%d\n" % number)
+    # high bit bytes hash differently with signed and unsigned chars
+    for number in range(SAMPLE_MANY_FILES // 4):
+        (root / "many" / f"\u00fc-{number}-\u00e9t\u00e9").write_bytes(b"")
+    return root
+
+
+@pytest.fixture(scope="session")
+def sample(tmp_path_factory):
+    # (image, source tree) of a populated 4 KiB block filesystem, shared by
+    # every test that only reads it
+    base = tmp_path_factory.mktemp("sample")
+    source = sample_tree(base / "source")
+    image = index_directories(make_image(base / "sample.img", "16M", ["-b", "4096"], source))
+    return image, source
+
+
+@pytest.fixture
+def sample_copy(sample, tmp_path):
+    # the sample image for tests that corrupt or extend it
+    path = tmp_path / "sample.img"
+    shutil.copyfile(sample[0], path)
+    return path
+
+
+@pytest.fixture
+def mkfs(tmp_path):
+    # small ext4 images built with mkfs.ext4, optionally filled from a directory
+    def build(name="fs.img", size="8M", options=(), source=None):
+        return make_image(tmp_path / name, size, options, source)
+    return build
+
+
+@pytest.fixture
+def debugfs():
+    # runs debugfs commands against an image, writable
+    return run_debugfs
@@ -0,0 +1,277 @@
+import functools
+import gzip
+import json
+import os
+import struct
+import zlib
+
+import pytest
+
+from conftest import SAMPLE_TEXT
+
+
+def check_filesystem(ext4, image, source, **options):
+    # the sample read through some backend reads like the raw image
+    parser = ext4.Ext4Parser(str(image), **options)
+    assert parser.superblock().sb_magic == ext4.EXT4_SUPER_MAGIC
+    with parser.open(parser.lookup("/hello.txt")) as src:
+        assert src.read() == SAMPLE_TEXT
+    with parser.open(parser.lookup("/big.bin")) as src:
+        assert src.read() == (source / "big.bin").read_bytes()
+    assert parser.lookup("/many/file-0123-" + "n" * (123 % 40)) is not None
+    assert list(parser.verify()) == []
+    return parser
+
+
+def write_simg(raw, path, block_size=4096):
+    # Android sparse image: runs of data blocks as RAW, repeated words as
+    # FILL, zero blocks alternately as DONT_CARE and zero FILL, a CRC32 last
+    data = raw.read_bytes()
+    chunks = []
+    for number in range(len(data) // block_size):
+        block = data[number*block_size:(number+1)*block_size]
+        if block == bytes(block_size):
+            kind = ('zero', None)
+        elif block[:4] * (block_size // 4) == block:
+            kind = ('fill', block[:4])
+        else:
+            kind = ('raw', None)
+        if chunks and chunks[-1][:2] == kind and chunks[-1][3] < 64:
+            chunks[-1][3] += 1
+        else:
+            chunks.append([*kind, number, 1])
+    body = bytearray()
+    for number, (kind, pattern, start, count) in enumerate(chunks):
+        if kind == 'raw':
+            body += struct.pack('<HHII', 0xCAC1, 0, count, 12 + count*block_size) + data[start*block_size:(start+count)*block_size]
+        elif kind == 'fill':
+            body += struct.pack('<HHII', 0xCAC2, 0, count, 16) + pattern
+        elif number % 2:
+            body += struct.pack('<HHII', 0xCAC3, 0, count, 12)
+        else:
+            body += struct.pack('<HHII', 0xCAC2, 0, count, 16) + bytes(4)
+    body += struct.pack('<HHII', 0xCAC4, 0, 0, 16) + struct.pack('<I', zlib.crc32(data))
+    path.write_bytes(struct.pack('<IHHHHIIII', 0xED26FF3A, 1, 0, 28, 12, block_size, len(data) // block_size, len(chunks) + 1, 0) + body)
+    return path
+
+
+def write_seekable_zstd(zstandard, raw, path, frame_size=1 << 20):
+    # zstd seekable format: independent frames, then the seek table in a
+    # skippable frame
+    compressor = zstandard.ZstdCompressor(level=1)
+    data = raw.read_bytes()
+    entries = []
+    with open(path, "wb") as out:
+        for start in range(0, len(data), frame_size):
+            frame = compressor.compress(data[start:start+frame_size])
+            out.write(frame)
+            entries.append(struct.pack('<III', len(frame), len(data[start:start+frame_size]), 0))
+        table = b''.join(entries) + struct.pack('<IBI', len(entries), 0x80, 0x8F92EAB1)
+        out.write(struct.pack('<II', 0x184D2A5E, len(table)) + table)
+    return path
+
+
+def write_gzip_members(raw, path, member_size):
+    # concatenated gzip members like bgzip or pigz --independent write
+    data = raw.read_bytes()
+    with open(path, "wb") as out:
+        for start in range(0, len(data), member_size):
+            out.write(gzip.compress(data[start:start+member_size], compresslevel=1))
+    return path
+
+
+def test_backend_selection(ext4, sample, tmp_path):
+    image, _ = sample
+    with ext4.open_ext4_image(str(image)) as opened:
+        assert isinstance(opened, ext4.MmapImage)
+    # a named backend is used as is
+    for name, backend in (('pread', ext4.FileImage), ('memory', ext4.MemoryImage), ('mmap', ext4.MmapImage)):
+        with ext4.open_ext4_image(str(image), name) as opened:
+            assert isinstance(opened, backend)
+    with pytest.raises(ValueError, match="Unknown image backend"):
+        ext4.open_ext4_image(str(image), 'tape')
+    with pytest.raises(ValueError, match="http backend"):
+        ext4.open_ext4_image("http://127.0.0.1:1/image", 'mmap')
+    with pytest.raises(ValueError):
+        ext4.HttpImage(str(image))
+    simg = write_simg(image, tmp_path / "sample.simg")
+    with ext4.open_ext4_image(str(simg)) as opened:
+        assert isinstance(opened, ext4.SparseImage)
+
+
+@pytest.mark.parametrize("backend", ['mmap', 'pread', 'memory'])
+def test_raw_backends(ext4, sample, backend):
+    image, source = sample
+    check_filesystem(ext4, image, source, backend=backend).close()
+
+
+def test_block_cache(ext4, sample):
+    image, source = sample
+    parser = check_filesystem(ext4, image, source, backend='pread')
+    # pread has no buffer to slice, reads go through the cache
+    stats = parser.cache_stats()
+    assert stats['misses'] > 0 and stats['hits'] > 0
+    assert stats['block_size'] == 4096
+    assert stats['blocks'] * stats['block_size'] <= stats['budget']
+    parser.close()
+    parser = check_filesystem(ext4, image, source, backend='pread', cache_size=0)
+    assert parser.cache_stats() is None
+    parser.close()
+    # mmap is not cached at all
+    parser = ext4.Ext4Parser(str(image))
+    assert parser.cache_stats() is None
+    parser.close()
+
+
+def test_cached_image_reads(ext4, sample):
+    image, _ = sample
+    data = image.read_bytes()
+    with ext4.FileImage(str(image)) as base:
+        assert b''.join(base.read_blocks(4096, 3, 4096)) == data[4096:4*4096]
+        # a short tail block at the end of the image
+        assert base.read_blocks(len(data) - 100, 2, 4096) == [data[-100:]]
+    cache = ext4.CachedImage(ext4.FileImage(str(image)), budget=16 * 4096, block_size=4096)
+    for offset, size in ((0, 10), (4090, 20), (8192, 4096 * 3), (len(data) - 5, 10), (100000, 70000)):
+        assert cache.read(offset, size) == data[offset:offset+size]
+    # sequential misses grow the read-ahead window, the budget holds
+    for offset in range(0, 64 * 4096, 4096):
+        assert cache.read(offset, 4096) == data[offset:offset+4096]
+    stats = cache.stats()
+    assert stats['readahead'] > 0
+    assert stats['evictions'] > 0
+    assert stats['blocks'] <= 16
+    cache.close()
+
+
+def test_sparse_backend(ext4, sample, tmp_path):
+    image, source = sample
+    simg = write_simg(image, tmp_path / "sample.simg")
+    data = image.read_bytes()
+    with ext4.SparseImage(str(simg)) as opened:
+        assert len(opened) == len(data)
+        assert opened.crc32 == zlib.crc32(data)
+        # reads across RAW, FILL and DONT_CARE chunk boundaries
+        for start, length, _, _ in opened.chunks[:20]:
+            first, end = max(0, start - 3), start + length + 3
+            assert opened.read(first, end - first) == data[first:end]
+    check_filesystem(ext4, simg, source).close()
+
+
+def test_sparse_backend_rejects_bad_images(ext4, sample, tmp_path):
+    image, _ = sample
+    with pytest.raises(ValueError, match="not an Android sparse image"):
+        ext4.SparseImage(str(image))
+    simg = write_simg(image, tmp_path / "sample.simg")
+    broken = bytearray(simg.read_bytes())
+    # first chunk claims a bigger total size than it has
+    broken[28+8:28+12] = struct.pack('<I', 1 << 30)
+    (tmp_path / "broken.simg").write_bytes(broken)
+    with pytest.raises(ext4.Ext4CorruptionError):
+        ext4.SparseImage(str(tmp_path / "broken.simg"))
+
+
+@pytest.mark.parametrize("chunk_type", [0xCAC2, 0xCAC3])
+def test_sparse_chunk_sizes_are_checked(ext4, sample, tmp_path, monkeypatch, chunk_type):
+    image, _ = sample
+    broken = bytearray(write_simg(image, tmp_path / "sample.simg").read_bytes())
+    # first FILL or DONT_CARE chunk, its total size off by a word
+    offset = 28
+    while struct.unpack_from('<H', broken, offset)[0] != chunk_type:
+        offset += struct.unpack_from('<I', broken, offset + 8)[0]
+    struct.pack_into('<I', broken, offset + 8, struct.unpack_from('<I', broken, offset + 8)[0] + 4)
+    (tmp_path / "broken.simg").write_bytes(broken)
+    closed = []
+    close = ext4.SparseImage.close
+    monkeypatch.setattr(ext4.SparseImage, "close", lambda self: closed.append(self) or close(self))
+    with pytest.raises(ext4.Ext4CorruptionError, match=f"sparse chunk at {offset:#x}"):
+        ext4.SparseImage(str(tmp_path / "broken.simg"))
+    assert len(closed) == 1 and closed[0].mm.closed
+
+
+def test_zstd_backend(ext4, sample, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    image, source = sample
+    compressed = write_seekable_zstd(zstandard, image, tmp_path / "sample.img.zst")
+    data = image.read_bytes()
+    with ext4.open_ext4_image(str(compressed)) as opened:
+        assert isinstance(opened, ext4.ZstdImage)
+        assert len(opened) == len(data)
+        # across a frame boundary
+        assert opened.read((1 << 20) - 10, 20) == data[(1 << 20) - 10:(1 << 20) + 10]
+    check_filesystem(ext4, compressed, source).close()
+    # a plain zstd stream has no seek table
+    (tmp_path / "plain.zst").write_bytes(zstandard.ZstdCompressor().compress(data))
+    with pytest.raises(ValueError, match="seek table"):
+        ext4.ZstdImage(str(tmp_path / "plain.zst"))
+
+
+@pytest.fixture(params=["zlib", "indexed_gzip"])
+def gzip_module(request, ext4, monkeypatch, tmp_path):
+    # both gzip code paths, the default index location moved under tmp_path
+    if request.param == "zlib":
+        monkeypatch.setattr(ext4, "indexed_gzip", None)
+    elif ext4.indexed_gzip is None:
+        pytest.skip("indexed_gzip is not installed")
+    monkeypatch.setattr(ext4, "EXT4_CACHE_DIR", str(tmp_path / "cache"))
+    return request.param
+
+
+def test_gzip_backend(ext4, sample, tmp_path, gzip_module):
+    image, source = sample
+    compressed = write_gzip_members(image, tmp_path / "sample.img.gz", 5 << 20)
+    data = image.read_bytes()
+    with ext4.open_ext4_image(str(compressed)) as opened:
+        assert isinstance(opened, ext4.GzipImage)
+        assert len(opened) == len(data)
+        # backwards, and across member boundaries
+        for offset in (len(data) - 4096, (5 << 20) - 7, 10 << 20, 12345):
+            assert opened.read(offset, 8192) == data[offset:offset+8192]
+    # the index went to the cache directory, never next to the image
+    saved = os.listdir(tmp_path / "cache")
+    assert len(saved) == 1
+    assert sorted(os.listdir(tmp_path)) == ["cache", "sample.img.gz"]
+    if gzip_module == "zlib":
+        document = json.loads((tmp_path / "cache" / saved[0]).read_text())
+        assert document['size'] == len(data)
+        assert [out_pos for in_pos, out_pos in document['members']] == [0, 5 << 20, 10 << 20, 15 << 20]
+    # opened again from the saved index
+    check_filesystem(ext4, compressed, source).close()
+
+
+def test_gzip_index_path(ext4, sample, tmp_path, gzip_module):
+    image, source = sample
+    compressed = tmp_path / "sample.img.gz"
+    compressed.write_bytes(gzip.compress(image.read_bytes(), compresslevel=1))
+    index = tmp_path / "chosen" / "sample.index"
+    parser = check_filesystem(ext4, compressed, source, backend=functools.partial(ext4.GzipImage, index_path=str(index)))
+    parser.close()
+    assert index.exists()
+    assert not (tmp_path / "cache").exists()
+    # an index of another image version is not used
+    modified = index.stat().st_mtime_ns
+    os.utime(compressed)
+    with ext4.GzipImage(str(compressed), index_path=str(index)) as opened:
+        assert opened.read(1024 + 0x38, 2) == b'\x53\xef'
+    assert index.stat().st_mtime_ns >= modified
+
+
+def test_gzip_checkpoints_are_capped(ext4, sample, tmp_path, monkeypatch):
+    # single member: only inflate states can seek, and they stay under the cap
+    monkeypatch.setattr(ext4, "indexed_gzip", None)
+    monkeypatch.setattr(ext4, "EXT4_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(ext4, "EXT4_GZIP_MAX_CHECKPOINTS", 4)
+    image, _ = sample
+    data = image.read_bytes()
+    compressed = tmp_path / "sample.img.gz"
+    compressed.write_bytes(gzip.compress(data, compresslevel=1))
+    with ext4.GzipImage(str(compressed), spacing=1 << 20) as opened:
+        assert len(opened.checkpoints) <= 4
+        assert opened.spacing > 1 << 20
+        for offset in (len(data) - 4096, 12345, len(data) // 2):
+            assert opened.read(offset, 8192) == data[offset:offset+8192]
+    # reopened from the saved member starts, checkpoints come back as it reads
+    with ext4.GzipImage(str(compressed), spacing=1 << 20) as opened:
+        assert len(opened.checkpoints) == 1
+        for offset in range(0, len(data), 1 << 20):
+            assert opened.read(offset, 4096) == data[offset:offset+4096]
+        assert 1 < len(opened.checkpoints) <= 4
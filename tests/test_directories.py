@@ -0,0 +1,169 @@
+import io
+import os
+import re
+import shutil
+import struct
+import uuid
+
+import pytest
+
+from conftest import index_directories, make_image, run_debugfs
+
+HASH_NAMES = ["hello", "a", "café-über", "x" * 100, "file-0001-n"]
+HASH_SEED = "01234567-89ab-cdef-0123-456789abcdef"
+DEEP_NAMES = [f"{number:05d}-" + "d" * 200 for number in range(1000)]
+
+
+def debugfs_dx_hash(image, algorithm, name, seed=None):
+    command = f"dx_hash -h {algorithm}" + (f" -s {seed}" if seed else "") + f" {name}"
+    found = re.search(r"Hash of .* is (0x[0-9a-f]+) \(minor (0x[0-9a-f]+)\)", run_debugfs(image, command, writable=False))
+    return int(found[1], 16), int(found[2], 16)
+
+
+# debugfs only hashes with signed chars, the unsigned versions are covered by
+# the htree lookups below on filesystems e2fsck indexed with unsigned hashes
+@pytest.mark.parametrize("algorithm, version", [
+    ("legacy", "DX_HASH_LEGACY"),
+    ("half_md4", "DX_HASH_HALF_MD4"),
+    ("tea", "DX_HASH_TEA"),
+])
+@pytest.mark.parametrize("seed", [None, HASH_SEED], ids=["default-seed", "seed"])
+def test_dx_hash_matches_debugfs(ext4, sample, algorithm, version, seed):
+    image, _ = sample
+    words = struct.unpack('<4I', uuid.UUID(seed).bytes) if seed else None
+    for name in HASH_NAMES:
+        expected = debugfs_dx_hash(image, algorithm, name, seed)
+        hash, minor_hash = ext4.ext4_dx_hash(name.encode(), ext4.EXT4_HASH_VERSION[version], words)
+        # the legacy hash has no minor part
+        assert (hash, minor_hash if expected[1] else 0) == expected, name
+
+
+def test_lookup_every_path(ext4, sample):
+    image, source = sample
+    parser = ext4.Ext4Parser(str(image))
+    for directory, names, files in os.walk(source):
+        for name in names + files:
+            path = os.path.join(directory, name)
+            relative = "/" + os.path.relpath(path, source)
+            ino = parser.lookup(relative)
+            assert ino is not None, relative
+            assert parser.path_of(ino) == relative
+    assert parser.lookup("/sub/missing") is None
+    assert parser.lookup("/hello.txt/below") is None
+    parser.close()
+
+
+@pytest.mark.parametrize("hash_version", ["legacy", "half_md4", "tea"])
+@pytest.mark.parametrize("flags, signed", [(1, True), (2, False)], ids=["signed", "unsigned"])
+def test_htree_lookup(ext4, sample, sample_copy, hash_version, flags, signed):
+    _, source = sample
+    run_debugfs(sample_copy, f"ssv flags {flags}", f"ssv def_hash_version {hash_version}")
+    index_directories(sample_copy)
+    parser = ext4.Ext4Parser(str(sample_copy))
+    assert bool(parser.superblock().sb_flags & ext4.EXT4_MISC_FLAGS['EXT2_FLAGS_UNSIGNED_HASH']) != signed
+    many = parser.lookup("/many")
+    assert parser.inode(many).i_flags & ext4.EXT4_INODE_FLAGS['EXT4_INDEX_FL']
+    extent_map = parser.extent_map(many)
+    root = ext4.EXT4_DX_ROOT_INFO_LAYOUT.unpack(parser.ext4_dir_block(extent_map, 0), ext4.EXT4_DX_ROOT_INFO_OFFSET)
+    assert root.hash_version == ext4.EXT4_HASH_VERSION[f"DX_HASH_{hash_version.upper()}"]
+    dir_blocks = parser.inode(many).i_size_lo // parser.geometry.block_size
+    linear = {entry.name: entry.inode for entry in parser.iter_dir_entries(many)}
+    names = os.listdir(source / "many")
+    assert set(names) <= set(linear)
+    for name in names:
+        # the index is used, not the linear fallback, and narrows the search
+        blocks = parser.ext4_dx_leaf_blocks(extent_map, name.encode())
+        assert blocks is not None
+        assert len(blocks) < dir_blocks
+        assert parser.lookup_dir_entry(many, name).inode == linear[name]
+    assert parser.lookup_dir_entry(many, "file-9999") is None
+    parser.close()
+
+
+@pytest.fixture(scope="module")
+def deep_htree(tmp_path_factory):
+    # 1 KiB blocks and long names overflow the root index into a second level
+    base = tmp_path_factory.mktemp("deep")
+    (base / "source" / "big").mkdir(parents=True)
+    for name in DEEP_NAMES:
+        (base / "source" / "big" / name).touch()
+    return index_directories(make_image(base / "deep.img", "16M", ["-b", "1024"], base / "source"))
+
+
+def test_two_level_htree(ext4, deep_htree):
+    parser = ext4.Ext4Parser(str(deep_htree))
+    big = parser.lookup("/big")
+    extent_map = parser.extent_map(big)
+    assert parser.ext4_dx_root_info(extent_map).indirect_levels == 1
+    leaves = set()
+    for name in DEEP_NAMES:
+        blocks = parser.ext4_dx_leaf_blocks(extent_map, name.encode())
+        assert parser.lookup_dir_entry(big, name) is not None, name
+        leaves.update(blocks)
+    # every leaf is reached through the interior index blocks
+    frames = parser.ext4_dx_frames(extent_map, parser.ext4_dx_root_info(extent_map))
+    walked = [frames[-1][0][frames[-1][1]].block]
+    while parser.ext4_dx_next_leaf(extent_map, frames) is not None:
+        walked.append(frames[-1][0][frames[-1][1]].block)
+    assert len(walked) == len(set(walked))
+    assert leaves == set(walked)
+    parser.close()
+    # the scan lists the entries of every leaf, not the first one over and over
+    out = io.StringIO()
+    parser = ext4.Ext4Parser(str(deep_htree), renderer=ext4.Ext4TextRenderer(out))
+    parser.parse_ext4()
+    parser.close()
+    listed = re.findall(r"^Name: (\d{5}-d+)$", out.getvalue(), re.M)
+    assert sorted(listed) == DEEP_NAMES
+
+
+def test_htree_collision_crosses_index_nodes(ext4, deep_htree, tmp_path):
+    image = tmp_path / "collide.img"
+    shutil.copyfile(deep_htree, image)
+    parser = ext4.Ext4Parser(str(image))
+    big = parser.lookup("/big")
+    extent_map = parser.extent_map(big)
+    info = parser.ext4_dx_root_info(extent_map)
+    first, second = (parser.ext4_dx_node(extent_map, entry.block) for entry in parser.ext4_dx_node(extent_map, 0, info))
+    # a name from the first leaf below the second interior node
+    leaf = parser.ext4_dir_block(extent_map, second[0].block)
+    name = next(entry.name for entry in ext4.ext4_iter_dir_block(leaf, big) if entry.name in DEEP_NAMES)
+    hash_version = info.hash_version
+    if parser.superblock().sb_flags & ext4.EXT4_MISC_FLAGS['EXT2_FLAGS_UNSIGNED_HASH']:
+        hash_version += ext4.EXT4_HASH_VERSION['DX_HASH_LEGACY_UNSIGNED']
+    target = ext4.ext4_dx_hash(name.encode(), hash_version, parser.ext4_hash_seed())[0]
+    offset = extent_map.offset(0) + ext4.EXT4_DX_ROOT_INFO_OFFSET + info.info_length + ext4.EXT4_DX_ENTRY_LAYOUT.size
+    parser.close()
+    # the second interior node now starts with a continuation of that hash,
+    # so the search lands in the last leaf of the first node and has to climb
+    with open(image, "r+b") as f:
+        f.seek(offset)
+        f.write(struct.pack("<I", target | 1))
+    parser = ext4.Ext4Parser(str(image))
+    assert parser.ext4_dx_leaf_blocks(extent_map, name.encode()) == [first[-1].block, second[0].block]
+    assert parser.lookup_dir_entry(big, name).name == name
+    parser.close()
+
+
+def test_walk_and_dir_tree(ext4, sample):
+    image, source = sample
+    parser = ext4.Ext4Parser(str(image))
+    expected = set()
+    for directory, names, files in os.walk(source):
+        expected.update("/" + os.path.relpath(os.path.join(directory, name), source) for name in names + files)
+    walked = {path for path, entry in parser.walk("/")}
+    assert walked - {"/lost+found"} == expected
+    for path, entry in parser.walk("/sub"):
+        assert path.startswith("/sub/")
+        assert parser.dir_tree().path_of(entry.inode) == path
+    assert parser.dir_tree().path_of(123456) is None
+    parser.close()
+
+
+def test_debugfs_agrees_on_inode_numbers(ext4, sample):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    for path in ("/hello.txt", "/sub/nested/deep.txt", "/many/file-0399-" + "n" * (399 % 40)):
+        found = re.search(r"Inode: (\d+)", run_debugfs(image, f"stat {path}", writable=False))
+        assert parser.lookup(path) == int(found[1])
+    parser.close()
@@ -0,0 +1,130 @@
+import filecmp
+import io
+import os
+import struct
+
+import pytest
+
+from conftest import SAMPLE_TEXT
+
+
+def regular_files(source):
+    for directory, names, files in os.walk(source):
+        for name in files:
+            path = os.path.join(directory, name)
+            if not os.path.islink(path):
+                yield "/" + os.path.relpath(path, source), path
+
+
+def test_read_matches_source(ext4, sample):
+    image, source = sample
+    parser = ext4.Ext4Parser(str(image))
+    for relative, path in regular_files(source):
+        with open(path, "rb") as f:
+            expected = f.read()
+        with parser.open(parser.lookup(relative)) as src:
+            assert src.readall() == expected, relative
+            src.seek(-min(3, len(expected)), io.SEEK_END)
+            assert src.read() == expected[-3:]
+            src.seek(1)
+            assert src.read(5) == expected[1:6]
+    parser.close()
+
+
+def test_sparse_file_reads_holes_as_zeros(ext4, sample):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    with parser.open(parser.lookup("/sparse.bin")) as src:
+        # the hole is not mapped at all
+        assert src.segments[0][2] is None
+        assert src.size == (1 << 20) + 4
+        data = src.readall()
+    assert data == bytes(1 << 20) + b"tail"
+    parser.close()
+
+
+def test_symlinks(ext4, sample):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    with parser.open(parser.lookup("/link")) as src:
+        assert src.read() == b"hello.txt"
+    with parser.open(parser.lookup("/longlink")) as src:
+        assert src.read() == b"sub/nested/" + b"x" * 80
+    parser.close()
+
+
+def test_extract(ext4, sample, tmp_path):
+    image, source = sample
+    parser = ext4.Ext4Parser(str(image))
+    out = tmp_path / "big.bin"
+    assert parser.extract("/big.bin", out) == (source / "big.bin").stat().st_size
+    assert out.read_bytes() == (source / "big.bin").read_bytes()
+    sparse = tmp_path / "sparse.bin"
+    parser.extract("/sparse.bin", sparse)
+    assert sparse.read_bytes() == (source / "sparse.bin").read_bytes()
+    with pytest.raises(FileNotFoundError):
+        parser.extract("/nothing", tmp_path / "nothing")
+    parser.close()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_extract_tree(ext4, sample, tmp_path, workers):
+    image, source = sample
+    parser = ext4.Ext4Parser(str(image))
+    dest = tmp_path / "out"
+    files, size = parser.extract_tree("/", dest, workers=workers)
+    expected = list(regular_files(source))
+    assert files == len(expected)
+    assert size == sum(os.path.getsize(path) for _, path in expected)
+    for relative, path in expected:
+        assert filecmp.cmp(path, dest / relative.lstrip("/"), shallow=False), relative
+    assert os.readlink(dest / "link") == "hello.txt"
+    assert (dest / "link").read_bytes() == SAMPLE_TEXT
+    parser.close()
+
+
+def test_extract_tree_stays_inside_dest(ext4, mkfs, tmp_path):
+    # a symlink "a" pointing outside, and a directory whose name is patched
+    # to "a" as well, so the image lists a/payload through the link
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    source = tmp_path / "source"
+    (source / "b").mkdir(parents=True)
+    (source / "b" / "payload").write_bytes(b"secret")
+    os.symlink(str(outside), source / "a")
+    image = mkfs(size="4M", options=["-O", "^metadata_csum"], source=source)
+    parser = ext4.Ext4Parser(str(image))
+    offset = parser.geometry.block_offset(parser.extent_map(ext4.EXT4_ROOT_INO).runs[0].physical)
+    block_size = parser.geometry.block_size
+    parser.close()
+    with open(image, "r+b") as f:
+        f.seek(offset)
+        # name_len 1, file type directory, name "b"
+        at = f.read(block_size).index(struct.pack("<BB", 1, 2) + b"b")
+        f.seek(offset + at + 2)
+        f.write(b"a")
+    parser = ext4.Ext4Parser(str(image))
+    assert sorted(path for path, entry in parser.walk("/")) == ["/a", "/a", "/a/payload", "/lost+found"]
+    parser.extract_tree("/", tmp_path / "dest")
+    assert os.listdir(outside) == []
+    parser.close()
+
+
+def test_block_mapped_files(ext4, sample, mkfs, tmp_path):
+    # ext3 style indirect block maps; with 1 KiB blocks big.bin reaches the
+    # double indirect block and sparse.bin has holes at every level
+    _, source = sample
+    image = mkfs(size="16M", options=["-b", "1024", "-O", "^extent,^64bit,^flex_bg"], source=source)
+    parser = ext4.Ext4Parser(str(image))
+    big = parser.inode(parser.lookup("/big.bin"))
+    assert not big.i_flags & ext4.EXT4_INODE_FLAGS['EXT4_EXTENTS_FL']
+    for relative, path in regular_files(source):
+        with parser.open(parser.lookup(relative)) as src:
+            assert src.readall() == open(path, "rb").read(), relative
+    with parser.open(parser.lookup("/longlink")) as src:
+        assert src.read() == b"sub/nested/" + b"x" * 80
+    files, _ = parser.extract_tree("/", tmp_path / "out")
+    assert files == len(list(regular_files(source)))
+    assert (tmp_path / "out" / "big.bin").read_bytes() == (source / "big.bin").read_bytes()
+    assert (tmp_path / "out" / "sparse.bin").read_bytes() == (source / "sparse.bin").read_bytes()
+    parser.close()
@@ -0,0 +1,116 @@
+import base64
+import http.server
+import os
+import re
+import threading
+
+import pytest
+
+from conftest import SAMPLE_TEXT
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    # an object store stand-in: byte ranges, an ETag checked with If-Match,
+    # keep-alive, and a log of what was asked
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.log.append(dict(self.headers))
+        path = os.path.join(server.root, self.path.lstrip("/").split("?")[0])
+        if not os.path.isfile(path):
+            return self.reply(404)
+        info = os.stat(path)
+        etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+        if self.headers.get("If-Match") not in (None, etag):
+            return self.reply(412)
+        found = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        with open(path, "rb") as f:
+            if not found or not server.ranges:
+                return self.reply(200, f.read())
+            first, last = int(found[1]), min(int(found[2]), info.st_size - 1)
+            f.seek(first)
+            body = f.read(last - first + 1)
+        self.reply(206, body, {"Content-Range": f"bytes {first}-{last}/{info.st_size}", "ETag": etag})
+
+    def reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def http_server(sample_copy):
+    # serves a copy of the sample image on an ephemeral port
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.daemon_threads = True
+    server.image = sample_copy
+    server.root = str(sample_copy.parent)
+    server.ranges = True
+    server.log = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/{sample_copy.name}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_backend(ext4, sample, http_server):
+    _, source = sample
+    parser = ext4.Ext4Parser(http_server.url)
+    assert isinstance(parser.f, ext4.CachedImage)
+    assert isinstance(parser.f.base, ext4.HttpImage)
+    with parser.open(parser.lookup("/hello.txt")) as src:
+        assert src.read() == SAMPLE_TEXT
+    with parser.open(parser.lookup("/big.bin")) as src:
+        assert src.read() == (source / "big.bin").read_bytes()
+    assert list(parser.verify()) == []
+    http = parser.f.base
+    # only what was needed came over the wire, on a few pooled connections
+    assert http.transferred < os.path.getsize(http_server.image) // 2
+    assert all(entry.get("If-Match") for entry in http_server.log[1:])
+    parser.close()
+
+
+def test_http_read_runs_coalesce(ext4, http_server):
+    data = http_server.image.read_bytes()
+    with ext4.HttpImage(http_server.url) as http:
+        runs = [(0, 2), (3 * 4096, 1), (1 << 20, 4), (len(data) - 4096, 3)]
+        before = http.requests
+        results = http.read_runs(runs, 4096)
+        # the first two runs are close enough to share a request
+        assert http.requests - before == 3
+        for (offset, count), blocks in zip(runs, results):
+            assert b"".join(blocks) == data[offset:offset+count*4096]
+        assert results[3] == [data[-4096:]]
+        # parts of a big read go out side by side
+        assert http.read(4096, 3 << 20) == data[4096:4096 + (3 << 20)]
+
+
+def test_http_credentials(ext4, http_server):
+    url = http_server.url.replace("http://", "http://user:p%40ss@")
+    with ext4.HttpImage(url) as http:
+        http.read(0, 10)
+    assert http_server.log[-1]["Authorization"] == "Basic " + base64.b64encode(b"user:p@ss").decode()
+
+
+def test_http_errors(ext4, http_server):
+    with pytest.raises(ValueError, match="HTTP 404"):
+        ext4.HttpImage(http_server.url + ".missing")
+    http_server.ranges = False
+    with pytest.raises(ValueError, match="does not serve byte ranges"):
+        ext4.HttpImage(http_server.url)
+    http_server.ranges = True
+    with ext4.HttpImage(http_server.url) as http:
+        http.read(0, 10)
+        # the object changes under the reader
+        os.utime(http_server.image, ns=(0, 0))
+        with pytest.raises(RuntimeError, match="changed on the server"):
+            http.read(4096, 10)
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+from conftest import PARSER_PATH
+
+
+def test_index_defaults_to_the_cache_dir(ext4, sample, monkeypatch, tmp_path):
+    image, _ = sample
+    monkeypatch.setattr(ext4, "EXT4_CACHE_DIR", str(tmp_path / "cache"))
+    before = sorted(os.listdir(image.parent))
+    parser = ext4.Ext4Parser(str(image))
+    with parser.index() as index:
+        assert index.path == str(tmp_path / "cache" / (parser.fingerprint()[:32] + ext4.EXT4_INDEX_SUFFIX))
+        assert index.lookup("/sub/nested/deep.txt") == parser.lookup("/sub/nested/deep.txt")
+    # nothing is written next to the image, the second open reuses the file
+    assert sorted(os.listdir(image.parent)) == before
+    modified = os.stat(index.path).st_mtime_ns
+    with parser.index() as again:
+        assert again.path == index.path
+    assert os.stat(index.path).st_mtime_ns == modified
+    parser.close()
+
+
+def test_index_path_override(ext4, sample, tmp_path):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    chosen = tmp_path / "chosen.ext4idx"
+    with parser.index(str(chosen)) as index:
+        assert index.meta('fingerprint') == parser.fingerprint()
+    parser.close()
+    output = subprocess.run([sys.executable, str(PARSER_PATH), "--index", str(chosen), str(image)], capture_output=True, text=True, check=True).stdout
+    assert str(chosen) in output
+    env = {**os.environ, "XDG_CACHE_HOME": str(tmp_path / "xdg")}
+    subprocess.run([sys.executable, str(PARSER_PATH), str(image), "--index"], capture_output=True, text=True, check=True, env=env)
+    assert [name.endswith(".ext4idx") for name in os.listdir(tmp_path / "xdg" / "ext4parser")] == [True]
@@ -0,0 +1,67 @@
+import os
+import struct
+
+
+def write_blocks(tmp_path, *contents):
+    paths = []
+    for number, content in enumerate(contents):
+        path = tmp_path / f"block{number}.bin"
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+def test_transactions_tags_and_revokes(ext4, mkfs, debugfs, tmp_path):
+    image = mkfs(options=["-b", "4096"], size="32M")
+    first, second = write_blocks(tmp_path, os.urandom(4096), os.urandom(4096))
+    debugfs(image,
+            "jo", f"jw -b 700 {first}", "jc",
+            "jo", "jw -r 700", "jc",
+            "jo", f"jw -b 701 {first}", "jc",
+            "jo", f"jw -b 701 {second}", "jc")
+    parser = ext4.Ext4Parser(str(image))
+    transactions = list(parser.iter_journal())
+    assert [transaction.tid for transaction in transactions] == [1, 2, 3, 4]
+    assert [tag.fs_block for tag in transactions[0].tags] == [700]
+    assert transactions[1].tags == ()
+    assert transactions[1].revoked == (700,)
+    parser.close()
+
+
+def test_block_as_of_applies_revokes(ext4, mkfs, debugfs, tmp_path):
+    image = mkfs(options=["-b", "4096"], size="32M")
+    first, second = write_blocks(tmp_path, os.urandom(4096), os.urandom(4096))
+    debugfs(image,
+            "jo", f"jw -b 700 {first}", "jc",
+            "jo", "jw -r 700", "jc",
+            "jo", f"jw -b 701 {first}", "jc",
+            "jo", f"jw -b 701 {second}", "jc")
+    parser = ext4.Ext4Parser(str(image))
+    on_disk = lambda block: parser.f[block*4096:(block+1)*4096]
+    # logged in 1, revoked in 2: replay up to 1 writes the copy, later not
+    assert parser.block_as_of(700, 1) == first.read_bytes()
+    assert parser.block_as_of(700, 2) == on_disk(700)
+    assert parser.block_as_of(700, 4) == on_disk(700)
+    # newest copy up to tid wins
+    assert parser.block_as_of(701, 2) == on_disk(701)
+    assert parser.block_as_of(701, 3) == first.read_bytes()
+    assert parser.block_as_of(701, 4) == second.read_bytes()
+    parser.close()
+
+
+def test_fast_commit_area_is_not_log(ext4, mkfs, debugfs, tmp_path):
+    image = mkfs(options=["-b", "4096", "-O", "fast_commit"], size="32M")
+    (block,) = write_blocks(tmp_path, os.urandom(4096))
+    debugfs(image, "jo", f"jw -b 700 {block}", "jc", "jo", "jw -r 700", "jc")
+    parser = ext4.Ext4Parser(str(image))
+    jsb = parser.journal_superblock()
+    assert jsb.s_num_fc_blks > 0
+    offset = parser.ext4_journal_offset(jsb.s_maxlen - 1)
+    parser.close()
+    # a commit-looking block in the fast commit area is no transaction
+    with open(image, "r+b") as f:
+        f.seek(offset)
+        f.write(struct.pack('>III', ext4.JBD2_MAGIC_NUMBER, 2, 99))
+    parser = ext4.Ext4Parser(str(image))
+    assert [transaction.tid for transaction in parser.iter_journal()] == [1, 2]
+    parser.close()
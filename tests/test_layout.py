@@ -0,0 +1,124 @@
+import re
+import struct
+import subprocess
+
+import pytest
+
+from conftest import need_tool, run_debugfs
+
+GEOMETRIES = [
+    pytest.param(["-b", "4096"], "32M", id="4k"),
+    pytest.param(["-b", "1024"], "32M", id="1k"),
+    pytest.param(["-b", "2048", "-I", "128"], "32M", id="2k-small-inodes"),
+    pytest.param(["-b", "1024", "-O", "meta_bg,^resize_inode"], "64M", id="1k-meta_bg"),
+    pytest.param(["-b", "4096", "-O", "^flex_bg,^64bit"], "256M", id="4k-no-flex_bg"),
+]
+
+
+def dumpe2fs_inode_tables(path):
+    need_tool("dumpe2fs")
+    output = subprocess.run(["dumpe2fs", str(path)], capture_output=True, text=True, check=True).stdout
+    return [int(block) for block in re.findall(r"Inode table at (\d+)-", output)]
+
+
+@pytest.mark.parametrize("options, size", GEOMETRIES)
+def test_group_descriptors_match_dumpe2fs(ext4, mkfs, options, size):
+    image = mkfs(size=size, options=options)
+    parser = ext4.Ext4Parser(str(image))
+    tables = dumpe2fs_inode_tables(image)
+    assert parser.ext4_group_count() == len(tables)
+    assert list(parser.group_table().inode_table) == tables
+    assert [descriptor.bg_inode_table_lo for descriptor in parser.group_descriptors()] == [block & 0xFFFFFFFF for block in tables]
+    parser.close()
+
+
+@pytest.mark.parametrize("options, size", GEOMETRIES)
+def test_inode_offsets_match_debugfs(ext4, mkfs, options, size):
+    image = mkfs(size=size, options=options)
+    parser = ext4.Ext4Parser(str(image))
+    sb = parser.superblock()
+    # first, last and both sides of a group boundary when there is one
+    candidates = {1, 2, 11, sb.sb_inodes_per_group, sb.sb_inodes_per_group + 1, sb.sb_inodes_count}
+    for ino in sorted(ino for ino in candidates if ino <= sb.sb_inodes_count):
+        located = re.search(r"located at block (\d+), offset (0x[0-9a-f]+)", run_debugfs(image, f"imap <{ino}>", writable=False))
+        expected = int(located[1]) * parser.geometry.block_size + int(located[2], 16)
+        assert parser.ext4_inode_offset(ino) == expected, ino
+    parser.close()
+
+
+def test_descriptor_high_halves(ext4):
+    # the second of two 64-byte descriptors has every high half set
+    data = bytearray(128)
+    struct.pack_into('<IIIH', data, 64, 0x11, 0x22, 0x33, 5)
+    struct.pack_into('<IIIH', data, 64 + 0x20, 1, 2, 3, 1)
+    table = ext4.Ext4GroupTable(bytes(data), 64)
+    assert list(table.block_bitmap) == [0, (1 << 32) | 0x11]
+    assert list(table.inode_bitmap) == [0, (2 << 32) | 0x22]
+    assert list(table.inode_table) == [0, (3 << 32) | 0x33]
+    assert table.free_blocks[1] == (1 << 16) | 5
+    descriptor = ext4.decode_ext4_group_descriptor(bytes(data), 64, 64)
+    assert ext4.ext4_block_addr(descriptor.bg_inode_table_lo, descriptor.bg_inode_table_hi) == table.inode_table[1]
+    # 32-byte descriptors have no high halves
+    assert ext4.decode_ext4_group_descriptor(bytes(data), 64, 32).bg_inode_table_hi == 0
+
+
+def test_extent_start_high_half(ext4):
+    node = struct.pack('<HHHHI', ext4.EXT4_EXTENT_TREE_MAGIC, 1, 4, 0, 0) + struct.pack('<IHHI', 5, 8, 0x12, 0x3456789A) + bytes(36)
+    run = ext4.ext4_extent_run(ext4.decode_ext4_extent_node(node).entries[0])
+    assert (run.logical, run.physical, run.length) == (5, 0x123456789A, 8)
+
+
+def test_geometry_is_read_on_first_use(ext4, sample):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    # nothing read the superblock yet
+    assert parser.ext4_group_count() == 1
+    assert parser.geometry.block_size == 4096
+    parser.close()
+
+
+def test_inode_scans_agree(ext4, sample):
+    image, source = sample
+    parser = ext4.Ext4Parser(str(image))
+    inodes = dict(parser.iter_inodes())
+    columns = parser.scan_ext4_inodes()
+    assert sorted(int(ino) for ino in columns['ino']) == sorted(inodes)
+    for ino, size in zip(columns['ino'], columns['size']):
+        assert int(size) == ext4.ext4_file_size(inodes[int(ino)])
+    assert inodes[parser.lookup('/big.bin')].i_size_lo == (source / "big.bin").stat().st_size
+    parser.close()
+
+
+def test_inode_scan_without_groups(ext4, sample):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    parser.superblock()
+    parser.ext4_geometry.group_count = 0
+    columns = parser.scan_ext4_inodes()
+    assert 'ino' in columns
+    assert all(len(column) == 0 for column in columns.values())
+    parser.close()
+
+
+def test_superblock_is_validated(ext4, tmp_path):
+    image = tmp_path / "zero.img"
+    image.write_bytes(bytes(1 << 20))
+    with pytest.raises(ext4.Ext4CorruptionError, match="no valid ext4 superblock"):
+        ext4.Ext4Parser(str(image)).superblock()
+
+
+def test_inode_scan_of_truncated_image(ext4, mkfs, sample, monkeypatch):
+    # without flex_bg the last groups keep their inode tables past the cut
+    image = mkfs(size="32M", options=["-b", "1024", "-O", "^flex_bg"], source=sample[1])
+    with open(image, "r+b") as f:
+        f.truncate(12 << 20)
+    parser = ext4.Ext4Parser(str(image))
+    last = parser.ext4_group_count() - 1
+    assert parser.ext4_inode_table_offset(last) >= 12 << 20
+    assert len(parser.ext4_inode_table_array(parser.ext4_inode_table_offset(last))) == 0
+    columns = parser.scan_ext4_inodes(allocated_only=False)
+    inodes = dict(parser.iter_inodes(allocated_only=False))
+    assert sorted(int(ino) for ino in columns['ino']) == sorted(inodes)
+    monkeypatch.setattr(ext4, "np", None)
+    assert sorted(dict(parser.iter_inodes(allocated_only=False))) == sorted(inodes)
+    parser.close()
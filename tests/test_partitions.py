@@ -0,0 +1,187 @@
+import struct
+import subprocess
+import sys
+import uuid
+import zlib
+
+import pytest
+
+from conftest import PARSER_PATH, SAMPLE_TEXT
+
+SECTOR = 512
+LINUX_DATA = uuid.UUID("0FC63DAF-8483-4772-8E79-3D69D8477DE4")
+LINUX_SWAP = uuid.UUID("0657FD6D-A4AB-43C4-84E5-0933C84B4F4F")
+
+
+def write_gpt(path, partitions, entries=128):
+    # protective MBR, primary header and entry array, partitions (type, name,
+    # data) 1 MiB aligned, backup entry array and header at the end
+    lba = 2048
+    layout = []
+    for type_guid, name, data in partitions:
+        layout.append((lba, type_guid, name, data))
+        lba += -(-len(data) // SECTOR) + 2048
+    array_sectors = entries * 128 // SECTOR
+    last = lba + array_sectors
+    disk = bytearray((last + 1) * SECTOR)
+    disk[446:462] = struct.pack('<B3sB3sII', 0, b'\x00\x00\x02', 0xEE, b'\xff\xff\xff', 1, min(last, 0xFFFFFFFF))
+    disk[510:512] = b'\x55\xaa'
+    array = bytearray(entries * 128)
+    for number, (first, type_guid, name, data) in enumerate(layout):
+        disk[first*SECTOR:first*SECTOR+len(data)] = data
+        array[number*128:(number+1)*128] = struct.pack('<16s16sQQQ72s', type_guid.bytes_le, uuid.uuid4().bytes_le, first, first + -(-len(data) // SECTOR) - 1, 0, name.encode('utf-16-le'))
+    disk_guid = uuid.uuid4().bytes_le
+
+    def header(current, backup, array_lba):
+        data = struct.pack('<8sIIIIQQQQ16sQIII', b'EFI PART', 0x10000, 92, 0, 0, current, backup, 2 + array_sectors, last - array_sectors - 1, disk_guid, array_lba, entries, 128, zlib.crc32(array))
+        return data[:16] + struct.pack('<I', zlib.crc32(data)) + data[20:]
+    disk[SECTOR:SECTOR+92] = header(1, last, 2)
+    disk[2*SECTOR:2*SECTOR+len(array)] = array
+    disk[(last-array_sectors)*SECTOR:last*SECTOR] = array
+    disk[last*SECTOR:last*SECTOR+92] = header(last, 1, last - array_sectors)
+    path.write_bytes(disk)
+    return path
+
+
+def write_mbr(path, primary, logicals):
+    # primary partition 1, then an extended partition with an EBR chain
+    def entry(status, kind, first, sectors):
+        return struct.pack('<B3sB3sII', status, bytes(3), kind, bytes(3), first, sectors)
+    sectors = lambda data: -(-len(data) // SECTOR)
+    first = 2048
+    extended = first + sectors(primary) + 2048
+    ebrs = []
+    lba = extended
+    for data in logicals:
+        ebrs.append((lba, data))
+        lba += 2048 + sectors(data)
+    disk = bytearray(lba * SECTOR)
+    mbr = entry(0x80, 0x83, first, sectors(primary)) + entry(0, 0x0F, extended, lba - extended)
+    disk[446:446+len(mbr)] = mbr
+    disk[510:512] = b'\x55\xaa'
+    disk[first*SECTOR:first*SECTOR+len(primary)] = primary
+    for number, (ebr, data) in enumerate(ebrs):
+        table = entry(0, 0x83, 2048, sectors(data))
+        if number + 1 < len(ebrs):
+            following = ebrs[number + 1][0]
+            table += entry(0, 0x05, following - extended, 2048 + sectors(ebrs[number + 1][1]))
+        disk[ebr*SECTOR+446:ebr*SECTOR+446+len(table)] = table
+        disk[ebr*SECTOR+510:ebr*SECTOR+512] = b'\x55\xaa'
+        disk[(ebr+2048)*SECTOR:(ebr+2048)*SECTOR+len(data)] = data
+    path.write_bytes(disk)
+    return path
+
+
+@pytest.fixture
+def disks(sample, mkfs, tmp_path):
+    # (GPT disk, MBR disk, small image) built around the sample filesystem
+    root = sample[0].read_bytes()
+    home = mkfs(name="home.img", size="4M").read_bytes()
+    gpt = write_gpt(tmp_path / "gpt.img", [(LINUX_DATA, "root", root), (LINUX_SWAP, "swap", bytes(1 << 20)), (LINUX_DATA, "home", home)])
+    mbr = write_mbr(tmp_path / "mbr.img", root, [bytes(1 << 20), home])
+    return gpt, mbr, home
+
+
+def describe(partitions):
+    return [(partition.index, partition.scheme, partition.name, partition.is_ext4) for partition in partitions]
+
+
+def test_gpt_partitions(ext4, disks):
+    gpt, _, home = disks
+    partitions = ext4.ext4_partitions(str(gpt))
+    assert describe(partitions) == [(1, 'gpt', 'root', True), (2, 'gpt', 'swap', False), (3, 'gpt', 'home', True)]
+    assert partitions[0].offset == 2048 * SECTOR
+    assert partitions[2].size == len(home)
+    assert partitions[0].type == str(LINUX_DATA).lower()
+
+
+def test_mbr_partitions(ext4, disks):
+    _, mbr, home = disks
+    partitions = ext4.ext4_partitions(str(mbr))
+    # logical partitions are numbered from 5
+    assert describe(partitions) == [(1, 'mbr', '', True), (5, 'ebr', '', False), (6, 'ebr', '', True)]
+    assert partitions[2].size == len(home)
+
+
+def test_bare_filesystem_is_one_partition(ext4, sample):
+    assert describe(ext4.ext4_partitions(str(sample[0]))) == [(0, 'none', '', True)]
+
+
+def test_gpt_backup_header_and_array(ext4, disks):
+    gpt, _, _ = disks
+    data = bytearray(gpt.read_bytes())
+    # a bad primary entry array is caught by its CRC
+    data[2*SECTOR] ^= 0xFF
+    gpt.write_bytes(data)
+    assert [partition.name for partition in ext4.ext4_partitions(str(gpt))] == ['root', 'swap', 'home']
+    # and so is a bad primary header
+    data[2*SECTOR] ^= 0xFF
+    data[SECTOR+40] ^= 0xFF
+    gpt.write_bytes(data)
+    assert [partition.name for partition in ext4.ext4_partitions(str(gpt))] == ['root', 'swap', 'home']
+    # without a good copy there is no partition, the protective MBR entry
+    # is not listed as one
+    data[-SECTOR+40] ^= 0xFF
+    gpt.write_bytes(data)
+    assert ext4.ext4_partitions(str(gpt)) == []
+
+
+def test_gpt_entry_size_is_capped(ext4, disks):
+    gpt, _, _ = disks
+    data = bytearray(gpt.read_bytes())
+    for header in (SECTOR, len(data) - SECTOR):
+        # a huge entry count with a valid header CRC is still refused
+        data[header+80:header+84] = struct.pack('<I', 1 << 24)
+        data[header+16:header+20] = bytes(4)
+        data[header+16:header+20] = struct.pack('<I', zlib.crc32(bytes(data[header:header+92])))
+    gpt.write_bytes(data)
+    assert ext4.ext4_partitions(str(gpt)) == []
+
+
+def test_ebr_loop_terminates(ext4, sample, tmp_path):
+    mbr = write_mbr(tmp_path / "loop.img", sample[0].read_bytes(), [bytes(SECTOR), bytes(SECTOR)])
+    data = bytearray(mbr.read_bytes())
+    extended = struct.unpack_from('<I', data, 446 + 16 + 8)[0]
+    second = extended + struct.unpack_from('<I', data, extended*SECTOR + 462 + 8)[0]
+    # the second EBR names itself as the next one
+    data[second*SECTOR+462:second*SECTOR+478] = struct.pack('<B3sB3sII', 0, bytes(3), 0x05, bytes(3), second - extended, 2048 + 1)
+    mbr.write_bytes(data)
+    assert [partition.index for partition in ext4.ext4_partitions(str(mbr))] == [1, 5, 6]
+
+
+def test_parser_on_disk_images(ext4, disks, sample, tmp_path):
+    gpt, mbr, _ = disks
+    # two ext4 partitions: the error names them
+    for disk in (gpt, mbr):
+        with pytest.raises(ext4.Ext4CorruptionError, match="--partition N"):
+            ext4.Ext4Parser(str(disk)).superblock()
+    root = ext4.ext4_select_partition(str(gpt), None, "1")
+    parser = ext4.Ext4Parser(str(gpt), partition=root)
+    with parser.open(parser.lookup("/hello.txt")) as src:
+        assert src.read() == SAMPLE_TEXT
+    assert list(parser.verify()) == []
+    parser.close()
+    home = ext4.ext4_select_partition(str(mbr), None, "6")
+    parser = ext4.Ext4Parser(str(mbr), partition=home)
+    assert parser.lookup("/lost+found") is not None
+    assert parser.lookup("/hello.txt") is None
+    parser.close()
+    with pytest.raises(ValueError, match="no ext4"):
+        ext4.ext4_select_partition(str(gpt), None, "2")
+    with pytest.raises(ValueError, match="no partition 9"):
+        ext4.ext4_select_partition(str(gpt), None, "9")
+    # a single ext4 partition is picked without being asked
+    single = write_gpt(tmp_path / "single.img", [(LINUX_DATA, "root", sample[0].read_bytes())])
+    parser = ext4.Ext4Parser(str(single))
+    assert parser.partition.index == 1
+    assert parser.lookup("/hello.txt") is not None
+    parser.close()
+
+
+def test_cli_lists_and_scans_partitions(disks):
+    gpt, _, _ = disks
+    listed = subprocess.run([sys.executable, str(PARSER_PATH), "--list-partitions", str(gpt)], capture_output=True, text=True, check=True).stdout
+    assert "root" in listed and "swap" in listed and "home" in listed
+    scanned = subprocess.run([sys.executable, str(PARSER_PATH), "--partition", "all", "-j", "2", str(gpt)], capture_output=True, text=True, check=True).stdout
+    assert "Partition 1 (root)" in scanned and "Partition 3 (home)" in scanned
+    assert "Partition 2" not in scanned
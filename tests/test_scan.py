@@ -0,0 +1,72 @@
+import io
+import json
+
+import pytest
+
+
+def scan_output(ext4, image, jobs):
+    out = io.StringIO()
+    parser = ext4.Ext4Parser(str(image), renderer=ext4.Ext4TextRenderer(out))
+    parser.parse_ext4(jobs=jobs)
+    parser.close()
+    return out.getvalue()
+
+
+def test_parallel_scan_matches_serial(ext4, mkfs, sample):
+    # several groups, so the pool has something to shard
+    image = mkfs(size="32M", options=["-b", "1024"], source=sample[1])
+    parser = ext4.Ext4Parser(str(image))
+    groups = parser.ext4_group_count()
+    parser.close()
+    serial = scan_output(ext4, image, 1)
+    assert groups > 1
+    assert serial.count("Parsing Inode Table for Block Group") == groups
+    assert scan_output(ext4, image, 3) == serial
+
+
+def test_renderer_is_the_only_output(ext4, sample, capsys):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image), renderer=ext4.Ext4NullRenderer())
+    parser.parse_ext4()
+    parser.close()
+    assert capsys.readouterr().out == ""
+    assert "hello.txt" in scan_output(ext4, image, 1)
+
+
+@pytest.mark.parametrize("table", ["inodes", "extents", "dirents", "xattrs"])
+def test_jsonl_export(ext4, sample, tmp_path, table):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    path = tmp_path / f"{table}.jsonl"
+    with ext4.open_ext4_export_sink(path, table, batch_size=7) as sink:
+        parser.export(sink)
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(rows) == sink.count
+    assert all(list(row) == sink.columns for row in rows)
+    if table == "inodes":
+        assert {row['ino'] for row in rows} == {ino for ino, _ in parser.iter_inodes()}
+    elif table == "dirents":
+        assert {"hello.txt", "deep.txt", "lost+found"} <= {row['name'] for row in rows}
+    parser.close()
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_columnar_export(ext4, sample, tmp_path, fmt):
+    pa = pytest.importorskip("pyarrow")
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    path = tmp_path / f"inodes.{fmt}"
+    with ext4.open_ext4_export_sink(path, "inodes") as sink:
+        parser.export(sink)
+    if fmt == "arrow":
+        table = pa.ipc.open_file(str(path)).read_all()
+    else:
+        table = pytest.importorskip("pyarrow.parquet").read_table(str(path))
+    assert table.num_rows == sink.count == len(dict(parser.iter_inodes()))
+    assert table.schema.names == sink.columns
+    parser.close()
+
+
+def test_unknown_export_format(ext4, tmp_path):
+    with pytest.raises(ValueError, match="unknown export format"):
+        ext4.open_ext4_export_sink(tmp_path / "out", fmt="xml")
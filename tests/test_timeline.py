@@ -0,0 +1,60 @@
+import csv
+import json
+
+import pytest
+
+# s_mtime style times past 2262 no longer fit int64 nanoseconds
+FAR_FUTURE_NS = ((3 << 32) + 0x7FFFFFFF) * 1000000000 + 999999999
+BEFORE_EPOCH_NS = -(1 << 31) * 1000000000
+
+
+def test_timestamp_decoding(ext4):
+    assert ext4.ext4_timestamp_ns(0) == 0
+    assert ext4.ext4_timestamp_ns(0x80000000) == BEFORE_EPOCH_NS
+    # two extra epoch bits, then the nanoseconds
+    assert ext4.ext4_timestamp_ns(0x7FFFFFFF, 3 | (999999999 << 2)) == FAR_FUTURE_NS
+    assert ext4.ext4_timestamp_ns(5, 1 | (7 << 2)) == ((1 << 32) + 5) * 1000000000 + 7
+
+
+@pytest.mark.parametrize("run_events", [2, 3, 1000])
+def test_sorted_events_merge_runs(ext4, run_events):
+    events = [(FAR_FUTURE_NS, 1, 12), (5, 0, 11), (BEFORE_EPOCH_NS, 2, 13), (5, 0, 10), (0, 3, 2), (FAR_FUTURE_NS - 1, 0, 14), (-1, 1, 15)]
+    assert list(ext4.ext4_sorted_events(iter(events), run_events)) == sorted(events)
+
+
+def test_timeline(ext4, sample):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    events = list(parser.timeline())
+    assert [event.time_ns for event in events] == sorted(event.time_ns for event in events)
+    inodes = dict(parser.iter_inodes())
+    assert {event.ino for event in events} == set(inodes)
+    assert len(events) == sum(len(ext4.ext4_inode_times(inode)) for inode in inodes.values())
+    hello = parser.lookup("/hello.txt")
+    assert {event.path for event in events if event.ino == hello} == {"/hello.txt"}
+    # a spilled, merged timeline is the same timeline
+    assert list(parser.timeline(run_events=7)) == events
+    parser.close()
+
+
+@pytest.mark.parametrize("name, fmt", [("timeline.csv", "csv"), ("timeline.jsonl", "jsonl"), ("timeline.body", "bodyfile")])
+def test_write_timeline(ext4, sample, tmp_path, name, fmt):
+    image, _ = sample
+    parser = ext4.Ext4Parser(str(image))
+    path = tmp_path / name
+    count = parser.write_timeline(path)
+    lines = path.read_text().splitlines()
+    if fmt == "csv":
+        rows = list(csv.reader(lines))
+        assert rows[0] == list(ext4.Ext4TimelineEvent._fields)
+        assert len(rows) == count + 1
+    elif fmt == "jsonl":
+        assert len(lines) == count
+        assert set(json.loads(lines[0])) == set(ext4.Ext4TimelineEvent._fields)
+    else:
+        assert len(lines) == count
+        assert any(line.split("|")[1] == "/sub/nested/deep.txt" for line in lines)
+        assert all(len(line.split("|")) == 11 for line in lines)
+    with pytest.raises(ValueError):
+        parser.write_timeline(path, fmt="xml")
+    parser.close()
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from conftest import run_debugfs
+
+EXTENTS = 8
+
+
+@pytest.fixture
+def csum_image(mkfs, tmp_path):
+    # metadata_csum filesystem with a file whose extents do not fit in the
+    # inode, a directory and an external xattr block
+    source = tmp_path / "source"
+    (source / "dir").mkdir(parents=True)
+    (source / "dir" / "file").write_bytes(b"x" * 100)
+    with open(source / "fragmented", "wb") as f:
+        # data separated by holes, one extent each
+        for number in range(EXTENTS):
+            f.seek(number * 65536)
+            f.write(os.urandom(4096))
+    image = mkfs(size="16M", options=["-b", "4096", "-O", "metadata_csum"], source=source)
+    value = tmp_path / "value"
+    value.write_bytes(b"v" * 1000)
+    run_debugfs(image, f"ea_set -f {value} /dir/file user.big")
+    return image
+
+
+def patch(image, offset, data):
+    with open(image, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def flip(image, offset):
+    with open(image, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        f.seek(offset)
+        f.write(bytes([byte ^ 0xFF]))
+
+
+def extent_leaf_block(ext4, parser, ino):
+    inode = parser.inode(ino)
+    header = ext4.EXT4_EXTENT_HEADER_LAYOUT.unpack(inode.i_block)
+    assert header.eh_depth == 1
+    index = ext4.EXT4_EXTENT_IDX_LAYOUT.unpack(inode.i_block, ext4.EXT4_EXTENT_HEADER_LAYOUT.size)
+    return ext4.ext4_block_addr(index.ei_leaf_lo, index.ei_leaf_hi)
+
+
+def test_clean_image_verifies(ext4, csum_image, sample):
+    for image in (csum_image, sample[0]):
+        parser = ext4.Ext4Parser(str(image))
+        assert parser.ext4_checksum_seed() is not None
+        assert list(parser.verify(deep=True)) == []
+        parser.close()
+
+
+def test_superblock_and_descriptor_mismatches(ext4, csum_image):
+    parser = ext4.Ext4Parser(str(csum_image))
+    descriptor = parser.ext4_group_desc_offset(0)
+    parser.close()
+    # s_wtime and bg_free_blocks_count_lo
+    flip(csum_image, ext4.EXT4_SUPERBLOCK_OFFSET + 0x30)
+    flip(csum_image, descriptor + 0x0C)
+    parser = ext4.Ext4Parser(str(csum_image))
+    assert [(mismatch.kind, mismatch.location) for mismatch in parser.verify()] == [('superblock', 0), ('group_descriptor', 0)]
+    parser.close()
+
+
+def test_inode_mismatch(ext4, csum_image):
+    parser = ext4.Ext4Parser(str(csum_image))
+    ino = parser.lookup("/dir/file")
+    offset = parser.ext4_inode_offset(ino)
+    parser.close()
+    # i_mtime
+    flip(csum_image, offset + 0x10)
+    parser = ext4.Ext4Parser(str(csum_image))
+    assert [(mismatch.kind, mismatch.location) for mismatch in parser.verify()] == [('inode', ino)]
+    assert [mismatch.kind for mismatch in parser.verify_inode(ino)] == ['inode']
+    parser.close()
+
+
+def test_block_mismatches(ext4, csum_image):
+    parser = ext4.Ext4Parser(str(csum_image))
+    leaf = extent_leaf_block(ext4, parser, parser.lookup("/fragmented"))
+    directory = parser.extent_map(parser.lookup("/dir")).runs[0].physical
+    xattr = ext4.ext4_block_addr(parser.inode(parser.lookup("/dir/file")).i_file_acl_lo, 0)
+    block_size = parser.geometry.block_size
+    parser.close()
+    # the last extent entry, a name in the directory block, the xattr value
+    flip(csum_image, leaf * block_size + 12 * EXTENTS)
+    flip(csum_image, directory * block_size + 12 + 8)
+    flip(csum_image, xattr * block_size + block_size - 1)
+    parser = ext4.Ext4Parser(str(csum_image))
+    assert sorted((mismatch.kind, mismatch.location) for mismatch in parser.verify(deep=True)) == [('dir_block', directory), ('extent_block', leaf), ('xattr_block', xattr)]
+    # the shallow pass only looks at inode tables
+    assert list(parser.verify()) == []
+    parser.close()
+
+
+def test_broken_extent_tree_is_reported(ext4, csum_image):
+    parser = ext4.Ext4Parser(str(csum_image))
+    ino = parser.lookup("/fragmented")
+    leaf = extent_leaf_block(ext4, parser, ino)
+    xattr = ext4.ext4_block_addr(parser.inode(parser.lookup("/dir/file")).i_file_acl_lo, 0)
+    block_size = parser.geometry.block_size
+    parser.close()
+    # bad leaf magic stops the walk, the rest of the image is still checked
+    patch(csum_image, leaf * block_size, b"\x00\x00")
+    flip(csum_image, xattr * block_size + block_size - 1)
+    parser = ext4.Ext4Parser(str(csum_image))
+    mismatches = list(parser.verify(deep=True))
+    assert sorted(mismatch.kind for mismatch in mismatches) == ['extent_block', 'extent_tree', 'xattr_block']
+    broken = next(mismatch for mismatch in mismatches if mismatch.kind == 'extent_tree')
+    assert broken.location == ino
+    assert broken.detail
+    parser.close()